@@ -13,7 +13,43 @@ SECRET_KEY = config('SECRET_KEY', default='dev-unsafe-secret-key')
 DEBUG = config('DEBUG', default=False, cast=bool)
 
 # Configuração do diretório de modelos ML
-ML_MODELS_DIR = os.path.join(BASE_DIR, 'models')
+# Os artefatos dos modelos ficam aqui: use um diretório persistente em produção
+ML_MODELS_DIR = config('ML_MODELS_DIR', default=os.path.join(BASE_DIR, 'models'))
+# Compressão dos artefatos ('zlib', 'lzma' ou 'none', ver ml_models/artifacts.py).
+# Modelos carregados usam uma cópia descompactada em ML_MODELS_DIR/cache.
+ML_ARTIFACT_COMPRESSION = config('ML_ARTIFACT_COMPRESSION', default='zlib')
+
+# Gravação em lote das predições ML (ver ml_models/prediction_sink.py)
+ML_PREDICTION_BATCH_SIZE = config('ML_PREDICTION_BATCH_SIZE', default=100, cast=int)
+ML_PREDICTION_FLUSH_INTERVAL = config('ML_PREDICTION_FLUSH_INTERVAL', default=5.0, cast=float)
+ML_PREDICTION_MAX_BUFFER = config('ML_PREDICTION_MAX_BUFFER', default=10000, cast=int)
+
+# Política de persistência por tipo de modelo (sobrescreve os padrões de
+# ml_models/persistence_policy.py). Ex.: {'anomaly_detection': None} grava tudo.
+ML_PREDICTION_PERSISTENCE = {}
+
+# Máximo de entradas por requisição nos endpoints de inferência em lote
+ML_BATCH_MAX_SIZE = config('ML_BATCH_MAX_SIZE', default=10000, cast=int)
+
+# Orçamento de latência por chamada de inferência (ver ml_models/deadline.py).
+# Ao estourar, a resposta vem das regras simples. 0 desativa o limite.
+ML_INFERENCE_BUDGET_MS = config('ML_INFERENCE_BUDGET_MS', default=250, cast=int)
+ML_INFERENCE_WORKERS = config('ML_INFERENCE_WORKERS', default=4, cast=int)
+# Chamadas aguardando o pool nas views assíncronas (ver ml_models/views_async.py)
+ML_INFERENCE_MAX_PENDING = config('ML_INFERENCE_MAX_PENDING', default=64, cast=int)
+# Orçamentos por operação. Ex.: {'temperature_prediction': 500}
+ML_INFERENCE_BUDGETS = {}
+
+# Espera inicial (s) para refazer um warmup degradado ou falho; dobra a cada
+# tentativa (ver ml_models/warmup.py)
+ML_WARMUP_RETRY_SECONDS = config('ML_WARMUP_RETRY_SECONDS', default=30, cast=int)
+
+# Avaliação em sombra do modelo candidato (MLModel.is_shadow, ver ml_models/shadow.py)
+ML_SHADOW_ENABLED = config('ML_SHADOW_ENABLED', default=True, cast=bool)
+ML_SHADOW_WORKERS = config('ML_SHADOW_WORKERS', default=2, cast=int)
+ML_SHADOW_MAX_PENDING = config('ML_SHADOW_MAX_PENDING', default=100, cast=int)
+# Diferença máxima (°C) para considerar as previsões de temperatura concordantes
+ML_SHADOW_TEMPERATURE_TOLERANCE = config('ML_SHADOW_TEMPERATURE_TOLERANCE', default=0.5, cast=float)
 
 # --- 1. CONFIGURAÇÕES DE HOSTS E SEGURANÇA ---
 
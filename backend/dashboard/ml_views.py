@@ -159,27 +159,3 @@ def ml_stats_api(request):
         }
     
     return JsonResponse(stats)
-
-
-@login_required
-def trigger_ml_training(request):
-    """
-    Endpoint para disparar treinamento via interface
-    """
-    if request.method == 'POST':
-        try:
-            from ml_models.ml_algorithms import train_all_models
-            results = train_all_models()
-            
-            return JsonResponse({
-                'success': True,
-                'message': 'Treinamento concluído',
-                'results': results
-            })
-        except Exception as e:
-            return JsonResponse({
-                'success': False,
-                'error': str(e)
-            })
-    
-    return JsonResponse({'error': 'Método não permitido'}, status=405)
\ No newline at end of file
@@ -1,6 +1,8 @@
 # Gunicorn configuration file for Ambienta
 # Save as gunicorn_config.py
 
+import os
+
 # Worker configuration
 workers = 2  # Reduced number of workers
 threads = 4  # Number of threads per worker
@@ -8,7 +10,7 @@ worker_class = 'gthread'  # Thread-based worker
 worker_connections = 1000
 
 # Timeouts
-timeout = 120  # Increased timeout for ML operations
+timeout = 30  # ML inference is bounded by ML_INFERENCE_BUDGET_MS (ml_models/deadline.py)
 graceful_timeout = 30
 keepalive = 5
 
@@ -25,7 +27,7 @@ errorlog = '-'
 loglevel = 'info'
 
 # Server socket
-bind = '0.0.0.0:$PORT'
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"  # --bind na linha de comando tem precedência
 backlog = 2048
 
 # SSL configuration
@@ -35,6 +37,63 @@ certfile = None
 # Process naming
 proc_name = 'ambienta_gunicorn'
 
+# ML preload (opt-in): import the ML stack and load every active MLModel in
+# the master before forking, so workers share those pages copy-on-write and
+# the first request does not pay for imports and model loading.
+preload_app = os.environ.get('GUNICORN_PRELOAD_ML', 'false').lower() in ('1', 'true', 'yes')
+
 # Server hooks
 def on_starting(server):
-    server.log.info('Starting Ambienta server with optimized settings')
\ No newline at end of file
+    server.log.info('Starting Ambienta server with optimized settings')
+
+def when_ready(server):
+    # Runs in the master after the app is loaded (preload_app) and before forking
+    if not preload_app:
+        return
+    import gc
+    from ml_models.warmup import preload_ml
+    preload_ml(log=server.log)
+    # Keep the preloaded objects out of the GC generations so collections in
+    # the workers do not touch (and copy) the shared pages
+    gc.freeze()
+
+def pre_fork(server, worker):
+    # Never hand an open DB connection from the master to a worker
+    if preload_app:
+        from django.db import connections
+        connections.close_all()
+
+def post_fork(server, worker):
+    if preload_app:
+        from django.db import connections
+        connections.close_all()
+        from ml_models.warmup import get_process_memory, format_memory
+        server.log.info(f"Worker {worker.pid} forked: {format_memory(get_process_memory())}")
+
+# Warm the models in each worker (load + one synthetic inference per type) in
+# a background thread; /ml/api/ready/ answers 503 until it finishes.
+warmup_on_boot = os.environ.get('ML_WARMUP_ON_BOOT', 'true').lower() in ('1', 'true', 'yes')
+
+def post_worker_init(worker):
+    if warmup_on_boot:
+        from ml_models.warmup import warmup_state
+        warmup_state.start(log=worker.log)
+    if preload_app:
+        from ml_models.warmup import get_process_memory, format_memory
+        worker.log.info(f"Worker {worker.pid} ready: {format_memory(get_process_memory())}")
+
+def worker_exit(server, worker):
+    # Flush buffered ML predictions before the worker goes away
+    try:
+        from ml_models.prediction_sink import prediction_sink
+        prediction_sink.shutdown()
+        stats = prediction_sink.get_stats()
+        if preload_app:
+            from ml_models.warmup import get_process_memory, format_memory
+            server.log.info(f"Worker {worker.pid} exiting: {format_memory(get_process_memory())}")
+        server.log.info(
+            f"Worker {worker.pid}: ML predictions flushed={stats['flushed']} "
+            f"dropped={stats['dropped']} failed={stats['failed']}"
+        )
+    except Exception as e:
+        server.log.warning(f"Worker {worker.pid}: could not flush ML predictions: {e}")
@@ -1,22 +1,24 @@
 # backend/ml_models/admin.py
 
 from django.contrib import admin
-from .models import MLModel, MLPrediction, TrainingSession, ModelPerformanceMetric
+from .models import MLModel, MLPrediction, TrainingSession, ModelPerformanceMetric, ShadowPrediction
 
 
 @admin.register(MLModel)
 class MLModelAdmin(admin.ModelAdmin):
     list_display = [
-        'name', 'model_type', 'version', 'is_active', 
+        'name', 'model_type', 'version', 'is_active', 'is_shadow',
         'accuracy', 'r2_score', 'last_trained', 'created_at'
     ]
-    list_filter = ['model_type', 'is_active', 'created_at']
+    list_filter = ['model_type', 'is_active', 'is_shadow', 'created_at']
     search_fields = ['name', 'description']
-    readonly_fields = ['created_at', 'updated_at', 'model_data']
+    readonly_fields = [
+        'created_at', 'updated_at', 'artifact_path', 'artifact_checksum', 'artifact_size', 'artifact_raw_size'
+    ]
     
     fieldsets = (
         ('Informações Básicas', {
-            'fields': ('name', 'model_type', 'description', 'version', 'is_active')
+            'fields': ('name', 'model_type', 'description', 'version', 'is_active', 'is_shadow')
         }),
         ('Métricas de Performance', {
             'fields': ('accuracy', 'mse', 'mae', 'r2_score')
@@ -24,8 +26,12 @@ class MLModelAdmin(admin.ModelAdmin):
         ('Configurações', {
             'fields': ('hyperparameters',)
         }),
+        ('Artefato', {
+            'fields': ('artifact_path', 'artifact_checksum', 'artifact_size', 'artifact_raw_size'),
+            'classes': ('collapse',)
+        }),
         ('Timestamps', {
-            'fields': ('created_at', 'updated_at', 'last_trained', 'model_data'),
+            'fields': ('created_at', 'updated_at', 'last_trained'),
             'classes': ('collapse',)
         })
     )
@@ -60,12 +66,12 @@ class MLPredictionAdmin(admin.ModelAdmin):
 @admin.register(TrainingSession)
 class TrainingSessionAdmin(admin.ModelAdmin):
     list_display = [
-        'id', 'model', 'status', 'started_at', 'completed_at', 
-        'training_samples', 'get_duration'
+        'id', 'model', 'status', 'progress', 'started_at', 'completed_at', 
+        'training_samples', 'get_duration', 'wall_time_seconds', 'cpu_time_seconds'
     ]
     list_filter = ['status', 'started_at']
     readonly_fields = ['started_at', 'completed_at', 'get_duration']
-    raw_id_fields = ['model']
+    raw_id_fields = ['model', 'parent']
     
     def get_duration(self, obj):
         if obj.completed_at:
@@ -87,6 +93,17 @@ class TrainingSessionAdmin(admin.ModelAdmin):
             'fields': ('started_at', 'completed_at', 'get_duration'),
             'classes': ('collapse',)
         }),
+        ('Job em segundo plano', {
+            'fields': (
+                'parent', 'job_options', 'progress', 'progress_message',
+                'heartbeat_at', 'cancel_requested', 'worker'
+            ),
+            'classes': ('collapse',)
+        }),
+        ('Recursos', {
+            'fields': ('wall_time_seconds', 'cpu_time_seconds'),
+            'classes': ('collapse',)
+        }),
         ('Erros', {
             'fields': ('error_message',),
             'classes': ('collapse',)
@@ -116,3 +133,30 @@ class ModelPerformanceMetricAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         })
     )
+
+
+@admin.register(ShadowPrediction)
+class ShadowPredictionAdmin(admin.ModelAdmin):
+    list_display = [
+        'id', 'shadow_model', 'active_model', 'agreement', 'difference',
+        'active_latency_ms', 'shadow_latency_ms', 'created_at'
+    ]
+    list_filter = ['shadow_model__model_type', 'agreement', 'created_at']
+    readonly_fields = ['created_at']
+    raw_id_fields = ['shadow_model', 'active_model']
+    
+    fieldsets = (
+        ('Modelos', {
+            'fields': ('shadow_model', 'active_model')
+        }),
+        ('Predições', {
+            'fields': ('input_data', 'active_output', 'shadow_output')
+        }),
+        ('Comparação', {
+            'fields': ('agreement', 'difference', 'active_latency_ms', 'shadow_latency_ms', 'error_message')
+        }),
+        ('Timestamp', {
+            'fields': ('created_at',),
+            'classes': ('collapse',)
+        })
+    )
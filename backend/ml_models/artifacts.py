@@ -0,0 +1,343 @@
+# backend/ml_models/artifacts.py
+
+import hashlib
+import logging
+import lzma
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+import joblib
+from django.conf import settings
+from joblib.compressor import BinaryZlibFile
+
+logger = logging.getLogger(__name__)
+
+OBJECTS_DIR = 'objects'
+CACHE_DIR = 'cache'
+CHUNK_SIZE = 1024 * 1024
+# Objetos gravados ou reaproveitados há menos que isso antes da coleta são
+# mantidos: save() grava o objeto antes de o MLModel passar a apontar para ele
+GC_GRACE_SECONDS = 600
+
+# Compressão -> (extensão do objeto, abertura do arquivo compactado)
+CODECS = {
+    'zlib': ('.z', lambda path, mode: BinaryZlibFile(path, mode, compresslevel=3)),
+    'lzma': ('.xz', lambda path, mode: lzma.LZMAFile(path, mode, preset=3)),
+}
+
+
+class ModelArtifactStore:
+    """
+    Armazena os modelos treinados em ML_MODELS_DIR, endereçados por conteúdo
+
+    Cada artefato é o joblib.dump sem compressão do modelo, identificado
+    pelo SHA-256 desses bytes (o artifact_checksum do MLModel) e gravado em
+    objects/<2 primeiros>/<sha256>.joblib[.z|.xz], compactado conforme
+    ML_ARTIFACT_COMPRESSION. Versões com o mesmo conteúdo compartilham um
+    único objeto.
+
+    Carregar com mmap_mode='r' exige o arquivo sem compressão: na primeira
+    carga o objeto é descompactado em cache/<sha256>.joblib, e os arrays
+    NumPy grandes ficam mapeados em memória e compartilhados entre os
+    workers pelo page cache do sistema operacional. Assim só os modelos
+    em uso ocupam o tamanho descompactado em disco.
+
+    Caminhos antigos (<tipo>/<tipo>_v<versão>.joblib, sem compressão)
+    continuam sendo lidos; prune_ml_models --repack os move para objects/.
+
+    Os modelos carregados são mantidos em um pequeno cache LRU do processo,
+    indexado pelo caminho e checksum do artefato.
+    """
+
+    MAX_LOADED = 8
+
+    def __init__(self, base_dir=None):
+        self._base_dir = base_dir
+        self._lock = threading.Lock()
+        self._loaded = OrderedDict()
+
+    @property
+    def base_dir(self):
+        return self._base_dir or settings.ML_MODELS_DIR
+
+    @property
+    def compression(self):
+        """Compressão dos novos objetos ('zlib', 'lzma' ou None)"""
+        compression = getattr(settings, 'ML_ARTIFACT_COMPRESSION', 'zlib') or None
+        if compression == 'none':
+            return None
+        if compression not in CODECS:
+            raise ValueError(f"ML_ARTIFACT_COMPRESSION inválido: {compression}")
+        return compression
+
+    def resolve(self, path):
+        """Converte o caminho relativo salvo no banco em caminho absoluto"""
+        if os.path.isabs(path):
+            return path
+        return os.path.join(self.base_dir, path)
+
+    @staticmethod
+    def codec_of(path):
+        """Compressão do artefato pela extensão (None: joblib sem compressão)"""
+        for name, (extension, _) in CODECS.items():
+            if path.endswith(extension):
+                return name
+        return None
+
+    def _tmp_path(self, full_path):
+        return f'{full_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+    def _find_object(self, checksum):
+        """Caminho relativo do objeto com este conteúdo, em qualquer compressão"""
+        bucket = os.path.join(OBJECTS_DIR, checksum[:2])
+        try:
+            names = os.listdir(self.resolve(bucket))
+        except OSError:
+            return None
+        for name in names:
+            if name.startswith(f'{checksum}.joblib') and not name.endswith('.tmp'):
+                return os.path.join(bucket, name)
+        return None
+
+    def _store_file(self, source, checksum):
+        """
+        Grava o joblib sem compressão em `source` como objeto (se ainda não existir)
+
+        Returns:
+            str: caminho relativo do objeto
+        """
+        existing = self._find_object(checksum)
+        if existing is not None:
+            # Renova o mtime para a coleta não remover um objeto reaproveitado
+            # enquanto o registro que vai apontar para ele não é gravado
+            try:
+                os.utime(self.resolve(existing))
+                return existing
+            except FileNotFoundError:
+                pass
+
+        codec = self.compression
+        extension = CODECS[codec][0] if codec else ''
+        path = os.path.join(OBJECTS_DIR, checksum[:2], f'{checksum}.joblib{extension}')
+        full_path = self.resolve(path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+        tmp_path = self._tmp_path(full_path)
+        try:
+            if codec is None:
+                shutil.copyfile(source, tmp_path)
+            else:
+                with open(source, 'rb') as source_file, CODECS[codec][1](tmp_path, 'wb') as target_file:
+                    shutil.copyfileobj(source_file, target_file, CHUNK_SIZE)
+            os.replace(tmp_path, full_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return path
+
+    def save(self, model_data):
+        """
+        Grava o artefato de forma atômica (ou reaproveita o objeto idêntico)
+
+        Returns:
+            dict: {'path', 'checksum', 'size', 'raw_size'} para armazenar no
+                  MLModel; size é o tamanho em disco, raw_size o descompactado
+        """
+        objects_dir = self.resolve(OBJECTS_DIR)
+        os.makedirs(objects_dir, exist_ok=True)
+
+        tmp_path = self._tmp_path(os.path.join(objects_dir, 'artifact'))
+        try:
+            joblib.dump(model_data, tmp_path)
+            checksum = self.compute_checksum(tmp_path)
+            raw_size = os.path.getsize(tmp_path)
+            path = self._store_file(tmp_path, checksum)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        return {
+            'path': path,
+            'checksum': checksum,
+            'size': os.path.getsize(self.resolve(path)),
+            'raw_size': raw_size,
+        }
+
+    def repack(self, path):
+        """
+        Move um artefato de caminho antigo para objects/ (compactado)
+
+        O arquivo antigo não é removido aqui: outro MLModel pode apontar
+        para ele.
+
+        Returns:
+            dict: como save
+        """
+        if self.codec_of(path) is not None:
+            raise ValueError(f"Artefato já compactado: {path}")
+        source = self.resolve(path)
+        checksum = self.compute_checksum(source)
+        new_path = self._store_file(source, checksum)
+        return {
+            'path': new_path,
+            'checksum': checksum,
+            'size': os.path.getsize(self.resolve(new_path)),
+            'raw_size': os.path.getsize(source),
+        }
+
+    def _cache_path(self, path):
+        name = os.path.basename(path).split('.', 1)[0]
+        return os.path.join(self.resolve(CACHE_DIR), f'{name}.joblib')
+
+    def _materialize(self, path):
+        """
+        Cópia descompactada do objeto em cache/, criada na primeira carga
+
+        O SHA-256 é conferido durante a descompactação (o nome do objeto é o
+        checksum do conteúdo).
+        """
+        cache_path = self._cache_path(path)
+        if os.path.exists(cache_path):
+            return cache_path
+
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        expected = os.path.basename(cache_path).split('.', 1)[0]
+        tmp_path = self._tmp_path(cache_path)
+        try:
+            digest = hashlib.sha256()
+            with CODECS[self.codec_of(path)][1](self.resolve(path), 'rb') as source, open(tmp_path, 'wb') as target:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    target.write(chunk)
+            if digest.hexdigest() != expected:
+                raise ValueError(f"Artefato corrompido: {path}")
+            os.replace(tmp_path, cache_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return cache_path
+
+    def load(self, path, checksum=None, mmap=True):
+        """
+        Carrega um artefato, reutilizando a instância já carregada no processo
+
+        Args:
+            path: Caminho relativo (ou absoluto) do artefato
+            checksum: Checksum esperado; usado como parte da chave do cache
+            mmap: Se True, mapeia os arrays em memória (somente leitura)
+        """
+        full_path = self.resolve(path)
+        key = (full_path, checksum)
+
+        with self._lock:
+            if key in self._loaded:
+                self._loaded.move_to_end(key)
+                return self._loaded[key]
+
+        codec = self.codec_of(path)
+        if codec is None:
+            model_data = joblib.load(full_path, mmap_mode='r' if mmap else None)
+        elif mmap:
+            model_data = joblib.load(self._materialize(path), mmap_mode='r')
+        else:
+            with CODECS[codec][1](full_path, 'rb') as artifact_file:
+                model_data = joblib.load(artifact_file)
+
+        with self._lock:
+            self._loaded[key] = model_data
+            self._loaded.move_to_end(key)
+            while len(self._loaded) > self.MAX_LOADED:
+                self._loaded.popitem(last=False)
+
+        return model_data
+
+    def verify(self, path, checksum):
+        """Confere se o conteúdo em disco corresponde ao checksum registrado"""
+        codec = self.codec_of(path)
+        if codec is None:
+            return self.compute_checksum(self.resolve(path)) == checksum
+        digest = hashlib.sha256()
+        with CODECS[codec][1](self.resolve(path), 'rb') as artifact_file:
+            for chunk in iter(lambda: artifact_file.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest() == checksum
+
+    def delete(self, path):
+        """Remove o arquivo (e a cópia em cache/); confira antes se outro MLModel o usa"""
+        full_path = self.resolve(path)
+        with self._lock:
+            for key in [key for key in self._loaded if key[0] == full_path]:
+                del self._loaded[key]
+        for target in (full_path, self._cache_path(path) if self.codec_of(path) else None):
+            if target and os.path.exists(target):
+                os.remove(target)
+
+    def collect_garbage(self, referenced_paths, cached_checksums=(), dry_run=False, started_at=None):
+        """
+        Remove objetos que nenhum MLModel referencia e cópias em cache/ fora de uso
+
+        Args:
+            referenced_paths: artifact_path de todos os MLModel
+            cached_checksums: Checksums cuja cópia descompactada deve ficar
+                              (modelos ativos e em sombra); as demais são
+                              recriadas se o modelo voltar a ser carregado
+            started_at: Instante (time.time()) anterior à leitura de
+                        referenced_paths; objetos modificados a partir de
+                        GC_GRACE_SECONDS antes dele são mantidos, pois podem
+                        ser de um treino ou checkpoint em andamento
+
+        Returns:
+            dict: objects e cache (arquivos removidos) e freed (bytes)
+        """
+        referenced = {os.path.normpath(path) for path in referenced_paths if path}
+        cached_checksums = set(cached_checksums)
+        removed = {'objects': 0, 'cache': 0, 'freed': 0}
+        recent = (time.time() if started_at is None else started_at) - GC_GRACE_SECONDS
+
+        objects_dir = self.resolve(OBJECTS_DIR)
+        for root, _, names in os.walk(objects_dir):
+            for name in names:
+                full_path = os.path.join(root, name)
+                path = os.path.relpath(full_path, self.base_dir)
+                if path in referenced or name.endswith('.tmp'):
+                    continue
+                try:
+                    if os.path.getmtime(full_path) >= recent:
+                        continue
+                except FileNotFoundError:
+                    continue
+                removed['objects'] += 1
+                removed['freed'] += os.path.getsize(full_path)
+                if not dry_run:
+                    os.remove(full_path)
+
+        cache_dir = self.resolve(CACHE_DIR)
+        for name in os.listdir(cache_dir) if os.path.isdir(cache_dir) else []:
+            if name.endswith('.tmp') or name.split('.', 1)[0] in cached_checksums:
+                continue
+            full_path = os.path.join(cache_dir, name)
+            removed['cache'] += 1
+            removed['freed'] += os.path.getsize(full_path)
+            if not dry_run:
+                os.remove(full_path)
+
+        return removed
+
+    def clear(self):
+        """Esquece os modelos carregados neste processo"""
+        with self._lock:
+            self._loaded.clear()
+
+    @staticmethod
+    def compute_checksum(full_path):
+        digest = hashlib.sha256()
+        with open(full_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+
+artifact_store = ModelArtifactStore()
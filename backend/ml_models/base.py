@@ -1,9 +1,10 @@
 # backend/ml_models/base.py
 
 from django.utils import timezone
+from sklearn.pipeline import Pipeline
 from .cache import model_cache
+from .inference import predict_rows, transform_rows
 from .models import MLModel
-import joblib
 import threading
 
 class BaseMLModel:
@@ -35,7 +36,10 @@ class BaseMLModel:
                         ).first()
                         
                         if saved_model:
-                            self._model = joblib.load(saved_model.model_file.path)
+                            loaded = saved_model.load_model()
+                            if isinstance(loaded, dict):
+                                loaded = loaded.get('model')
+                            self._model = loaded
                             # Armazena no cache
                             model_cache.set(self._model_type, self._model)
                     except Exception as e:
@@ -45,6 +49,28 @@ class BaseMLModel:
         
         return self._model
     
+    @model.setter
+    def model(self, value):
+        """Permite injetar um modelo já carregado (ex.: MLModel.load_model())"""
+        if isinstance(value, dict):
+            # Artefatos salvos como {'model': ..., 'scaler': ...}
+            if value.get('scaler') is not None:
+                self.scaler = value['scaler']
+            value = value.get('model')
+        self._model = value
+    
+    def predict_rows(self, rows):
+        """
+        Predição sem pandas para linhas já na ordem de colunas do modelo
+        
+        O scaler separado só é aplicado quando foi ajustado e o modelo não
+        é um Pipeline (que já normaliza internamente).
+        """
+        scaler = getattr(self, '_scaler', None)
+        if scaler is not None and hasattr(scaler, 'scale_') and not isinstance(self.model, Pipeline):
+            rows = transform_rows(scaler, rows)
+        return predict_rows(self.model, rows)
+    
     def save_model(self, model_obj):
         """Salva o modelo no banco e atualiza o cache"""
         try:
@@ -2,43 +2,45 @@
 
 import threading
 from datetime import datetime, timedelta
-from django.core.cache import cache
+
 
 class MLModelCache:
     """
     Cache simples para modelos ML
+
+    Os modelos ficam em memória no próprio processo: o cache do Django
+    (LocMemCache) serializa cada valor com pickle, o que copiaria o modelo
+    inteiro a cada leitura e desfaria o compartilhamento dos arrays mapeados
+    em memória pelo artifact_store.
     """
     def __init__(self):
         self.CACHE_TTL = 3600  # 1 hora
         self._lock = threading.Lock()
-    
-    def get(self, key):
-        """Obtém modelo do cache"""
-        return cache.get(f'ml_model_{key}')
-    
+        self._cache = {}
+        self._last_access = {}
+
     def get(self, key):
         """Obtém modelo do cache"""
-        return cache.get(f'ml_model_{key}')
+        with self._lock:
+            if key not in self._cache:
+                return None
+            if datetime.now() - self._last_access[key] > timedelta(seconds=self.CACHE_TTL):
+                del self._cache[key]
+                del self._last_access[key]
+                return None
+            self._last_access[key] = datetime.now()
+            return self._cache[key]
 
-    def set(self, key, value):
-        """Armazena modelo no cache"""
-        cache.set(f'ml_model_{key}', value, self.CACHE_TTL)
-    
-    def clear(self):
-        """Limpa o cache"""
-        for key in ['temperature_prediction', 'fan_optimization', 'anomaly_detection']:
-            cache.delete(f'ml_model_{key}')
-    
     def set(self, key, value):
         """Armazena um modelo no cache"""
         with self._lock:
             self._cache[key] = value
             self._last_access[key] = datetime.now()
-    
+
     def clear(self):
         """Limpa o cache"""
         with self._lock:
             self._cache.clear()
             self._last_access.clear()
 
-model_cache = MLModelCache()
\ No newline at end of file
+model_cache = MLModelCache()
@@ -0,0 +1,227 @@
+# backend/ml_models/deadline.py
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceDeadline:
+    """
+    Executa chamadas de inferência com orçamento de latência
+
+    A chamada roda em um pool de threads limitado e quem chama espera no
+    máximo o orçamento (ML_INFERENCE_BUDGET_MS, ou ML_INFERENCE_BUDGETS por
+    operação). Se o prazo estourar (modelo frio, banco lento), o fallback
+    baseado em regras é retornado e a perda de prazo é contabilizada.
+
+    Threads não podem ser interrompidas: a chamada atrasada continua em
+    segundo plano (e aquece o modelo para as próximas). Quando todas as
+    threads do pool estão ocupadas, novas chamadas vão direto para o
+    fallback em vez de enfileirar atrás das lentas.
+    """
+
+    LATENCY_SAMPLES = 1000
+
+    def __init__(self, max_workers=None, max_pending=None):
+        self._max_workers = max_workers
+        self._max_pending = max_pending
+        self._reset()
+
+    def _reset(self):
+        """(Re)inicializa o estado interno - usado também após um fork"""
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+        self._async_pending = 0
+        self._stats = {}
+
+    @property
+    def max_workers(self):
+        if self._max_workers is None:
+            return getattr(settings, 'ML_INFERENCE_WORKERS', 4)
+        return self._max_workers
+
+    @property
+    def max_pending(self):
+        if self._max_pending is None:
+            return getattr(settings, 'ML_INFERENCE_MAX_PENDING', 64)
+        return self._max_pending
+
+    def get_budget_ms(self, name):
+        """Orçamento em milissegundos da operação (0 desativa o limite)"""
+        budgets = getattr(settings, 'ML_INFERENCE_BUDGETS', {})
+        return budgets.get(name, getattr(settings, 'ML_INFERENCE_BUDGET_MS', 250))
+
+    def run(self, name, func, *args, fallback, budget_ms=None, **kwargs):
+        """
+        Executa func(*args, **kwargs) dentro do orçamento
+
+        Args:
+            name: Nome da operação (usado nos contadores e no orçamento)
+            fallback: Função sem argumentos que produz a resposta baseada em
+                      regras quando o prazo não é cumprido
+            budget_ms: Sobrescreve o orçamento configurado
+        """
+        if self._pid != os.getpid():
+            self._reset()
+
+        budget = self.get_budget_ms(name) if budget_ms is None else budget_ms
+        if not budget or budget <= 0:
+            return func(*args, **kwargs)
+
+        if not self._slots.acquire(blocking=False):
+            self._record(name, 'rejected')
+            return fallback()
+
+        start = time.perf_counter()
+        try:
+            future = self._get_executor().submit(self._call, func, args, kwargs)
+        except RuntimeError:
+            # Executor encerrado (ex.: processo saindo)
+            self._slots.release()
+            self._record(name, 'rejected')
+            return fallback()
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            result = future.result(timeout=budget / 1000)
+        except FutureTimeoutError:
+            self._record(name, 'timeouts')
+            logger.warning(f"Inferência {name} excedeu o orçamento de {budget}ms - usando regras")
+            return fallback()
+        except Exception as e:
+            self._record(name, 'errors')
+            logger.error(f"Erro na inferência {name}: {str(e)}")
+            return fallback()
+
+        self._record(name, 'completed', time.perf_counter() - start)
+        return result
+
+    async def arun(self, name, func, *args, fallback=None, budget_ms=None, **kwargs):
+        """
+        Versão assíncrona de run para as views ASGI (ver views_async.py)
+
+        A chamada vai para o mesmo pool limitado e o event loop fica livre
+        enquanto ela roda. Ao contrário de run, chamadas além do número de
+        threads aguardam na fila do pool (até ML_INFERENCE_MAX_PENDING) em vez
+        de cair direto no fallback; o tempo na fila conta no orçamento e a
+        chamada que ainda não começou é cancelada quando o prazo estoura.
+
+        Args:
+            fallback: Função sem argumentos usada quando o prazo não é
+                      cumprido ou a chamada falha. Sem fallback, o erro é
+                      propagado (asyncio.TimeoutError no caso do prazo).
+        """
+        if self._pid != os.getpid():
+            self._reset()
+
+        budget = self.get_budget_ms(name) if budget_ms is None else budget_ms
+
+        with self._lock:
+            rejected = self._async_pending >= self.max_pending
+            if not rejected:
+                self._async_pending += 1
+        if rejected:
+            self._record(name, 'rejected')
+            if fallback is None:
+                raise RuntimeError(f"Fila de inferência cheia ({self.max_pending} chamadas pendentes)")
+            return fallback()
+
+        start = time.perf_counter()
+        try:
+            future = asyncio.wrap_future(self._get_executor().submit(self._call, func, args, kwargs))
+            if budget and budget > 0:
+                result = await asyncio.wait_for(future, budget / 1000)
+            else:
+                result = await future
+        except asyncio.TimeoutError:
+            self._record(name, 'timeouts')
+            if fallback is None:
+                raise
+            logger.warning(f"Inferência {name} excedeu o orçamento de {budget}ms - usando regras")
+            return fallback()
+        except Exception as e:
+            self._record(name, 'errors')
+            if fallback is None:
+                raise
+            logger.error(f"Erro na inferência {name}: {str(e)}")
+            return fallback()
+        finally:
+            with self._lock:
+                self._async_pending -= 1
+
+        self._record(name, 'completed', time.perf_counter() - start)
+        return result
+
+    def get_stats(self):
+        """Contadores e latências (ms) por operação"""
+        with self._lock:
+            stats = {}
+            for name, counters in self._stats.items():
+                latencies = np.array(counters['latencies']) * 1000
+                calls = counters['calls']
+                stats[name] = {
+                    'budget_ms': self.get_budget_ms(name),
+                    'calls': calls,
+                    'completed': counters['completed'],
+                    'timeouts': counters['timeouts'],
+                    'errors': counters['errors'],
+                    'rejected': counters['rejected'],
+                    'miss_rate': round((calls - counters['completed']) / calls, 4) if calls else 0.0,
+                    'p50_ms': round(float(np.percentile(latencies, 50)), 2) if len(latencies) else None,
+                    'p99_ms': round(float(np.percentile(latencies, 99)), 2) if len(latencies) else None,
+                }
+            return stats
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='ml-inference'
+                )
+            return self._executor
+
+    @staticmethod
+    def _call(func, args, kwargs):
+        # Cada thread do pool mantém a própria conexão com o banco
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    def _record(self, name, outcome, latency=None):
+        with self._lock:
+            counters = self._stats.setdefault(name, {
+                'calls': 0,
+                'completed': 0,
+                'timeouts': 0,
+                'errors': 0,
+                'rejected': 0,
+                'latencies': deque(maxlen=self.LATENCY_SAMPLES),
+            })
+            counters['calls'] += 1
+            counters[outcome] += 1
+            if latency is not None:
+                counters['latencies'].append(latency)
+
+
+inference_deadline = InferenceDeadline()
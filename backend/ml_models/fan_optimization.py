@@ -2,77 +2,136 @@ import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
 import joblib
-from datetime import datetime, timedelta
-from django.db.models import Avg, StdDev
+from datetime import datetime, timedelta, timezone as dt_timezone
 from django.utils import timezone
 
+from .features import calendar, state_at, trailing_stats
 from .models import MLModel, MLPrediction
+from .snapshots import snapshot_store
 from sensors.models import Reading, FanState, FanLog
 
+# Instantes em microssegundos desde o epoch (inteiros: limites de janela exatos)
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+FEATURE_WINDOW = timedelta(hours=3) // MICROSECOND
+LABEL_WINDOW = timedelta(minutes=30) // MICROSECOND
+
+
+def _to_micros(moment):
+    return (moment - EPOCH) // MICROSECOND
+
+
+def _from_micros(value):
+    return EPOCH + timedelta(microseconds=int(value))
+
+
+def _reading_arrays(readings):
+    """Instantes (µs) e temperaturas das leituras, na ordem recebida"""
+    if hasattr(readings, 'values_list'):
+        rows = list(readings.values_list('timestamp', 'temperature'))
+    else:
+        rows = [(reading.timestamp, reading.temperature) for reading in readings]
+    times = np.fromiter((_to_micros(row[0]) for row in rows), dtype=np.int64, count=len(rows))
+    temps = np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows))
+    return times, temps
+
+
+def _load_readings(start, end):
+    """Todas as leituras de [start, end] ordenadas por instante (snapshot colunar)"""
+    columns = snapshot_store.load('readings', _from_micros(start), _from_micros(end))
+    return columns['timestamp'], columns['temperature']
+
+
+def _load_fan_states(start, end):
+    """
+    Estados do ventilador até `end`, a partir do último anterior a `start`
+
+    Returns:
+        tuple: (instantes em µs ordenados, 1 ligado / 0 desligado)
+    """
+    previous = FanState.objects.filter(timestamp__lt=_from_micros(start)).order_by('-timestamp')
+    rows = list(previous.values_list('timestamp', 'state')[:1]) + list(FanState.objects.filter(
+        timestamp__gte=_from_micros(start),
+        timestamp__lte=_from_micros(end)
+    ).order_by('timestamp', 'id').values_list('timestamp', 'state'))
+    times = np.fromiter((_to_micros(row[0]) for row in rows), dtype=np.int64, count=len(rows))
+    states = np.fromiter((1 if row[1] else 0 for row in rows), dtype=np.int64, count=len(rows))
+    return times, states
+
+
 class FanOptimizationModel:
     def __init__(self):
         self.model = None
         self.scaler = StandardScaler()
         
     def prepare_features(self, readings, current_hour, current_day):
-        """Prepara as features para o modelo."""
-        features = []
-        for reading in readings:
-            # Características temporais
-            reading_hour = reading.timestamp.hour
-            reading_day = reading.timestamp.weekday()
-            
-            # Características de temperatura
-            temp = reading.temperature
-            
-            # Histórico de uso do ventilador
-            fan_state = FanState.objects.filter(timestamp__lte=reading.timestamp).order_by('-timestamp').first()
-            fan_active = 1 if fan_state and fan_state.state else 0
-            
-            # Calcular média e desvio das últimas horas
-            past_readings = Reading.objects.filter(
-                timestamp__lt=reading.timestamp,
-                timestamp__gte=reading.timestamp - timedelta(hours=3)
-            )
-            temp_mean = past_readings.values_list('temperature', flat=True).aggregate(Avg('temperature'))['temperature__avg'] or temp
-            temp_std = past_readings.values_list('temperature', flat=True).aggregate(StdDev('temperature'))['temperature__std'] or 0
-            
-            features.append([
-                temp,               # Temperatura atual
-                temp_mean,         # Média de temperatura (3h)
-                temp_std,          # Desvio padrão (3h)
-                reading_hour,      # Hora do dia (0-23)
-                reading_day,       # Dia da semana (0-6)
-                fan_active,        # Estado anterior do ventilador
-            ])
-            
-        return np.array(features)
+        """
+        Prepara as features para o modelo.
+        
+        Uma consulta de leituras e uma de estados para todo o conjunto:
+        média e desvio populacional de [t - 3h, t) vêm de somas acumuladas
+        por janela (np.searchsorted) e o estado do ventilador do último
+        FanState em ou antes de t (join as-of), como nas consultas por
+        leitura que substituem.
+        """
+        times, temps = _reading_arrays(readings)
+        if not len(times):
+            return np.empty((0, 6))
+        
+        context_times, context_temps = _load_readings(times.min() - FEATURE_WINDOW, times.max())
+        
+        # Janela [t - 3h, t): leituras anteriores à própria, de qualquer origem
+        window_mean, window_std, count = trailing_stats(times, context_times, context_temps, FEATURE_WINDOW)
+        has_past = count > 0
+        temp_mean = np.where(has_past, window_mean, temps)
+        temp_std = np.where(has_past, window_std, 0.0)
+        # Avg/StdDev iguais a 0 caíam no "or" das consultas originais
+        temp_mean = np.where(temp_mean == 0, temps, temp_mean)
+        
+        # Histórico de uso do ventilador: último estado em ou antes de t
+        state_times, states = _load_fan_states(times.min(), times.max())
+        fan_active = state_at(times, state_times, states)
+        
+        hour, day_of_week, _ = calendar(times)
+        
+        return np.column_stack([
+            temps,                  # Temperatura atual
+            temp_mean,              # Média de temperatura (3h)
+            temp_std,               # Desvio padrão (3h)
+            hour,                   # Hora do dia (0-23)
+            day_of_week,            # Dia da semana (0-6)
+            fan_active,             # Estado anterior do ventilador
+        ]).astype(np.float64)
 
     def prepare_labels(self, readings):
-        """Prepara os labels (se o ventilador deveria estar ligado ou não)."""
-        labels = []
-        for reading in readings:
-            # Verifica se a temperatura estava alta
-            temp_high = reading.temperature > 25.0
-            
-            # Verifica se o ventilador foi efetivo (temperatura reduziu nas próximas leituras)
-            future_readings = Reading.objects.filter(
-                timestamp__gt=reading.timestamp,
-                timestamp__lte=reading.timestamp + timedelta(minutes=30)
-            ).order_by('timestamp')
-            
-            fan_effective = False
-            if future_readings.exists():
-                temp_reduction = reading.temperature - future_readings.last().temperature
-                fan_effective = temp_reduction > 0.5  # Redução de 0.5°C ou mais
-            
-            # O ventilador deveria estar ligado se:
-            # 1. A temperatura estava alta E
-            # 2. O uso do ventilador foi efetivo OU ainda não temos dados de efetividade
-            should_be_on = temp_high and (fan_effective or not future_readings.exists())
-            labels.append(1 if should_be_on else 0)
-            
-        return np.array(labels)
+        """
+        Prepara os labels (se o ventilador deveria estar ligado ou não).
+        
+        A efetividade usa a janela à frente (t, t + 30min] sobre as leituras
+        ordenadas: a última leitura da janela é a de índice hi - 1.
+        """
+        times, temps = _reading_arrays(readings)
+        if not len(times):
+            return np.empty(0, dtype=int)
+        
+        context_times, context_temps = _load_readings(times.min(), times.max() + LABEL_WINDOW)
+        
+        lo = np.searchsorted(context_times, times, side='right')
+        hi = np.searchsorted(context_times, times + LABEL_WINDOW, side='right')
+        has_future = hi > lo
+        
+        # Verifica se a temperatura estava alta
+        temp_high = temps > 25.0
+        
+        # Verifica se o ventilador foi efetivo (redução de 0.5°C ou mais)
+        last_future = context_temps[np.maximum(hi - 1, 0)] if len(context_temps) else temps
+        fan_effective = has_future & (temps - last_future > 0.5)
+        
+        # O ventilador deveria estar ligado se:
+        # 1. A temperatura estava alta E
+        # 2. O uso do ventilador foi efetivo OU ainda não temos dados de efetividade
+        should_be_on = temp_high & (fan_effective | ~has_future)
+        return should_be_on.astype(int)
 
     def train(self):
         """Treina o modelo com dados históricos."""
@@ -0,0 +1,216 @@
+# backend/ml_models/features.py
+
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from numpy.lib.stride_tricks import sliding_window_view
+
+logger = logging.getLogger(__name__)
+
+# Janelas das features de leitura; DeviceStats (online_stats.py) usa as
+# mesmas na inferência, calculando-as incrementalmente a cada leitura
+LAG_WINDOW = 3
+ANOMALY_WINDOW = 5
+
+MICROS_PER_HOUR = 3600 * 1_000_000
+MICROS_PER_DAY = 24 * MICROS_PER_HOUR
+# 01/01/1970 foi uma quinta-feira (dayofweek 3)
+EPOCH_DAY_OF_WEEK = 3
+
+# Features por leitura calculadas por compute_features
+FEATURE_COLUMNS = (
+    'hour', 'day_of_week', 'month',
+    'temp_lag_1', 'temp_lag_2', 'temp_lag_3',
+    'temp_rolling_mean_3', 'temp_rolling_std_3',
+    'temp_diff', 'temp_rolling_mean', 'temp_deviation',
+    'fan_state',
+)
+
+
+def to_micros(timestamps):
+    """Instantes em µs desde o epoch (aceita datetimes, Series ou inteiros em µs)"""
+    if isinstance(timestamps, np.ndarray) and timestamps.dtype.kind == 'i':
+        return timestamps.astype(np.int64, copy=False)
+    moments = pd.to_datetime(pd.Series(timestamps), utc=True)
+    return ((moments - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(microseconds=1)).to_numpy(dtype=np.int64)
+
+
+def calendar(times):
+    """Hora, dia da semana (segunda = 0) e mês em UTC, como Series.dt"""
+    hour = (times // MICROS_PER_HOUR) % 24
+    day_of_week = (times // MICROS_PER_DAY + EPOCH_DAY_OF_WEEK) % 7
+    month = times.astype('datetime64[us]').astype('datetime64[M]').astype(np.int64) % 12 + 1
+    return hour, day_of_week, month
+
+
+def lag(values, periods):
+    """Como Series.shift(periods): NaN nas primeiras posições"""
+    shifted = np.full(len(values), np.nan)
+    if periods < len(values):
+        shifted[periods:] = values[:len(values) - periods]
+    return shifted
+
+
+def rolling_mean(values, window):
+    """Como Series.rolling(window).mean()"""
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        result[window - 1:] = sliding_window_view(values, window).mean(axis=1)
+    return result
+
+
+def rolling_std(values, window):
+    """Como Series.rolling(window).std(): desvio amostral (ddof=1)"""
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        result[window - 1:] = sliding_window_view(values, window).std(axis=1, ddof=1)
+    return result
+
+
+def state_at(times, state_times, states):
+    """Último estado em ou antes de cada instante (join as-of), 0 antes do primeiro"""
+    if not len(state_times):
+        return np.zeros(len(times), dtype=np.int64)
+    position = np.searchsorted(state_times, times, side='right') - 1
+    return np.where(position >= 0, np.asarray(states, dtype=np.int64)[np.maximum(position, 0)], 0)
+
+
+def trailing_stats(times, context_times, context_values, window):
+    """
+    Média e desvio populacional de [t - window, t) para cada instante
+
+    Somas acumuladas por janela (np.searchsorted) sobre o contexto
+    ordenado; instantes sem leituras anteriores na janela recebem count 0
+    e média/desvio NaN.
+
+    Returns:
+        tuple: (média, desvio, count)
+    """
+    lo = np.searchsorted(context_times, times - window, side='left')
+    hi = np.searchsorted(context_times, times, side='left')
+    count = hi - lo
+
+    # Centraliza antes de acumular para não perder precisão na variância
+    offset = context_values.mean() if len(context_values) else 0.0
+    centered = context_values - offset
+    sums = np.concatenate([[0.0], np.cumsum(centered)])
+    squares = np.concatenate([[0.0], np.cumsum(centered ** 2)])
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (sums[hi] - sums[lo]) / count
+        variance = (squares[hi] - squares[lo]) / count - mean ** 2
+    return mean + offset, np.sqrt(np.clip(variance, 0, None)), count
+
+
+def compute_features(times, temperatures, state_times=None, states=None):
+    """
+    Features de cada leitura, em lote, a partir de arrays ordenados
+
+    Definição única das features de treino: calendário, lags e média/desvio
+    móveis da previsão de temperatura, diferença e desvio da média móvel da
+    detecção de anomalias e o estado do ventilador (as-of).
+
+    Args:
+        times: Instantes das leituras em µs, em ordem
+        temperatures: Temperatura de cada leitura
+        state_times, states: Estados do ventilador ordenados (opcional)
+
+    Returns:
+        dict: coluna de FEATURE_COLUMNS -> array
+    """
+    times = to_micros(times)
+    temperatures = np.asarray(temperatures, dtype=np.float64)
+    hour, day_of_week, month = calendar(times)
+    anomaly_mean = rolling_mean(temperatures, ANOMALY_WINDOW)
+
+    features = {
+        'hour': hour,
+        'day_of_week': day_of_week,
+        'month': month,
+        **{f'temp_lag_{periods}': lag(temperatures, periods) for periods in range(1, LAG_WINDOW + 1)},
+        f'temp_rolling_mean_{LAG_WINDOW}': rolling_mean(temperatures, LAG_WINDOW),
+        f'temp_rolling_std_{LAG_WINDOW}': rolling_std(temperatures, LAG_WINDOW),
+        'temp_diff': temperatures - lag(temperatures, 1),
+        'temp_rolling_mean': anomaly_mean,
+        'temp_deviation': np.abs(temperatures - anomaly_mean),
+        'fan_state': state_at(times, to_micros(state_times), states) if state_times is not None
+        else np.zeros(len(times), dtype=np.int64),
+    }
+    return features
+
+
+class FeatureStore:
+    """
+    Features de treino calculadas uma vez por janela de dados
+
+    A chave é o conteúdo da janela (linhas, ids e instantes extremos das
+    leituras e dos estados), então os modelos treinados sobre o mesmo
+    snapshot recebem o mesmo DataFrame sem recalcular. Mantém as
+    ML_FEATURE_CACHE_WINDOWS janelas usadas mais recentemente.
+
+    O DataFrame devolvido é compartilhado: quem precisar alterá-lo deve
+    trabalhar sobre uma cópia (ex.: df[colunas]).
+    """
+
+    def __init__(self, max_windows=None):
+        self._max_windows = max_windows
+        self._lock = threading.Lock()
+        self._frames = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_windows(self):
+        return self._max_windows or getattr(settings, 'ML_FEATURE_CACHE_WINDOWS', 4)
+
+    @staticmethod
+    def _signature(df):
+        if df is None or df.empty:
+            return (0,)
+        ids = df['id'].to_numpy()
+        return (len(df), int(ids[0]), int(ids.max()), df['timestamp'].iloc[0], df['timestamp'].iloc[-1])
+
+    def frame(self, readings, fan_states=None):
+        """
+        Leituras (id, timestamp, temperature, ordenadas por instante) com as features
+
+        Args:
+            readings: DataFrame do snapshot (ver snapshots.frame)
+            fan_states: Estados do ventilador do mesmo período (opcional)
+        """
+        key = (self._signature(readings), self._signature(fan_states))
+        with self._lock:
+            cached = self._frames.get(key)
+            if cached is not None:
+                self._frames.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        df = readings.reset_index(drop=True)
+        has_states = fan_states is not None and not fan_states.empty
+        features = compute_features(
+            df['timestamp'],
+            df['temperature'],
+            fan_states['timestamp'] if has_states else None,
+            fan_states['state'].to_numpy() if has_states else None
+        )
+        df = pd.concat([df, pd.DataFrame(features, index=df.index)], axis=1)
+
+        with self._lock:
+            self._frames[key] = df
+            self._frames.move_to_end(key)
+            while len(self._frames) > self.max_windows:
+                self._frames.popitem(last=False)
+        return df
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+
+
+feature_store = FeatureStore()
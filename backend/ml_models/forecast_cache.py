@@ -0,0 +1,144 @@
+# backend/ml_models/forecast_cache.py
+
+import logging
+import threading
+from collections import OrderedDict
+
+from .online_stats import DEFAULT_DEVICE_ID
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingForecast:
+    """Previsão em cálculo, aguardada pelas requisições idênticas"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ForecastCache:
+    """
+    Memoriza a previsão de temperatura por leitura mais recente
+
+    A chave é (dispositivo, id da última leitura, modelo, versão e checksum
+    do artefato): enquanto não chega leitura nova e o modelo ativo não muda,
+    a previsão é a mesma. Cada entrada é calculada uma única vez para o
+    horizonte máximo e recortada para pedidos menores, já que a previsão
+    de N horas (recursiva ou direta) é o prefixo da de MAX_HORIZON horas.
+
+    Requisições idênticas simultâneas aguardam o mesmo cálculo em vez de
+    repeti-lo. Novas leituras invalidam as entradas do dispositivo pelo
+    signal post_save de Reading (ver signals.py).
+    """
+
+    MAX_HORIZON = 24
+    MAX_ENTRIES = 32
+    WAIT_TIMEOUT = 30
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'invalidations': 0,
+        }
+
+    def get_forecast(self, ml_model, hours_ahead, compute, device_id=DEFAULT_DEVICE_ID):
+        """
+        Retorna as temperaturas previstas para as próximas hours_ahead horas
+
+        Args:
+            ml_model: MLModel ativo de temperature_prediction
+            hours_ahead: Horizonte pedido
+            compute: Função que recebe o horizonte e retorna a lista de
+                     previsões (ex.: TemperaturePredictionModel.predict)
+        """
+        # cached[:-5] devolveria quase toda a previsão; o laço recursivo não
+        # gerava nenhuma hora
+        if hours_ahead < 1:
+            return []
+        horizon = max(hours_ahead, self.MAX_HORIZON)
+        key = self.build_key(ml_model, device_id)
+
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and len(cached) >= hours_ahead:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return list(cached[:hours_ahead])
+
+            pending = self._pending.get(key)
+            leader = pending is None
+            if leader:
+                pending = self._pending[key] = _PendingForecast()
+                self._stats['misses'] += 1
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            if not pending.event.wait(self.WAIT_TIMEOUT):
+                raise TimeoutError("Tempo esgotado aguardando a previsão em andamento")
+            if pending.error is not None:
+                raise pending.error
+            if len(pending.result) >= hours_ahead:
+                return list(pending.result[:hours_ahead])
+            return list(compute(hours_ahead))
+
+        try:
+            pending.result = [float(value) for value in compute(horizon)]
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+                if pending.error is None:
+                    self._entries[key] = pending.result
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.MAX_ENTRIES:
+                        self._entries.popitem(last=False)
+            pending.event.set()
+
+        return list(pending.result[:hours_ahead])
+
+    def build_key(self, ml_model, device_id=DEFAULT_DEVICE_ID):
+        return (
+            device_id,
+            self._latest_reading_id(),
+            ml_model.pk,
+            ml_model.version,
+            ml_model.artifact_checksum,
+        )
+
+    def invalidate(self, device_id=DEFAULT_DEVICE_ID):
+        """Descarta as previsões memorizadas de um dispositivo"""
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == device_id]
+            for key in stale:
+                del self._entries[key]
+            if stale:
+                self._stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        with self._lock:
+            return {**self._stats, 'entries': len(self._entries)}
+
+    @staticmethod
+    def _latest_reading_id():
+        from sensors.models import Reading
+
+        # Consulta pela chave primária: não depende das estatísticas em
+        # memória, que só veem as leituras recebidas por este processo
+        return Reading.objects.order_by('-id').values_list('id', flat=True).first()
+
+
+forecast_cache = ForecastCache()
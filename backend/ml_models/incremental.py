@@ -0,0 +1,276 @@
+# backend/ml_models/incremental.py
+
+import logging
+import math
+from collections import deque
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+import pandas as pd
+from django.utils import timezone
+from sklearn.exceptions import NotFittedError
+from sklearn.linear_model import SGDRegressor
+from sklearn.preprocessing import StandardScaler
+
+from sensors.models import Reading, FanState
+from .artifacts import artifact_store
+from .models import MLModel
+from .ml_algorithms import TemperaturePredictionModel, FanOptimizationModel
+from .verification import load_readings
+
+logger = logging.getLogger(__name__)
+
+# Variáveis cíclicas expandidas em seno/cosseno para o modelo linear
+CYCLIC_FEATURES = {'hour': 24, 'day_of_week': 7}
+
+
+class IncrementalRegressor:
+    """
+    Regressor linear atualizado em micro-lotes com partial_fit
+
+    O StandardScaler e o SGDRegressor são atualizados a cada lote, sem
+    reajustar o histórico. Segue o contrato usado pela inferência
+    (feature_names_in_ e predict sobre as linhas na ordem das colunas),
+    então pode ser servido como qualquer outro artefato.
+
+    O erro de cada lote é medido antes do ajuste (avaliação prequencial):
+    recent_mae é o MAE das últimas `window` amostras ainda não vistas.
+    """
+
+    def __init__(self, feature_columns, alpha=1e-4, eta0=0.01, window=1000):
+        self.feature_names_in_ = np.array(feature_columns, dtype=object)
+        self.n_features_in_ = len(feature_columns)
+        self.scaler = StandardScaler()
+        self.regressor = SGDRegressor(
+            loss='squared_error',
+            penalty='l2',
+            alpha=alpha,
+            learning_rate='invscaling',
+            eta0=eta0,
+            random_state=42
+        )
+        self.n_samples_seen_ = 0
+        self.recent_errors = deque(maxlen=window)
+        # Posição do fluxo já incorporada (id da leitura ou instante do estado)
+        self.watermark = None
+
+    def _expand(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        columns = list(self.feature_names_in_)
+        parts = [X]
+        for column, period in CYCLIC_FEATURES.items():
+            if column in columns:
+                angle = 2 * math.pi * X[:, columns.index(column)] / period
+                parts.append(np.column_stack([np.sin(angle), np.cos(angle)]))
+        return np.hstack(parts)
+
+    def partial_fit(self, X, y):
+        y = np.asarray(y, dtype=np.float64)
+        if not len(y):
+            return self
+        if self.n_samples_seen_:
+            self.recent_errors.extend(np.abs(self.predict(X) - y))
+
+        Z = self._expand(X)
+        self.scaler.partial_fit(Z)
+        self.regressor.partial_fit(self.scaler.transform(Z), y)
+        self.n_samples_seen_ += len(y)
+        return self
+
+    def predict(self, X):
+        if not self.n_samples_seen_:
+            raise NotFittedError("IncrementalRegressor ainda não recebeu amostras")
+        return self.regressor.predict(self.scaler.transform(self._expand(X)))
+
+    @property
+    def recent_mae(self):
+        if not self.recent_errors:
+            return None
+        return float(np.mean(self.recent_errors))
+
+
+def _temperature_batches(learner, batch_size, since):
+    """
+    Lotes (X, y, watermark) das leituras posteriores à watermark (id)
+
+    Os lags de cada lote usam as três leituras anteriores a ele, então o
+    resultado é o mesmo de prepare_features sobre o histórico inteiro.
+    """
+    temp_model = TemperaturePredictionModel()
+    columns = temp_model.feature_columns
+
+    queryset = Reading.objects.all()
+    if learner.watermark is None:
+        queryset = queryset.filter(timestamp__gte=since)
+        context = []
+    else:
+        queryset = queryset.filter(id__gt=learner.watermark)
+        context = list(reversed(Reading.objects.filter(
+            id__lte=learner.watermark
+        ).order_by('-id').values_list('id', 'timestamp', 'temperature')[:3]))
+
+    last_id = learner.watermark or 0
+    while True:
+        page = list(queryset.filter(id__gt=last_id).order_by('id').values_list(
+            'id', 'timestamp', 'temperature'
+        )[:batch_size])
+        if not page:
+            return
+
+        df = pd.DataFrame(context + page, columns=['id', 'timestamp', 'temperature'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        df = temp_model.prepare_features(df).iloc[len(context):]
+        df = df.dropna(subset=columns)
+
+        last_id = page[-1][0]
+        context = page[-3:]
+        yield df[columns].to_numpy(dtype=np.float64), df['temperature'].to_numpy(), last_id
+
+
+def _cooling_batches(learner, batch_size, since):
+    """
+    Lotes (X, y, watermark) dos ciclos do ventilador após a watermark
+
+    A watermark é o instante (s) do último estado ligado usado: ele abre
+    o primeiro ciclo da próxima execução.
+    """
+    fan_model = FanOptimizationModel()
+    start = since if learner.watermark is None else datetime.fromtimestamp(learner.watermark, tz=dt_timezone.utc)
+
+    state_times = np.fromiter(
+        (timestamp.timestamp() for timestamp in FanState.objects.filter(
+            timestamp__gte=start,
+            state=True
+        ).order_by('timestamp').values_list('timestamp', flat=True)),
+        dtype=np.float64
+    )
+    if len(state_times) < 2:
+        return
+
+    reading_times, temperatures = load_readings(
+        datetime.fromtimestamp(state_times[0], tz=dt_timezone.utc),
+        datetime.fromtimestamp(state_times[-1], tz=dt_timezone.utc)
+    )
+    cycles = fan_model.cycles_frame(state_times, reading_times, temperatures)
+    X = cycles[fan_model.feature_columns].to_numpy(dtype=np.float64)
+    y = cycles['cooling_efficiency'].to_numpy()
+
+    for offset in range(0, len(X), batch_size):
+        yield X[offset:offset + batch_size], y[offset:offset + batch_size], None
+    # Só avança depois de todos os ciclos: o último estado abre o próximo
+    yield np.empty((0, X.shape[1])), np.empty(0), float(state_times[-1])
+
+
+STREAMS = {
+    'temperature_prediction': (lambda: TemperaturePredictionModel().feature_columns, _temperature_batches),
+    'fan_optimization': (lambda: FanOptimizationModel().feature_columns, _cooling_batches),
+}
+
+
+def get_learner_model(model_type):
+    """MLModel mais recente do modo incremental para o tipo (ou None)"""
+    return MLModel.objects.filter(
+        model_type=model_type,
+        hyperparameters__learner='incremental'
+    ).order_by('-created_at').first()
+
+
+def create_learner_model(model_type):
+    """Registra um MLModel inativo para o aprendiz incremental do tipo"""
+    now = timezone.now()
+    ml_model = MLModel.objects.create(
+        name=f"{dict(MLModel.MODEL_TYPES)[model_type]} (incremental)",
+        model_type=model_type,
+        version=f"online-{now:%Y%m%d%H%M}",
+        description='Atualizado em micro-lotes por update_online_models',
+        is_active=False,
+        hyperparameters={'learner': 'incremental'}
+    )
+    return ml_model, IncrementalRegressor(STREAMS[model_type][0]())
+
+
+def load_learner(ml_model):
+    """
+    Cópia gravável do aprendiz salvo no MLModel
+
+    Os artefatos são carregados com arrays mapeados somente leitura e
+    compartilhados no processo; o partial_fit precisa da sua própria cópia.
+    """
+    model_data = artifact_store.load(ml_model.artifact_path, checksum=None, mmap=False)
+    learner = model_data['model'] if isinstance(model_data, dict) else model_data
+    if not isinstance(learner, IncrementalRegressor):
+        raise ValueError(f"{ml_model} não é um modelo incremental")
+    return learner
+
+
+def checkpoint(ml_model, learner):
+    """Grava o estado atual do aprendiz no artefato do MLModel"""
+    ml_model.mae = learner.recent_mae
+    ml_model.hyperparameters = {
+        **ml_model.hyperparameters,
+        'learner': 'incremental',
+        'samples_seen': learner.n_samples_seen_,
+        'watermark': learner.watermark,
+    }
+    if not ml_model.save_model(learner):
+        raise RuntimeError(f"Erro ao gravar o checkpoint de {ml_model}")
+
+
+def update_learner(model_type, batch_size=256, checkpoint_every=20, days_back=7, create=False):
+    """
+    Incorpora as amostras novas do tipo em micro-lotes
+
+    Args:
+        checkpoint_every: Lotes entre checkpoints (além do final)
+        days_back: Janela inicial de um aprendiz novo
+        create: Cria o aprendiz se ainda não existir
+
+    Returns:
+        dict | None: model, samples, batches, checkpoints, recent_mae,
+                     samples_seen e watermark; None se não houver
+                     aprendiz e create=False
+    """
+    feature_columns, stream = STREAMS[model_type]
+    ml_model = get_learner_model(model_type)
+    if ml_model is None:
+        if not create:
+            return None
+        ml_model, learner = create_learner_model(model_type)
+    elif ml_model.artifact_path:
+        learner = load_learner(ml_model)
+    else:
+        learner = IncrementalRegressor(feature_columns())
+
+    since = timezone.now() - timedelta(days=days_back)
+    stats = {'model': ml_model, 'samples': 0, 'batches': 0, 'checkpoints': 0}
+    pending = False
+
+    for X, y, watermark in stream(learner, batch_size, since):
+        learner.partial_fit(X, y)
+        if watermark is not None:
+            learner.watermark = watermark
+            pending = True
+        if len(y):
+            stats['samples'] += len(y)
+            stats['batches'] += 1
+            pending = True
+
+        if pending and stats['batches'] and stats['batches'] % checkpoint_every == 0:
+            checkpoint(ml_model, learner)
+            stats['checkpoints'] += 1
+            pending = False
+
+    if pending and learner.n_samples_seen_:
+        checkpoint(ml_model, learner)
+        stats['checkpoints'] += 1
+
+    logger.info(
+        f"{ml_model}: {stats['samples']} amostras em {stats['batches']} lotes, "
+        f"{stats['checkpoints']} checkpoints"
+    )
+    stats.update(
+        recent_mae=learner.recent_mae,
+        samples_seen=learner.n_samples_seen_,
+        watermark=learner.watermark
+    )
+    return stats
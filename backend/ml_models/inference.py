@@ -0,0 +1,98 @@
+# backend/ml_models/inference.py
+
+import threading
+import warnings
+
+import numpy as np
+
+from .tree_compiler import compiled_models
+
+_buffers = threading.local()
+
+# As linhas chegam como ndarray na ordem de feature_names_in_, então o aviso
+# do sklearn para estimadores ajustados com DataFrame não se aplica. O filtro
+# é instalado uma vez na importação: warnings.catch_warnings() por chamada
+# troca os filtros globais e não é seguro entre threads
+warnings.filterwarnings(
+    'ignore',
+    message='X does not have valid feature names',
+    category=UserWarning
+)
+
+
+class RowBuffer:
+    """
+    Bloco float64 pré-alocado com as features na ordem de colunas do modelo
+
+    Substitui a montagem de um DataFrame por predição: os valores são
+    escritos diretamente nas posições das colunas e o mesmo array é
+    reutilizado a cada chamada.
+    """
+
+    def __init__(self, columns, n_rows=1):
+        self.columns = tuple(columns)
+        self.positions = {column: i for i, column in enumerate(self.columns)}
+        self.rows = np.zeros((n_rows, len(self.columns)), dtype=np.float64)
+
+    def fill(self, values, row=0):
+        """
+        Preenche uma linha a partir de um dicionário coluna -> valor
+
+        Raises:
+            KeyError: Se faltar alguma coluna esperada pelo modelo
+        """
+        target = self.rows[row]
+        for column, position in self.positions.items():
+            target[position] = values[column]
+        return self.rows
+
+    def set_column(self, column, values):
+        """Escreve a mesma coluna em todas as linhas (escalar ou sequência)"""
+        self.rows[:, self.positions[column]] = values
+        return self.rows
+
+
+def get_row_buffer(columns, n_rows=1):
+    """
+    Retorna o RowBuffer da thread atual para as colunas informadas
+
+    Os buffers são mantidos por thread (os workers podem atender requisições
+    em threads diferentes) e criados apenas no primeiro uso.
+    """
+    key = (tuple(columns), n_rows)
+    cache = getattr(_buffers, 'cache', None)
+    if cache is None:
+        cache = _buffers.cache = {}
+    buffer = cache.get(key)
+    if buffer is None:
+        buffer = cache[key] = RowBuffer(columns, n_rows)
+    return buffer
+
+
+def get_model_columns(estimator, default):
+    """Ordem das colunas usada no treinamento (feature_names_in_) ou a padrão"""
+    columns = getattr(estimator, 'feature_names_in_', None)
+    if columns is None:
+        return tuple(default)
+    return tuple(str(column) for column in columns)
+
+
+def transform_rows(scaler, rows):
+    """Aplica um scaler às linhas, usando a versão compilada quando possível"""
+    compiled = compiled_models.get(scaler)
+    if compiled is not None:
+        return compiled.transform(rows)
+    return scaler.transform(rows)
+
+
+def predict_rows(estimator, rows):
+    """
+    Predição para um bloco de linhas já na ordem de colunas do modelo
+
+    Florestas suportadas usam o avaliador compilado (tree_compiler.py);
+    os demais estimadores caem no predict do sklearn.
+    """
+    compiled = compiled_models.get(estimator)
+    if compiled is not None:
+        return compiled.predict(rows)
+    return estimator.predict(rows)
@@ -1,8 +1,14 @@
 from datetime import datetime, timedelta
 import logging
+import time
 
 from .models import MLModel, MLPrediction
 from .utils import serialize_ml_output
+from .prediction_sink import prediction_sink
+from .online_stats import device_stats
+from .forecast_cache import forecast_cache
+from .deadline import inference_deadline
+from .shadow import shadow_evaluator
 from .ml_algorithms import (
     TemperaturePredictionModel,
     FanOptimizationModel,
@@ -70,16 +76,22 @@ class MLIntegrationService:
             reading: Instância do modelo Reading
         """
         try:
+            # Atualiza as estatísticas online do dispositivo (O(1); recarrega do
+            # banco só se outro worker ingeriu leituras no intervalo)
+            features = device_stats.update(reading)
+
             # 1. Detectar anomalias
             anomaly_result = MLIntegrationService.check_anomaly(
                 reading.temperature, 
-                reading.timestamp.hour
+                reading.timestamp.hour,
+                features=features
             )
             
             # 2. Predição de temperatura futura
             prediction = MLIntegrationService.predict_temperature(
                 reading.temperature,
-                reading.timestamp.hour
+                reading.timestamp.hour,
+                features=features
             )
             
             # 3. Otimizar ventilador baseado na temperatura atual e predita
@@ -110,10 +122,39 @@ class MLIntegrationService:
             logger.error(f"Erro ao processar leitura com ML: {str(e)}")
     
     @staticmethod
-    def check_anomaly(temperature, hour=None):
+    def check_anomaly(temperature, hour=None, features=None):
         """
         Verifica se uma temperatura é anômala
+
+        A inferência tem orçamento de latência (ver deadline.py); se ele
+        estourar, a regra simples é usada.
+
+        Args:
+            features: Features online da leitura (temp_diff, temp_deviation).
+                      Se omitido, são estimadas a partir das estatísticas do
+                      dispositivo sem alterá-las.
         """
+        return inference_deadline.run(
+            'anomaly_detection',
+            MLIntegrationService._check_anomaly,
+            temperature,
+            hour,
+            features=features,
+            fallback=lambda: MLIntegrationService._anomaly_rule(temperature, 'deadline_fallback')
+        )
+
+    @staticmethod
+    def _anomaly_rule(temperature, method='rule_based'):
+        """Regra simples de anomalia usada quando o modelo não está disponível"""
+        result = {
+            'is_anomaly': temperature < 0 or temperature > 50,
+            'confidence': 0.5,
+            'method': method
+        }
+        return serialize_ml_output(result)
+
+    @staticmethod
+    def _check_anomaly(temperature, hour=None, features=None):
         try:
             # Buscar modelo ativo
             ml_model = MLModel.objects.filter(
@@ -123,12 +164,7 @@ class MLIntegrationService:
             
             if not ml_model:
                 # Fallback para regra simples
-                result = {
-                    'is_anomaly': temperature < 0 or temperature > 50,
-                    'confidence': 0.5,
-                    'method': 'rule_based'
-                }
-                return serialize_ml_output(result)  # Serializa resultado
+                return MLIntegrationService._anomaly_rule(temperature)
             
             # Usar modelo ML
             anomaly_model = AnomalyDetectionModel()
@@ -139,23 +175,41 @@ class MLIntegrationService:
                 anomaly_model.scaler = loaded_model['scaler']
                 anomaly_model.is_fitted = True
                 
-                result = anomaly_model.detect_anomaly(temperature, hour)
+                if features is None:
+                    features = device_stats.peek(temperature)
+                if hour is None:
+                    hour = datetime.now().hour
+
+                start = time.perf_counter()
+                result = anomaly_model.detect_anomaly(
+                    temperature,
+                    hour,
+                    temp_diff=features['temp_diff'],
+                    temp_deviation=features['temp_deviation']
+                )
+                latency_ms = (time.perf_counter() - start) * 1000
                 result['method'] = 'ml_model'
                 
                 # Serializa o resultado para garantir compatibilidade JSON
                 result = serialize_ml_output(result)
+                input_data = {
+                    'temperature': float(temperature), 
+                    'hour': int(hour),
+                    'temp_diff': float(features['temp_diff']),
+                    'temp_deviation': float(features['temp_deviation'])
+                }
                 
                 # Salvar predição
-                MLPrediction.objects.create(
+                prediction_sink.record(
                     model=ml_model,
-                    input_data={
-                        'temperature': float(temperature), 
-                        'hour': int(hour) if hour is not None else None
-                    },
+                    input_data=input_data,
                     prediction=result,
                     confidence=float(result.get('confidence', 0))
                 )
                 
+                # Candidato em sombra avalia as mesmas entradas em segundo plano
+                shadow_evaluator.submit('anomaly_detection', ml_model, input_data, result, latency_ms)
+                
                 return result
             
         except Exception as e:
@@ -174,69 +228,125 @@ class MLIntegrationService:
         """
         Otimiza controle do ventilador usando ML e previsão de temperatura
         
+        As regras da configuração (controle ML, horário permitido, ciclo em
+        andamento) são verificadas antes e fora do orçamento de latência. Só
+        a inferência tem prazo (ver deadline.py); se ele estourar, a duração
+        vem de FanOptimizationModel._simple_rule.
+        
         Args:
             current_temperature: Temperatura atual
             current_hour: Hora atual (0-23)
             predicted_temp: Temperatura prevista para próxima hora (opcional)
         """
         try:
-            # Obter configuração atual
-            try:
-                config = DeviceConfig.objects.get(device_id='default-device')
-            except DeviceConfig.DoesNotExist:
-                logger.warning("Configuração não encontrada. Criando padrão...")
-                config = DeviceConfig.objects.create(
-                    device_id='default-device',
-                    ml_control=True,
-                    start_hour=timezone.now().replace(hour=8, minute=0),
-                    end_hour=timezone.now().replace(hour=22, minute=0)
-                )
-            
-            # Verificar se ML Control está ativado
-            if not config.ml_control:
-                logger.info("ML Control desativado nas configurações")
+            blocked = MLIntegrationService._fan_control_blocked()
+        except Exception as e:
+            logger.error(f"Erro ao verificar a configuração do ventilador: {str(e)}")
+            return serialize_ml_output({
+                'recommended_duration_minutes': 0,
+                'should_turn_on': False,
+                'method': 'error_fallback'
+            })
+        if blocked is not None:
+            return blocked
+        
+        return inference_deadline.run(
+            'fan_optimization',
+            MLIntegrationService._optimize_fan_control,
+            current_temperature,
+            current_hour,
+            predicted_temp=predicted_temp,
+            fallback=lambda: MLIntegrationService._fan_rule(current_temperature, predicted_temp)
+        )
+
+    @staticmethod
+    def _fan_rule(current_temperature, predicted_temp=None):
+        """Duração pela regra simples do modelo, usada quando o prazo estoura"""
+        temp_to_use = max(current_temperature, predicted_temp or 0)
+        duration = FanOptimizationModel()._simple_rule(temp_to_use)
+        result = {
+            'recommended_duration_minutes': int(duration),
+            'should_turn_on': duration > 0,
+            'method': 'deadline_fallback',
+            'current_temperature': current_temperature,
+            'predicted_temperature': predicted_temp,
+            'temperature_used': temp_to_use
+        }
+        return serialize_ml_output(result)
+
+    @staticmethod
+    def _fan_control_blocked():
+        """
+        Verifica se a configuração permite ligar o ventilador agora
+        
+        Returns:
+            dict: Resposta com should_turn_on False se o controle ML estiver
+                  desativado, fora do horário ou com ciclo em andamento;
+                  None se a otimização pode prosseguir
+        """
+        # Obter configuração atual
+        try:
+            config = DeviceConfig.objects.get(device_id='default-device')
+        except DeviceConfig.DoesNotExist:
+            logger.warning("Configuração não encontrada. Criando padrão...")
+            config = DeviceConfig.objects.create(
+                device_id='default-device',
+                ml_control=True,
+                start_hour=timezone.now().replace(hour=8, minute=0),
+                end_hour=timezone.now().replace(hour=22, minute=0)
+            )
+        
+        # Verificar se ML Control está ativado
+        if not config.ml_control:
+            logger.info("ML Control desativado nas configurações")
+            return {
+                'recommended_duration_minutes': 0,
+                'should_turn_on': False,
+                'method': 'ml_disabled',
+                'message': 'Controle ML desativado nas configurações'
+            }
+        
+        # Verificar se está dentro do horário permitido
+        current_time = timezone.localtime().time()
+        start_time = config.start_hour
+        end_time = config.end_hour
+        
+        # Se o horário atual está fora do período permitido, não liga
+        if start_time < end_time:  # Período normal (ex: 8:00 - 22:00)
+            if current_time < start_time or current_time > end_time:
                 return {
                     'recommended_duration_minutes': 0,
                     'should_turn_on': False,
-                    'method': 'ml_disabled',
-                    'message': 'Controle ML desativado nas configurações'
+                    'method': 'outside_hours',
+                    'message': f'Fora do horário permitido ({start_time.strftime("%H:%M")} - {end_time.strftime("%H:%M")})'
                 }
-            
-            # Verificar se está dentro do horário permitido
-            current_time = timezone.localtime().time()
-            start_time = config.start_hour
-            end_time = config.end_hour
-            
-            # Se o horário atual está fora do período permitido, não liga
-            if start_time < end_time:  # Período normal (ex: 8:00 - 22:00)
-                if current_time < start_time or current_time > end_time:
-                    return {
-                        'recommended_duration_minutes': 0,
-                        'should_turn_on': False,
-                        'method': 'outside_hours',
-                        'message': f'Fora do horário permitido ({start_time.strftime("%H:%M")} - {end_time.strftime("%H:%M")})'
-                    }
-            else:  # Período que cruza meia-noite (ex: 22:00 - 06:00)
-                if current_time > end_time and current_time < start_time:
-                    return {
-                        'recommended_duration_minutes': 0,
-                        'should_turn_on': False,
-                        'method': 'outside_hours',
-                        'message': f'Fora do horário permitido ({start_time.strftime("%H:%M")} - {end_time.strftime("%H:%M")})'
-                    }
-            
-            # Verificar se o ventilador já está em um ciclo de ML
-            if config.ml_start_time:
-                time_since_start = timezone.now() - config.ml_start_time
-                if time_since_start.total_seconds() < (config.ml_duration * 60):
-                    # Ainda dentro do período recomendado, não faz nada
-                    return {
-                        'recommended_duration_minutes': 0,
-                        'should_turn_on': False,
-                        'method': 'cooling_in_progress',
-                        'message': f'Ciclo de resfriamento em andamento: {config.ml_duration}min'
-                    }
+        else:  # Período que cruza meia-noite (ex: 22:00 - 06:00)
+            if current_time > end_time and current_time < start_time:
+                return {
+                    'recommended_duration_minutes': 0,
+                    'should_turn_on': False,
+                    'method': 'outside_hours',
+                    'message': f'Fora do horário permitido ({start_time.strftime("%H:%M")} - {end_time.strftime("%H:%M")})'
+                }
+        
+        # Verificar se o ventilador já está em um ciclo de ML
+        if config.ml_start_time:
+            time_since_start = timezone.now() - config.ml_start_time
+            if time_since_start.total_seconds() < (config.ml_duration * 60):
+                # Ainda dentro do período recomendado, não faz nada
+                return {
+                    'recommended_duration_minutes': 0,
+                    'should_turn_on': False,
+                    'method': 'cooling_in_progress',
+                    'message': f'Ciclo de resfriamento em andamento: {config.ml_duration}min'
+                }
+        
+        return None
 
+    @staticmethod
+    def _optimize_fan_control(current_temperature, current_hour, predicted_temp=None):
+        """Inferência do ventilador (com orçamento); a configuração já foi verificada"""
+        try:
             # Buscar modelo ativo
             ml_model = MLModel.objects.filter(
                 model_type='fan_optimization',
@@ -272,10 +382,12 @@ class MLIntegrationService:
                 # Considera temperatura prevista se disponível
                 temp_to_use = max(current_temperature, predicted_temp or 0)
                 
+                start = time.perf_counter()
                 optimal_duration = fan_model.optimize_fan_duration(
                     temp_to_use,
                     current_hour
                 )
+                latency_ms = (time.perf_counter() - start) * 1000
                 
                 result = {
                     'recommended_duration_minutes': int(optimal_duration),
@@ -290,7 +402,7 @@ class MLIntegrationService:
                 serialized_result = serialize_ml_output(result)
                 
                 # Salvar predição
-                MLPrediction.objects.create(
+                prediction_sink.record(
                     model=ml_model,
                     input_data={
                         'current_temperature': float(current_temperature),
@@ -299,6 +411,14 @@ class MLIntegrationService:
                     prediction=serialized_result
                 )
                 
+                shadow_evaluator.submit(
+                    'fan_optimization',
+                    ml_model,
+                    {'temperature_used': float(temp_to_use), 'current_hour': int(current_hour)},
+                    serialized_result,
+                    latency_ms
+                )
+                
                 return serialized_result
             
         except Exception as e:
@@ -381,7 +501,7 @@ class MLIntegrationService:
             temp_model.model = ml_model.load_model()
             
             if temp_model.model:
-                predictions = temp_model.predict(hours_ahead)
+                predictions = forecast_cache.get_forecast(ml_model, hours_ahead, temp_model.predict)
                 
                 # Preparar dados de resposta
                 now = timezone.now()
@@ -405,10 +525,11 @@ class MLIntegrationService:
                 serialized_result = serialize_ml_output(result)
                 
                 # Salvar predição
-                MLPrediction.objects.create(
+                prediction_sink.record(
                     model=ml_model,
                     input_data={'hours_ahead': hours_ahead},
-                    prediction=serialized_result
+                    prediction=serialized_result,
+                    key='forecast'
                 )
                 
                 return serialized_result
@@ -502,10 +623,50 @@ class MLIntegrationService:
         return serialize_ml_output(recommendations)
 
     @staticmethod
-    def predict_temperature(current_temperature, current_hour):
+    def predict_temperature(current_temperature, current_hour, features=None):
         """
         Prediz a temperatura para a próxima hora usando modelo ML
+
+        A inferência tem orçamento de latência (ver deadline.py); se ele
+        estourar, a heurística por hora do dia é usada.
+
+        Args:
+            features: Features online da leitura atual (lags e médias
+                      móveis). Se omitido, são estimadas a partir das
+                      estatísticas do dispositivo sem alterá-las.
         """
+        return inference_deadline.run(
+            'temperature_prediction',
+            MLIntegrationService._predict_temperature,
+            current_temperature,
+            current_hour,
+            features=features,
+            fallback=lambda: MLIntegrationService._temperature_rule(
+                current_temperature, current_hour, 'deadline_fallback'
+            )
+        )
+
+    @staticmethod
+    def _temperature_rule(current_temperature, current_hour, method='rule_based'):
+        """Heurística por hora do dia usada quando o modelo não está disponível"""
+        next_hour = (current_hour + 1) % 24
+        # Ajuste simples baseado no horário do dia
+        if 6 <= next_hour <= 12:  # Manhã: temperatura tende a subir
+            predicted = current_temperature + 0.5
+        elif 13 <= next_hour <= 18:  # Tarde: temperatura estável ou subindo
+            predicted = current_temperature + 0.2
+        else:  # Noite/Madrugada: temperatura tende a cair
+            predicted = current_temperature - 0.3
+        
+        result = {
+            'predicted_temperature': round(predicted, 1),
+            'confidence': 0.5,
+            'method': method
+        }
+        return serialize_ml_output(result)
+
+    @staticmethod
+    def _predict_temperature(current_temperature, current_hour, features=None):
         try:
             # Buscar modelo ativo
             ml_model = MLModel.objects.filter(
@@ -515,34 +676,26 @@ class MLIntegrationService:
             
             if not ml_model:
                 # Fallback para regra simples
-                next_hour = (current_hour + 1) % 24
-                # Ajuste simples baseado no horário do dia
-                if 6 <= next_hour <= 12:  # Manhã: temperatura tende a subir
-                    predicted = current_temperature + 0.5
-                elif 13 <= next_hour <= 18:  # Tarde: temperatura estável ou subindo
-                    predicted = current_temperature + 0.2
-                else:  # Noite/Madrugada: temperatura tende a cair
-                    predicted = current_temperature - 0.3
-                
-                result = {
-                    'predicted_temperature': round(predicted, 1),
-                    'confidence': 0.5,
-                    'method': 'rule_based'
-                }
-                return serialize_ml_output(result)
+                return MLIntegrationService._temperature_rule(current_temperature, current_hour)
             
             # Usar modelo ML
             temp_model = TemperaturePredictionModel()
             loaded_model = ml_model.load_model()
             
-            if loaded_model and isinstance(loaded_model, dict):
-                temp_model.model = loaded_model['model']
-                temp_model.scaler = loaded_model.get('scaler')  # Pode ser None
+            if loaded_model is not None:
+                # Aceita tanto o estimador quanto {'model', 'scaler'}
+                temp_model.model = loaded_model
                 
+                if features is None:
+                    features = device_stats.peek(current_temperature)
+                
+                start = time.perf_counter()
                 prediction = temp_model.predict_next_hour(
                     current_temperature,
-                    current_hour
+                    current_hour,
+                    features=features
                 )
+                latency_ms = (time.perf_counter() - start) * 1000
                 
                 result = {
                     'predicted_temperature': round(float(prediction['temperature']), 1),
@@ -551,17 +704,31 @@ class MLIntegrationService:
                 }
                 
                 # Salvar predição
-                MLPrediction.objects.create(
+                prediction_sink.record(
                     model=ml_model,
                     input_data={
                         'current_temperature': float(current_temperature),
                         'hour': int(current_hour)
                     },
                     prediction=result,
-                    confidence=result['confidence']
+                    confidence=result['confidence'],
+                    key='next_hour'
                 )
                 
-                return serialize_ml_output(result)
+                result = serialize_ml_output(result)
+                shadow_evaluator.submit(
+                    'temperature_prediction',
+                    ml_model,
+                    {
+                        'current_temperature': float(current_temperature),
+                        'hour': int(current_hour),
+                        'features': serialize_ml_output(features)
+                    },
+                    result,
+                    latency_ms
+                )
+                
+                return result
             
         except Exception as e:
             logger.error(f"Erro na predição de temperatura: {str(e)}")
@@ -0,0 +1,261 @@
+# backend/ml_models/jobs.py
+
+import logging
+import multiprocessing
+import os
+import socket
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .models import TrainingSession
+from .training import MODEL_TYPES, _init_worker, train_models
+
+logger = logging.getLogger(__name__)
+
+# Intervalo do heartbeat gravado pelo worker enquanto o job roda
+HEARTBEAT_SECONDS = getattr(settings, 'ML_TRAINING_HEARTBEAT_SECONDS', 5)
+# Jobs sem heartbeat há mais que isso são dados como perdidos (worker morto)
+STALE_SECONDS = getattr(settings, 'ML_TRAINING_STALE_SECONDS', 120)
+# Espera pelo cancelamento cooperativo (entre etapas) antes de encerrar o processo
+CANCEL_GRACE_SECONDS = getattr(settings, 'ML_TRAINING_CANCEL_GRACE_SECONDS', 10)
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class TrainingCancelled(Exception):
+    """Cancelamento pedido pela API durante o job"""
+
+
+def jobs_queryset():
+    """Sessões que são jobs (as sessões de cada tipo ficam em children)"""
+    return TrainingSession.objects.filter(parent__isnull=True).exclude(job_options={})
+
+
+def get_active_job():
+    return jobs_queryset().filter(status__in=ACTIVE_STATUSES).order_by('started_at').first()
+
+
+def submit_training(model_types=None, days_back=30, activate=False, parallel=False):
+    """
+    Enfileira um job de treinamento e retorna a TrainingSession do job
+
+    O ajuste é feito pelo worker (python manage.py run_training_worker),
+    fora da requisição HTTP.
+    """
+    model_types = list(model_types or MODEL_TYPES)
+    invalid = set(model_types) - set(MODEL_TYPES)
+    if invalid:
+        raise ValueError(f"Tipos de modelo inválidos: {', '.join(sorted(invalid))}")
+
+    now = timezone.now()
+    return TrainingSession.objects.create(
+        model=None,
+        data_start_date=now - timedelta(days=days_back),
+        data_end_date=now,
+        training_samples=0,
+        status='queued',
+        progress_message='Na fila',
+        job_options={
+            'model_types': model_types,
+            'days_back': days_back,
+            'activate': activate,
+            'parallel': parallel,
+        }
+    )
+
+
+def request_cancel(job):
+    """
+    Cancela o job: na fila, imediatamente; em execução, o worker interrompe
+
+    Returns:
+        bool: False se o job já tinha terminado
+    """
+    if jobs_queryset().filter(id=job.id, status='queued').update(
+        status='cancelled',
+        completed_at=timezone.now(),
+        progress_message='Cancelado antes de iniciar'
+    ):
+        return True
+    return bool(jobs_queryset().filter(id=job.id, status='running').update(cancel_requested=True))
+
+
+def job_status(job_id):
+    """
+    Estado do job em uma consulta leve (sem carregar as métricas)
+
+    Returns:
+        dict | None
+    """
+    job = jobs_queryset().filter(id=job_id).values(
+        'id', 'status', 'progress', 'progress_message', 'started_at', 'heartbeat_at',
+        'completed_at', 'cancel_requested', 'error_message'
+    ).first()
+    if job is None:
+        return None
+
+    job['children'] = list(TrainingSession.objects.filter(parent_id=job_id).values(
+        'id', 'status', 'model_id', 'training_samples', 'wall_time_seconds'
+    ))
+    return job
+
+
+def claim_next_job(worker_name):
+    """
+    Reserva o job mais antigo da fila para este worker
+
+    O UPDATE condicionado ao status garante que dois workers não peguem o
+    mesmo job.
+    """
+    for job_id in jobs_queryset().filter(status='queued').order_by('started_at').values_list('id', flat=True):
+        claimed = TrainingSession.objects.filter(id=job_id, status='queued').update(
+            status='running',
+            worker=worker_name,
+            heartbeat_at=timezone.now(),
+            progress_message='Iniciando'
+        )
+        if claimed:
+            return TrainingSession.objects.get(id=job_id)
+    return None
+
+
+def recover_stale_jobs():
+    """Marca como falhos os jobs em execução cujo worker parou de dar sinal"""
+    limit = timezone.now() - timedelta(seconds=STALE_SECONDS)
+    stale = jobs_queryset().filter(status='running', heartbeat_at__lt=limit)
+    count = 0
+    for job in stale:
+        _close_job(job, 'failed', f"Sem heartbeat do worker {job.worker or '?'} há mais de {STALE_SECONDS}s")
+        count += 1
+    return count
+
+
+def _close_job(job, status, message, **fields):
+    """Fecha o job e as sessões filhas que ficaram em aberto"""
+    now = timezone.now()
+    TrainingSession.objects.filter(parent=job, status__in=ACTIVE_STATUSES).update(
+        status='failed' if status == 'failed' else 'cancelled',
+        completed_at=now,
+        error_message=message
+    )
+    TrainingSession.objects.filter(id=job.id).update(
+        status=status,
+        completed_at=now,
+        progress_message=message[:200],
+        error_message='' if status == 'completed' else message,
+        **fields
+    )
+
+
+def execute_job(job_id):
+    """
+    Executa o job no processo atual, gravando progresso e resultado
+
+    Entre as etapas (snapshot, cada ajuste, registro) confere o pedido de
+    cancelamento; um ajuste em andamento não é interrompido aqui (o worker
+    encerra o processo após CANCEL_GRACE_SECONDS).
+    """
+    job = TrainingSession.objects.get(id=job_id)
+    options = job.job_options
+
+    def on_progress(done, total, message):
+        TrainingSession.objects.filter(id=job_id).update(
+            progress=int(100 * done / total),
+            progress_message=message[:200]
+        )
+        if TrainingSession.objects.filter(id=job_id, cancel_requested=True).exists():
+            raise TrainingCancelled()
+
+    try:
+        summary = train_models(
+            options['model_types'],
+            days_back=options['days_back'],
+            parallel=options['parallel'],
+            activate=options['activate'],
+            parent=job,
+            on_progress=on_progress
+        )
+    except TrainingCancelled:
+        _close_job(job, 'cancelled', 'Cancelado durante o treinamento')
+        return
+    except Exception as e:
+        logger.error(f"Erro no job de treinamento {job_id}: {str(e)}")
+        _close_job(job, 'failed', f"Erro durante o treinamento: {str(e)}")
+        return
+
+    results = [
+        {
+            'model_type': item['model_type'],
+            'status': item['status'],
+            'session_id': item['session_id'],
+            'model_id': item['model'].id if item.get('model') else None,
+            'error': item['error'],
+            'wall_time': item['wall_time'],
+        }
+        for item in summary['results']
+    ]
+    failed = [item for item in results if item['status'] != 'completed']
+    job.training_metrics = {
+        **job.training_metrics,
+        'results': results,
+        'snapshot_time': summary['snapshot_time'],
+        'elapsed': summary['elapsed'],
+    }
+    job.save(update_fields=['training_metrics'])
+    _close_job(
+        job,
+        'failed' if failed else 'completed',
+        f"{len(failed)} de {len(results)} tipos falharam" if failed else 'Treinamento concluído',
+        progress=100,
+        training_samples=sum(
+            TrainingSession.objects.filter(parent=job).values_list('training_samples', flat=True)
+        )
+    )
+
+
+def _run_in_child(job_id):
+    _init_worker()
+    execute_job(job_id)
+
+
+def run_supervised(job):
+    """
+    Roda o job em um processo filho enquanto grava o heartbeat
+
+    Se o cancelamento for pedido e o filho não parar sozinho em
+    CANCEL_GRACE_SECONDS, o processo é encerrado.
+    """
+    # Conexões abertas não podem ser compartilhadas com o processo filho
+    connections.close_all()
+    process = multiprocessing.Process(target=_run_in_child, args=(job.id,))
+    process.start()
+
+    cancel_seen_at = None
+    try:
+        while process.is_alive():
+            process.join(HEARTBEAT_SECONDS)
+            TrainingSession.objects.filter(id=job.id, status='running').update(heartbeat_at=timezone.now())
+
+            if cancel_seen_at is None:
+                if TrainingSession.objects.filter(id=job.id, cancel_requested=True).exists():
+                    cancel_seen_at = timezone.now()
+            elif process.is_alive() and (timezone.now() - cancel_seen_at).total_seconds() > CANCEL_GRACE_SECONDS:
+                process.terminate()
+                process.join()
+                _close_job(job, 'cancelled', 'Cancelado (processo de treinamento encerrado)')
+                return
+    except BaseException:
+        process.terminate()
+        process.join()
+        _close_job(job, 'failed', 'Worker interrompido durante o treinamento')
+        raise
+
+    if TrainingSession.objects.filter(id=job.id, status='running').exists():
+        _close_job(job, 'failed', f"Processo de treinamento encerrou com código {process.exitcode}")
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
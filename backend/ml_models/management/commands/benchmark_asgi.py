@@ -0,0 +1,211 @@
+# backend/ml_models/management/commands/benchmark_asgi.py
+
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+# Diretório do manage.py e do gunicorn_config.py (o Procfile usa --chdir backend)
+BACKEND_DIR = Path(__file__).resolve().parents[3]
+
+# Endpoint síncrono (WSGI) e assíncrono (ASGI) equivalentes
+ENDPOINTS = {
+    'anomaly': ('POST', '/ml/api/detect/anomaly/', '/ml/api/async/detect/anomaly/', {'temperature': 25.3, 'hour': 14}),
+    'temperature': ('GET', '/ml/api/predict/temperature/?hours_ahead=6', '/ml/api/async/predict/temperature/?hours_ahead=6', None),
+    'status': ('GET', '/ml/api/models/status/', '/ml/api/async/models/status/', None),
+}
+
+
+class Command(BaseCommand):
+    help = 'Compara WSGI (gthread) e ASGI com um worker sob muitos clientes simultâneos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--endpoint',
+            choices=sorted(ENDPOINTS),
+            default='anomaly',
+            help='Endpoint medido (padrão: anomaly)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=50,
+            help='Clientes simultâneos (padrão: 50)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=1000,
+            help='Total de requisições por servidor (padrão: 1000)'
+        )
+        parser.add_argument(
+            '--username',
+            help='Usuário cujo token autentica as requisições'
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=4,
+            help='Threads do worker gthread iniciado para o WSGI (padrão: 4)'
+        )
+        parser.add_argument(
+            '--wsgi-url',
+            help='Servidor WSGI já em execução (ex.: http://127.0.0.1:8000); se omitido, um é iniciado'
+        )
+        parser.add_argument(
+            '--asgi-url',
+            help='Servidor ASGI já em execução; se omitido, um é iniciado (gunicorn -k asgi)'
+        )
+
+    def handle(self, *args, **options):
+        token = self._get_token(options['username'])
+        method, sync_path, async_path, body = ENDPOINTS[options['endpoint']]
+
+        servers = [
+            ('WSGI (gthread)', options['wsgi_url'], [
+                'Ambienta.wsgi', '-k', 'gthread', '--threads', str(options['threads'])
+            ], sync_path),
+            ('ASGI', options['asgi_url'], ['Ambienta.asgi:application', '-k', 'asgi'], async_path),
+        ]
+
+        for label, url, gunicorn_args, path in servers:
+            process = None
+            try:
+                if url is None:
+                    url, process = self._start_server(gunicorn_args)
+                stats = self._run_load(url, method, path, body, token, options['concurrency'], options['requests'])
+            finally:
+                if process is not None:
+                    process.terminate()
+                    process.wait(timeout=30)
+
+            self.stdout.write(self.style.SUCCESS(f"{label} - {path}"))
+            self.stdout.write(
+                f"  {stats['throughput']:.1f} req/s em {stats['elapsed']:.1f}s "
+                f"({options['concurrency']} clientes, {options['requests']} requisições)"
+            )
+            self.stdout.write(
+                f"  latência p50 {stats['p50']:.1f}ms / p95 {stats['p95']:.1f}ms / p99 {stats['p99']:.1f}ms"
+            )
+            self.stdout.write(f"  status: {dict(sorted(stats['status'].items()))}")
+            if stats['errors']:
+                self.stdout.write(self.style.WARNING(f"  erros de conexão: {stats['errors']}"))
+
+    def _get_token(self, username):
+        if not username:
+            raise CommandError("Informe --username para autenticar as requisições")
+        try:
+            user = get_user_model().objects.get(username=username)
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"Usuário {username} não encontrado")
+        token, _ = Token.objects.get_or_create(user=user)
+        return token.key
+
+    def _start_server(self, gunicorn_args):
+        """Inicia o gunicorn com um worker em uma porta livre e aguarda o readiness"""
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+
+        command = [
+            sys.executable, '-m', 'gunicorn', *gunicorn_args,
+            '-c', str(BACKEND_DIR / 'gunicorn_config.py'),
+            '--workers', '1',
+            '--bind', f'127.0.0.1:{port}',
+            '--access-logfile', os.devnull,
+        ]
+        process = subprocess.Popen(
+            command,
+            cwd=BACKEND_DIR,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+
+        url = f'http://127.0.0.1:{port}'
+        deadline = time.monotonic() + 120
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f"gunicorn encerrou ao iniciar: {' '.join(command)}")
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+                connection.request('GET', '/ml/api/ready/')
+                if connection.getresponse().status == 200:
+                    return url, process
+            except OSError:
+                pass
+            time.sleep(0.5)
+
+        process.terminate()
+        raise CommandError("O servidor não ficou pronto em 120s (veja /ml/api/ready/)")
+
+    def _run_load(self, url, method, path, body, token, concurrency, total):
+        """Dispara `total` requisições com `concurrency` clientes simultâneos"""
+        target = urlsplit(url)
+        # Uma conexão por requisição nos dois servidores: o keep-alive do
+        # worker asgi do gunicorn não atende a segunda requisição da conexão
+        headers = {'Authorization': f'Token {token}', 'Connection': 'close'}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+
+        latencies = np.zeros(total)
+        statuses = Counter()
+        errors = [0]
+        lock = threading.Lock()
+        counter = iter(range(total))
+
+        def client():
+            while True:
+                with lock:
+                    i = next(counter, None)
+                if i is None:
+                    break
+                start = time.perf_counter()
+                connection = http.client.HTTPConnection(target.hostname, target.port, timeout=60)
+                try:
+                    connection.request(method, path, body=payload, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    code = response.status
+                except (OSError, http.client.HTTPException):
+                    code = None
+                finally:
+                    connection.close()
+                latencies[i] = time.perf_counter() - start
+                with lock:
+                    if code is None:
+                        errors[0] += 1
+                    else:
+                        statuses[code] += 1
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        latencies *= 1000
+        return {
+            'elapsed': elapsed,
+            'throughput': total / elapsed,
+            'p50': float(np.percentile(latencies, 50)),
+            'p95': float(np.percentile(latencies, 95)),
+            'p99': float(np.percentile(latencies, 99)),
+            'status': statuses,
+            'errors': errors[0],
+        }
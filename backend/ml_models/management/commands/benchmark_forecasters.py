@@ -0,0 +1,161 @@
+# backend/ml_models/management/commands/benchmark_forecasters.py
+
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from ml_models.ml_algorithms import TemperaturePredictionModel
+from ml_models.models import MLModel
+
+# Horizontes exibidos individualmente no relatório
+REPORTED_HORIZONS = (1, 3, 6, 12, 24)
+
+
+class Command(BaseCommand):
+    help = 'Compara o previsor de temperatura recursivo com o direto de múltiplas saídas (MAE por horizonte e latência)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Dias de leituras usados no treino e no teste (padrão: 30)'
+        )
+        parser.add_argument(
+            '--horizon',
+            type=int,
+            default=TemperaturePredictionModel.FORECAST_HORIZON,
+            help=f'Horas previstas (padrão: {TemperaturePredictionModel.FORECAST_HORIZON})'
+        )
+        parser.add_argument(
+            '--test-size',
+            type=float,
+            default=0.2,
+            help='Fração final do período usada como teste (padrão: 0.2)'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=200,
+            help='Previsões medidas por modelo na latência (padrão: 200)'
+        )
+        parser.add_argument(
+            '--save',
+            action='store_true',
+            help='Registra o previsor direto como MLModel inativo (para avaliação em sombra)'
+        )
+
+    def handle(self, *args, **options):
+        horizon = options['horizon']
+        if horizon < 2:
+            raise CommandError("--horizon deve ser pelo menos 2")
+
+        temp_model = TemperaturePredictionModel()
+        try:
+            X, Y, times = temp_model.build_direct_dataset(temp_model.get_training_data(options['days']), horizon)
+            train_idx, test_idx = temp_model.temporal_split(times, horizon, options['test_size'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if not len(train_idx):
+            raise CommandError(f"Histórico curto demais para {horizon} horizontes; aumente --days")
+
+        X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
+        self.stdout.write(
+            f"Leituras: {len(train_idx)} de treino / {len(test_idx)} de teste, horizonte {horizon}h"
+        )
+
+        # Recursivo: mesmo pipeline de _train_legacy, alvo = temperatura da própria leitura
+        recursive = TemperaturePredictionModel()
+        start = time.perf_counter()
+        recursive.model = Pipeline([
+            ('scaler', StandardScaler()),
+            ('regressor', RandomForestRegressor(n_estimators=100, max_depth=10, random_state=42, n_jobs=-1))
+        ]).fit(X_train[recursive.feature_columns], X_train['temperature'])
+        recursive_fit = time.perf_counter() - start
+
+        direct = TemperaturePredictionModel()
+        start = time.perf_counter()
+        direct.model = direct.get_default_direct_model().fit(X_train, Y[train_idx])
+        direct_fit = time.perf_counter() - start
+
+        results = [
+            ('recursivo', recursive, recursive_fit, self._recursive_batch(recursive, X_test, horizon)),
+            ('direto', direct, direct_fit, np.asarray(direct.predict_rows(
+                X_test[list(direct.get_columns())].to_numpy(dtype=np.float64)
+            ))),
+        ]
+
+        anchor = X_test.iloc[-1].to_dict()
+        for label, model, fit_seconds, predictions in results:
+            errors = np.abs(predictions - Y[test_idx])
+            by_horizon = errors.mean(axis=0)
+            latency = self._measure(lambda: model.forecast_from(anchor, horizon), options['iterations'])
+
+            self.stdout.write(self.style.SUCCESS(f"{label} (treino em {fit_seconds:.1f}s)"))
+            self.stdout.write(f"  MAE médio: {by_horizon.mean():.3f}°C")
+            self.stdout.write("  MAE por horizonte: " + " / ".join(
+                f"{h}h {by_horizon[h - 1]:.3f}" for h in REPORTED_HORIZONS if h <= horizon
+            ))
+            self.stdout.write(
+                f"  latência ({horizon}h): p50 {latency['p50']:.3f}ms / p95 {latency['p95']:.3f}ms"
+            )
+
+        if options['save']:
+            self._save(direct, Y[test_idx], results[1][3], options['days'], horizon)
+
+    def _recursive_batch(self, recursive, X_test, horizon):
+        """
+        Previsão recursiva de todas as leituras de teste, um passo por vez
+
+        Mesma atualização de hora e lags de TemperaturePredictionModel.predict,
+        aplicada ao bloco inteiro em vez de leitura a leitura.
+        """
+        columns = list(recursive.get_columns())
+        position = {column: i for i, column in enumerate(columns)}
+        block = X_test[columns].to_numpy(dtype=np.float64, copy=True)
+
+        predictions = np.empty((len(block), horizon))
+        for step in range(horizon):
+            block[:, position['hour']] = (block[:, position['hour']] + 1) % 24
+            predictions[:, step] = recursive.predict_rows(block)
+            block[:, position['temp_lag_3']] = block[:, position['temp_lag_2']]
+            block[:, position['temp_lag_2']] = block[:, position['temp_lag_1']]
+            block[:, position['temp_lag_1']] = predictions[:, step]
+        return predictions
+
+    def _measure(self, func, iterations):
+        func()
+        timings = np.empty(iterations)
+        for i in range(iterations):
+            start = time.perf_counter()
+            func()
+            timings[i] = (time.perf_counter() - start) * 1000
+        return {'p50': float(np.percentile(timings, 50)), 'p95': float(np.percentile(timings, 95))}
+
+    def _save(self, direct, Y_test, predictions, days, horizon):
+        errors = predictions - Y_test
+        ss_res = float(np.sum(errors ** 2))
+        ss_tot = float(np.sum((Y_test - Y_test.mean(axis=0)) ** 2))
+        now = timezone.now()
+
+        ml_model = MLModel.objects.create(
+            name='Previsão Direta de Temperatura',
+            model_type='temperature_prediction',
+            version=f"direct-{now:%Y%m%d%H%M}",
+            description=f'Floresta de múltiplas saídas ({horizon} horizontes), treinada com {days} dias',
+            is_active=False,
+            mse=float(np.mean(errors ** 2)),
+            mae=float(np.mean(np.abs(errors))),
+            r2_score=1 - ss_res / ss_tot if ss_tot else None,
+            hyperparameters={**direct.model.get_params(), 'horizon': horizon}
+        )
+        if not ml_model.save_model(direct.model):
+            raise CommandError("Erro ao salvar o artefato do previsor direto")
+
+        self.stdout.write(self.style.SUCCESS(f"Registrado: {ml_model} (id {ml_model.id})"))
+        self.stdout.write(f"  avalie em sombra com: python manage.py shadow_report --set-candidate {ml_model.id}")
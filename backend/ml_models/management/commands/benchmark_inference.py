@@ -0,0 +1,158 @@
+# backend/ml_models/management/commands/benchmark_inference.py
+
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+from sklearn.preprocessing import StandardScaler
+
+from ml_models.ml_algorithms import (
+    TemperaturePredictionModel,
+    FanOptimizationModel,
+    AnomalyDetectionModel
+)
+from ml_models.models import MLModel
+
+
+class Command(BaseCommand):
+    help = 'Mede a latência de inferência de uma amostra por tipo de modelo (pandas x caminho rápido)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=200,
+            help='Número de predições medidas por caminho (padrão: 200)'
+        )
+        parser.add_argument(
+            '--synthetic',
+            action='store_true',
+            help='Usa modelos treinados com dados sintéticos mesmo havendo modelos ativos'
+        )
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        rng = np.random.default_rng(42)
+
+        benchmarks = [
+            ('temperature_prediction', self._temperature),
+            ('fan_optimization', self._fan),
+            ('anomaly_detection', self._anomaly),
+        ]
+
+        for model_type, build in benchmarks:
+            loaded = None if options['synthetic'] else self._load_active(model_type)
+            source = 'ativo' if loaded is not None else 'sintético'
+            baseline, fast = build(loaded, rng)
+
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', UserWarning)
+                baseline_stats = self._measure(baseline, iterations)
+            fast_stats = self._measure(fast, iterations)
+
+            self.stdout.write(self.style.SUCCESS(f'{model_type} (modelo {source})'))
+            self.stdout.write(f"  pandas:  {self._format(baseline_stats)}")
+            self.stdout.write(f"  rápido:  {self._format(fast_stats)}")
+            self.stdout.write(f"  ganho:   {baseline_stats['p50'] / fast_stats['p50']:.1f}x (p50)")
+
+    def _load_active(self, model_type):
+        ml_model = MLModel.objects.filter(model_type=model_type, is_active=True).first()
+        if ml_model is None:
+            return None
+        try:
+            return ml_model.load_model()
+        except Exception as e:
+            self.stdout.write(self.style.WARNING(f'{model_type}: erro ao carregar modelo ativo ({str(e)})'))
+            return None
+
+    def _temperature(self, loaded, rng):
+        temp_model = TemperaturePredictionModel()
+        if loaded is None:
+            X = pd.DataFrame(rng.normal(25, 2, size=(500, len(temp_model.feature_columns))),
+                             columns=temp_model.feature_columns)
+            loaded = temp_model.get_default_model().fit(X, X['temp_lag_1'] + rng.normal(0, 0.3, 500))
+        temp_model.model = loaded
+
+        features = {
+            'temp_lag_1': 25.1, 'temp_lag_2': 25.0,
+            'temp_rolling_mean_3': 25.1, 'temp_rolling_std_3': 0.1,
+        }
+        row = {
+            'hour': 15, 'day_of_week': 2, 'month': 6, 'fan_state': 0,
+            'temp_lag_1': 25.3, 'temp_lag_2': 25.1, 'temp_lag_3': 25.0,
+            'temp_rolling_mean_3': 25.1, 'temp_rolling_std_3': 0.1,
+        }
+
+        def baseline():
+            return temp_model.model.predict(pd.DataFrame([row])[temp_model.feature_columns])[0]
+
+        def fast():
+            return temp_model.predict_next_hour(25.3, 14, features=features)
+
+        return baseline, fast
+
+    def _fan(self, loaded, rng):
+        fan_model = FanOptimizationModel()
+        if loaded is None:
+            df = fan_model.create_dummy_data()
+            loaded = fan_model.get_default_model().fit(df[fan_model.feature_columns], df['cooling_efficiency'])
+        fan_model.model = loaded
+
+        def baseline():
+            for duration in [5, 10, 15, 20, 25, 30, 35, 40]:
+                X_pred = pd.DataFrame([{
+                    'temp_before': 28.0,
+                    'duration_minutes': duration,
+                    'hour': 15,
+                    'day_of_week': 2
+                }])
+                fan_model.model.predict(X_pred)[0]
+
+        def fast():
+            return fan_model.optimize_fan_duration(28.0, 15)
+
+        return baseline, fast
+
+    def _anomaly(self, loaded, rng):
+        anomaly_model = AnomalyDetectionModel()
+        if loaded is None:
+            X = pd.DataFrame({
+                'temperature': rng.normal(25, 2, 1000),
+                'hour': rng.integers(0, 24, 1000),
+                'temp_diff': rng.normal(0, 0.2, 1000),
+                'temp_deviation': np.abs(rng.normal(0, 0.3, 1000)),
+            })[anomaly_model.feature_names]
+            scaler = StandardScaler().fit(X)
+            loaded = {'model': anomaly_model.get_default_model().fit(scaler.transform(X)), 'scaler': scaler}
+        anomaly_model.model = loaded
+        anomaly_model.is_fitted = True
+
+        def baseline():
+            X_scaled = anomaly_model.scaler.transform(np.array([[25.3, 15, 0.2, 0.3]]))
+            anomaly_model.model.predict(X_scaled)[0]
+            anomaly_model.model.score_samples(X_scaled)[0]
+
+        def fast():
+            return anomaly_model.detect_anomaly(25.3, 15, temp_diff=0.2, temp_deviation=0.3)
+
+        return baseline, fast
+
+    def _measure(self, func, iterations):
+        # Primeira chamada fora da medição (compilação e alocação dos buffers)
+        func()
+        timings = np.empty(iterations)
+        for i in range(iterations):
+            start = time.perf_counter()
+            func()
+            timings[i] = time.perf_counter() - start
+        timings *= 1e6
+        return {
+            'mean': float(timings.mean()),
+            'p50': float(np.percentile(timings, 50)),
+            'p95': float(np.percentile(timings, 95)),
+        }
+
+    def _format(self, stats):
+        return f"média {stats['mean']:.0f}µs / p50 {stats['p50']:.0f}µs / p95 {stats['p95']:.0f}µs"
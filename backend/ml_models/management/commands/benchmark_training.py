@@ -0,0 +1,116 @@
+# backend/ml_models/management/commands/benchmark_training.py
+
+import json
+import os
+import platform
+
+import numpy as np
+import sklearn
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ml_models.scalability import run_isolated, scaling_exponents
+from ml_models.training import MODEL_TYPES
+
+
+class Command(BaseCommand):
+    help = 'Mede como extração, features e ajuste escalam com históricos sintéticos de tamanho crescente'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[10_000, 100_000, 1_000_000, 10_000_000],
+            help='Leituras de cada histórico, uma por minuto (padrão: 10k 100k 1M 10M)'
+        )
+        parser.add_argument(
+            '--model-type',
+            action='append',
+            choices=MODEL_TYPES,
+            help='Mede apenas o tipo informado (pode ser repetido)'
+        )
+        parser.add_argument(
+            '--fit-max-rows',
+            type=int,
+            default=1_000_000,
+            help='Pula o ajuste acima deste número de leituras (padrão: 1M; 0 para nunca pular)'
+        )
+        parser.add_argument(
+            '--n-jobs',
+            type=int,
+            default=-1,
+            help='Núcleos do ajuste (padrão: -1, todos)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Semente do histórico sintético (padrão: 42)'
+        )
+        parser.add_argument(
+            '--output',
+            default='training_benchmark.json',
+            help='Arquivo do relatório JSON (padrão: training_benchmark.json)'
+        )
+
+    def handle(self, *args, **options):
+        sizes = sorted(set(options['sizes']))
+        if sizes[0] < 100:
+            raise CommandError("--sizes deve ter pelo menos 100 leituras")
+
+        run_options = {
+            'model_types': options['model_type'] or list(MODEL_TYPES),
+            'n_jobs': options['n_jobs'],
+            'fit_max_rows': options['fit_max_rows'] or None,
+            'seed': options['seed'],
+        }
+
+        results = []
+        for rows in sizes:
+            self.stdout.write(f"Histórico de {rows} leituras...")
+            result = run_isolated(rows, **run_options)
+            results.append(result)
+
+            if 'error' in result:
+                self.stdout.write(self.style.ERROR(f"  {result['error']}; tamanhos maiores ignorados"))
+                break
+
+            for stage, stats in result['stages'].items():
+                self.stdout.write(
+                    f"  {stage:<36} {stats['wall_time']:8.2f}s  CPU {stats['cpu_time']:8.2f}s  "
+                    f"pico {stats['peak_rss_mb']:8.0f} MB  {self._rate(stats['rows_per_sec'])}"
+                )
+            for stage in result['skipped']:
+                self.stdout.write(f"  {stage:<36} pulado (--fit-max-rows)")
+
+        scaling = scaling_exponents(results)
+        for stage, steps in scaling.items():
+            for step in steps:
+                if step['superlinear']:
+                    self.stdout.write(self.style.WARNING(
+                        f"{stage}: superlinear de {step['from']} para {step['to']} leituras "
+                        f"(expoente {step['exponent']:.2f})"
+                    ))
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'sklearn': sklearn.__version__,
+                'cpu_count': os.cpu_count(),
+                'platform': platform.platform(),
+            },
+            'options': {**run_options, 'sizes': sizes},
+            'results': results,
+            'scaling': scaling,
+        }
+        with open(options['output'], 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Relatório gravado em {options['output']}"))
+
+    def _rate(self, rows_per_sec):
+        if rows_per_sec is None:
+            return ''
+        return f"{rows_per_sec:,.0f} linhas/s"
@@ -1,34 +1,36 @@
 # backend/ml_models/management/commands/load_models.py
 
-from django.core.management.base import BaseCommand
-from ml_models.ml_algorithms import (
-    TemperaturePredictionModel,
-    FanOptimizationModel, 
-    AnomalyDetectionModel
-)
-from ml_models.cache import model_cache
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+from ml_models.warmup import warmup_state
+
+# O comando já imprime os tempos de cada modelo; o log do warmup fica só com avisos
+quiet_log = logging.getLogger('ml_models.management.load_models')
+quiet_log.setLevel(logging.WARNING)
 
 class Command(BaseCommand):
-    help = 'Carrega modelos ML pré-treinados para o cache'
+    help = 'Carrega os modelos ML ativos e executa uma inferência sintética por tipo (warmup)'
 
     def handle(self, *args, **kwargs):
-        try:
-            self.stdout.write("Carregando modelos ML pré-treinados...")
-            
-            # Carrega os modelos
-            temp_model = TemperaturePredictionModel()
-            fan_model = FanOptimizationModel()
-            anomaly_model = AnomalyDetectionModel()
-            
-            # Força o carregamento dos modelos do disco
-            model_cache.enable_lazy_loading = True
-            _ = temp_model.model
-            _ = fan_model.model
-            _ = anomaly_model.model
-            
-            self.stdout.write(self.style.SUCCESS("Modelos carregados com sucesso!"))
-            
-        except Exception as e:
-            self.stdout.write(
-                self.style.ERROR(f"Erro ao carregar modelos: {str(e)}")
-            )
\ No newline at end of file
+        self.stdout.write("Carregando modelos ML pré-treinados...")
+        
+        state = warmup_state.run(log=quiet_log)
+        
+        if not state['models']:
+            self.stdout.write(self.style.WARNING("Nenhum modelo ML ativo encontrado"))
+        
+        for result in state['models']:
+            line = (
+                f"- {result['model_type']} v{result['version']}: "
+                f"carga {result['load_ms']}ms, primeira inferência {result['first_inference_ms']}ms"
+            )
+            if result['error']:
+                self.stdout.write(self.style.ERROR(f"{line} - erro: {result['error']}"))
+            else:
+                self.stdout.write(line)
+        
+        if state['status'] != 'warm':
+            raise CommandError(f"Warmup falhou: {state['error'] or 'um ou mais modelos com erro'}")
+        
+        self.stdout.write(self.style.SUCCESS(f"Modelos aquecidos em {state['warmup_ms']}ms"))
@@ -0,0 +1,174 @@
+# backend/ml_models/management/commands/prune_ml_models.py
+
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from ml_models.artifacts import OBJECTS_DIR, artifact_store
+from ml_models.models import MLModel
+
+
+def _megabytes(size):
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+class Command(BaseCommand):
+    help = 'Remove as versões inativas além das N mais recentes por tipo e os artefatos sem referência'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep',
+            type=int,
+            default=5,
+            help='Versões inativas mantidas por tipo, além da ativa e da em sombra (padrão: 5)'
+        )
+        parser.add_argument(
+            '--model-type',
+            action='append',
+            choices=[choice for choice, _ in MLModel.MODEL_TYPES],
+            help='Limpa apenas o tipo informado (pode ser repetido)'
+        )
+        parser.add_argument(
+            '--artifacts-only',
+            action='store_true',
+            help='Mantém os registros (e suas predições e sessões de treino), removendo só os artefatos'
+        )
+        parser.add_argument(
+            '--repack',
+            action='store_true',
+            help='Move os artefatos do formato antigo (sem compressão) para o armazenamento por conteúdo'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Mostra o que seria removido sem alterar nada'
+        )
+
+    def handle(self, *args, **options):
+        if options['keep'] < 0:
+            raise CommandError("--keep não pode ser negativo")
+        dry_run = options['dry_run']
+        # Antes de ler as referências: objetos gravados depois disso (ou pouco
+        # antes) podem ser de um registro ainda não gravado
+        started_at = time.time()
+
+        if options['repack']:
+            self._repack(dry_run)
+
+        stale = []
+        for model_type in options['model_type'] or [choice for choice, _ in MLModel.MODEL_TYPES]:
+            versions = self._prunable(model_type)
+            pruned = versions[options['keep']:]
+            stale.extend(pruned)
+            if pruned:
+                self.stdout.write(
+                    f"{model_type}: {len(pruned)} versões inativas além das {options['keep']} mais recentes "
+                    f"({', '.join(ml_model.version for ml_model in pruned[:5])}{'...' if len(pruned) > 5 else ''})"
+                )
+
+        stale_ids = {ml_model.id for ml_model in stale}
+        referenced = set(
+            MLModel.objects.exclude(id__in=stale_ids).exclude(artifact_path='').values_list('artifact_path', flat=True)
+        )
+        cached = MLModel.objects.filter(Q(is_active=True) | Q(is_shadow=True)).values_list('artifact_checksum', flat=True)
+
+        if not dry_run and stale_ids:
+            queryset = MLModel.objects.filter(id__in=stale_ids)
+            if options['artifacts_only']:
+                queryset.update(artifact_path='', artifact_checksum='', artifact_size=None, artifact_raw_size=None)
+            else:
+                queryset.delete()
+
+            # Artefatos no formato antigo ficam fora de objects/ (coletados abaixo)
+            for path in {ml_model.artifact_path for ml_model in stale}:
+                if path and path not in referenced and not path.startswith(OBJECTS_DIR + os.sep):
+                    artifact_store.delete(path)
+
+        removed = artifact_store.collect_garbage(referenced, cached, dry_run=dry_run, started_at=started_at)
+
+        action = 'Seriam removidos' if dry_run else 'Removidos'
+        self.stdout.write(self.style.SUCCESS(
+            f"{action}: {len(stale)} versões, {removed['objects']} artefatos sem referência e "
+            f"{removed['cache']} cópias descompactadas ({_megabytes(removed['freed'])})"
+        ))
+        self._report()
+
+    def _prunable(self, model_type):
+        """
+        Versões inativas do tipo, da mais recente para a mais antiga
+
+        Ficam de fora os modelos incrementais (atualizados por
+        update_online_models) e a última busca de hiperparâmetros, de onde
+        train_ml_models lê a configuração ajustada.
+        """
+        # Por ids: exclude() pela chave do JSON também descartaria os
+        # registros sem a chave (NULL no SQL)
+        protected = set(MLModel.objects.filter(
+            model_type=model_type,
+            hyperparameters__learner='incremental'
+        ).values_list('id', flat=True))
+
+        tuned = MLModel.objects.filter(
+            model_type=model_type,
+            hyperparameters__has_key='tuning'
+        ).order_by('-created_at').values_list('id', flat=True).first()
+        if tuned is not None:
+            protected.add(tuned)
+
+        return list(MLModel.objects.filter(
+            model_type=model_type,
+            is_active=False,
+            is_shadow=False
+        ).exclude(id__in=protected).order_by('-created_at', '-id'))
+
+    def _repack(self, dry_run):
+        legacy = {}
+        for ml_model in MLModel.objects.exclude(artifact_path='').exclude(
+                artifact_path__startswith=OBJECTS_DIR + os.sep):
+            legacy.setdefault(ml_model.artifact_path, []).append(ml_model)
+
+        saved = 0
+        for path, ml_models in legacy.items():
+            if not os.path.exists(artifact_store.resolve(path)):
+                self.stdout.write(self.style.WARNING(f"{path}: arquivo não encontrado"))
+                continue
+            if dry_run:
+                continue
+
+            artifact = artifact_store.repack(path)
+            if any(ml_model.artifact_checksum != artifact['checksum'] for ml_model in ml_models):
+                self.stdout.write(self.style.WARNING(f"{path}: checksum diferente do registrado; atualizado"))
+            MLModel.objects.filter(id__in=[ml_model.id for ml_model in ml_models]).update(
+                artifact_path=artifact['path'],
+                artifact_checksum=artifact['checksum'],
+                artifact_size=artifact['size'],
+                artifact_raw_size=artifact['raw_size']
+            )
+            artifact_store.delete(path)
+            saved += artifact['raw_size'] - artifact['size']
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(legacy)} artefatos no formato antigo"
+            + ('' if dry_run else f" movidos para {OBJECTS_DIR}/ ({_megabytes(saved)} a menos)")
+        ))
+
+    def _report(self):
+        """Tamanho em disco (objetos únicos) e descompactado (soma das versões) por tipo"""
+        rows = MLModel.objects.exclude(artifact_path='').values_list(
+            'model_type', 'artifact_path', 'artifact_size', 'artifact_raw_size'
+        )
+        totals = {}
+        for model_type, path, size, raw_size in rows:
+            entry = totals.setdefault(model_type, {'versions': 0, 'raw': 0, 'paths': {}})
+            entry['versions'] += 1
+            entry['raw'] += raw_size or size or 0
+            entry['paths'][path] = size or 0
+
+        for model_type, entry in sorted(totals.items()):
+            self.stdout.write(
+                f"  {model_type}: {entry['versions']} versões em {len(entry['paths'])} artefatos, "
+                f"{_megabytes(sum(entry['paths'].values()))} em disco "
+                f"({_megabytes(entry['raw'])} descompactado)"
+            )
@@ -0,0 +1,47 @@
+# backend/ml_models/management/commands/run_training_worker.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from ml_models.jobs import claim_next_job, recover_stale_jobs, run_supervised, worker_name
+
+
+class Command(BaseCommand):
+    help = 'Executa os jobs de treinamento enfileirados pela API (POST /ml/api/train/)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Processa os jobs na fila e encerra (para cron), em vez de aguardar novos'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Segundos entre consultas à fila quando vazia (padrão: 5)'
+        )
+
+    def handle(self, *args, **options):
+        name = worker_name()
+        self.stdout.write(f"Worker de treinamento {name} aguardando jobs...")
+
+        while True:
+            recovered = recover_stale_jobs()
+            if recovered:
+                self.stdout.write(self.style.WARNING(f"{recovered} jobs sem heartbeat marcados como falhos"))
+
+            job = claim_next_job(name)
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f"Job {job.id}: {', '.join(job.job_options['model_types'])}")
+            run_supervised(job)
+            job.refresh_from_db()
+
+            style = self.style.SUCCESS if job.status == 'completed' else self.style.ERROR
+            self.stdout.write(style(f"Job {job.id}: {job.get_status_display()} - {job.progress_message}"))
@@ -0,0 +1,95 @@
+# backend/ml_models/management/commands/shadow_report.py
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ml_models.models import MLModel
+from ml_models.shadow import build_shadow_report
+
+
+class Command(BaseCommand):
+    help = 'Compara os modelos candidatos em sombra com os modelos ativos (concordância e latência)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=7,
+            help='Período avaliado em dias (padrão: 7)'
+        )
+        parser.add_argument(
+            '--model-type',
+            choices=[choice for choice, _ in MLModel.MODEL_TYPES],
+            help='Limita o relatório a um tipo de modelo'
+        )
+        parser.add_argument(
+            '--set-candidate',
+            type=int,
+            metavar='MODEL_ID',
+            help='Define o MLModel (inativo) como candidato em sombra do seu tipo'
+        )
+        parser.add_argument(
+            '--clear-candidate',
+            choices=[choice for choice, _ in MLModel.MODEL_TYPES],
+            metavar='MODEL_TYPE',
+            help='Remove o candidato em sombra do tipo informado'
+        )
+
+    def handle(self, *args, **options):
+        if options['set_candidate'] is not None:
+            self._set_candidate(options['set_candidate'])
+        if options['clear_candidate']:
+            cleared = MLModel.objects.filter(model_type=options['clear_candidate'], is_shadow=True).update(is_shadow=False)
+            self.stdout.write(self.style.SUCCESS(f"Candidatos removidos: {cleared}"))
+
+        candidates = MLModel.objects.filter(is_shadow=True)
+        if options['model_type']:
+            candidates = candidates.filter(model_type=options['model_type'])
+        if not candidates.exists():
+            self.stdout.write(self.style.WARNING("Nenhum candidato em sombra configurado"))
+
+        report = build_shadow_report(model_type=options['model_type'], days=options['days'])
+        if not report:
+            self.stdout.write(self.style.WARNING(f"Nenhuma avaliação em sombra nos últimos {options['days']} dias"))
+            return
+
+        for item in report:
+            shadow, active = item['shadow_model'], item['active_model']
+            active_label = f"{active['name']} v{active['version']}" if active else 'removido'
+            self.stdout.write(self.style.SUCCESS(
+                f"{item['model_type']}: candidato {shadow['name']} v{shadow['version']} x ativo {active_label}"
+            ))
+            self.stdout.write(f"  amostras:     {item['samples']} ({item['errors']} com erro)")
+
+            if not item['compared']:
+                continue
+
+            self.stdout.write(f"  concordância: {item['agreement_rate'] * 100:.1f}%")
+            if item['mean_difference'] is not None:
+                self.stdout.write(
+                    f"  diferença:    média {item['mean_difference']:.4f} / máxima {item['max_difference']:.4f}"
+                )
+            for percentile in ('p50', 'p95'):
+                self.stdout.write(
+                    f"  latência {percentile}: ativo {item['active_latency_ms'][percentile]:.3f}ms / "
+                    f"candidato {item['shadow_latency_ms'][percentile]:.3f}ms "
+                    f"({item['latency_delta_ms'][percentile]:+.3f}ms)"
+                )
+
+    def _set_candidate(self, model_id):
+        try:
+            candidate = MLModel.objects.get(pk=model_id)
+        except MLModel.DoesNotExist:
+            raise CommandError(f"MLModel {model_id} não encontrado")
+        if candidate.is_active:
+            raise CommandError(f"{candidate} está ativo e não pode ser avaliado em sombra")
+
+        with transaction.atomic():
+            # Apenas um candidato por tipo (restrição unique_shadow_model_per_type)
+            MLModel.objects.filter(model_type=candidate.model_type, is_shadow=True).exclude(
+                pk=candidate.pk
+            ).update(is_shadow=False)
+            candidate.is_shadow = True
+            candidate.save(update_fields=['is_shadow'])
+
+        self.stdout.write(self.style.SUCCESS(f"Candidato em sombra: {candidate}"))
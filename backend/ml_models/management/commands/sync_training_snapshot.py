@@ -0,0 +1,53 @@
+# backend/ml_models/management/commands/sync_training_snapshot.py
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ml_models.snapshots import TABLES, snapshot_store
+
+
+class Command(BaseCommand):
+    help = 'Grava os dias fechados de leituras e estados do ventilador no snapshot colunar usado pelo treino'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days-back',
+            type=int,
+            help='Sincroniza apenas os últimos N dias (padrão: todo o histórico)'
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Regrava todos os dias do período (ex.: após corrigir valores no banco)'
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Remove todo o snapshot antes de sincronizar'
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            snapshot_store.clear()
+            self.stdout.write(self.style.WARNING(f"Snapshot removido de {snapshot_store.base_dir}"))
+
+        start = None
+        if options['days_back'] is not None:
+            start = timezone.now() - timedelta(days=options['days_back'])
+
+        for table in TABLES:
+            began = time.perf_counter()
+            result = snapshot_store.sync(table, start=start, rebuild=options['rebuild'])
+            elapsed = time.perf_counter() - began
+            manifest = snapshot_store.read_manifest(table)
+
+            self.stdout.write(self.style.SUCCESS(
+                f"{table}: {result['written']} dias gravados, {result['removed']} removidos em {elapsed:.2f}s"
+            ))
+            self.stdout.write(
+                f"  {len(manifest)} dias no snapshot, "
+                f"{sum(info['rows'] for info in manifest.values())} linhas"
+            )
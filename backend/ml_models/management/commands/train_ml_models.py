@@ -5,6 +5,7 @@ from ml_models.ml_algorithms import (
     FanOptimizationModel,
     AnomalyDetectionModel
 )
+from ml_models.training import MODEL_TYPES, train_models
 
 class Command(BaseCommand):
     help = 'Treina os modelos ML iniciais'
@@ -15,43 +16,150 @@ class Command(BaseCommand):
             action='store_true',
             help='Pula o treinamento se já existirem modelos ativos',
         )
+        parser.add_argument(
+            '--model-type',
+            action='append',
+            choices=MODEL_TYPES,
+            help='Treina apenas o tipo informado (pode ser repetido)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Treina mesmo os tipos que já têm modelo ativo',
+        )
+        parser.add_argument(
+            '--days-back',
+            type=int,
+            default=30,
+            help='Dias de dados usados no treinamento (padrão: 30)',
+        )
+        mode = parser.add_mutually_exclusive_group()
+        mode.add_argument(
+            '--parallel',
+            action='store_true',
+            help='Treina os tipos em paralelo, um processo por tipo, a partir de um snapshot único',
+        )
+        mode.add_argument(
+            '--sequential',
+            action='store_true',
+            help='Mesmo fluxo do --parallel em um único processo (linha de base para o speedup)',
+        )
+        parser.add_argument(
+            '--compare',
+            action='store_true',
+            help='Com --parallel, mede antes o fluxo sequencial (sem registrar) e mostra o speedup',
+        )
+        parser.add_argument(
+            '--cores-per-job',
+            type=int,
+            help='Núcleos por ajuste no modo paralelo (padrão: núcleos / número de tipos)',
+        )
+        parser.add_argument(
+            '--activate',
+            action='store_true',
+            help='Ativa os modelos treinados (por padrão ficam inativos, para avaliação em sombra)',
+        )
 
     def handle(self, *args, **options):
         skip_if_exists = options['skip_if_exists']
-        
+
+        model_types = options['model_type'] or list(MODEL_TYPES)
+
+        # Só conta como existente o modelo ativo cujo artefato pode ser
+        # carregado: após um redeploy sem disco persistente o registro fica,
+        # mas o arquivo em ML_MODELS_DIR se perde
+        active_types = set()
+        for ml_model in MLModel.objects.filter(model_type__in=model_types, is_active=True):
+            if ml_model.has_artifact():
+                active_types.add(ml_model.model_type)
+            else:
+                self.stdout.write(self.style.WARNING(f'{ml_model}: artefato não encontrado, será retreinado'))
+
         # Verifica se já existem modelos ativos
-        if skip_if_exists:
-            active_models = MLModel.objects.filter(is_active=True).count()
-            if active_models > 0:
-                self.stdout.write(
-                    self.style.SUCCESS(f'Encontrados {active_models} modelos ativos. Pulando treinamento.')
-                )
-                return
-        
+        if skip_if_exists and active_types >= set(model_types):
+            self.stdout.write(
+                self.style.SUCCESS(f'Encontrados {len(active_types)} modelos ativos. Pulando treinamento.')
+            )
+            return
+
+        if not options['force']:
+            model_types = [model_type for model_type in model_types if model_type not in active_types]
+
+        if options['parallel'] or options['sequential']:
+            self._train_snapshot(model_types, options)
+            return
+
         self.stdout.write('Iniciando treinamento dos modelos ML...')
-        
+
         try:
             # Temperatura
             temp_model = TemperaturePredictionModel()
-            if not MLModel.objects.filter(model_type='temperature_prediction', is_active=True).exists():
+            if 'temperature_prediction' in model_types:
                 self.stdout.write('Treinando modelo de previsão de temperatura...')
-                temp_model.train()
-            
+                temp_model.train(days_back=options['days_back'])
+
             # Fan Optimization
             fan_model = FanOptimizationModel()
-            if not MLModel.objects.filter(model_type='fan_optimization', is_active=True).exists():
+            if 'fan_optimization' in model_types:
                 self.stdout.write('Treinando modelo de otimização do ventilador...')
-                fan_model.train()
-            
+                fan_model.train(days_back=options['days_back'])
+
             # Anomaly Detection
             anomaly_model = AnomalyDetectionModel()
-            if not MLModel.objects.filter(model_type='anomaly_detection', is_active=True).exists():
+            if 'anomaly_detection' in model_types:
                 self.stdout.write('Treinando modelo de detecção de anomalias...')
-                anomaly_model.train()
-            
+                anomaly_model.train(days_back=options['days_back'])
+
             self.stdout.write(self.style.SUCCESS('Modelos ML treinados com sucesso!'))
-            
+
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(f'Erro durante o treinamento: {str(e)}')
-            )
\ No newline at end of file
+            )
+
+    def _train_snapshot(self, model_types, options):
+        if not model_types:
+            self.stdout.write(self.style.SUCCESS('Todos os tipos já têm modelo ativo (use --force para retreinar).'))
+            return
+
+        baseline = None
+        if options['compare'] and options['parallel']:
+            self.stdout.write('Medindo a linha de base sequencial (n_jobs=-1, sem registrar modelos)...')
+            baseline = train_models(model_types, days_back=options['days_back'], record=False)
+
+        mode = 'paralelo' if options['parallel'] else 'sequencial'
+        self.stdout.write(f"Treinando {', '.join(model_types)} ({mode}, {options['days_back']} dias)...")
+
+        summary = train_models(
+            model_types,
+            days_back=options['days_back'],
+            parallel=options['parallel'],
+            cores_per_job=options['cores_per_job'],
+            activate=options['activate']
+        )
+
+        for item in summary['results']:
+            if item['status'] != 'completed':
+                self.stdout.write(self.style.ERROR(
+                    f"  {item['model_type']}: falhou (sessão {item['session_id']}) - {item['error']}"
+                ))
+                continue
+            self.stdout.write(self.style.SUCCESS(
+                f"  {item['model_type']}: {item['model']} (sessão {item['session_id']})"
+            ))
+            if item['wall_time'] is not None:
+                self.stdout.write(
+                    f"    relógio {item['wall_time']:.2f}s / CPU {item['cpu_time']:.2f}s, "
+                    f"{item['metrics'].get('training_samples', 0)} amostras"
+                )
+
+        cores = summary['cores_per_job'] or 'todos'
+        self.stdout.write(
+            f"Snapshot em {summary['snapshot_time']:.2f}s; ponta a ponta {summary['elapsed']:.2f}s "
+            f"(núcleos por ajuste: {cores})"
+        )
+        if baseline is not None:
+            self.stdout.write(
+                f"Sequencial {baseline['elapsed']:.2f}s x paralelo {summary['elapsed']:.2f}s -> "
+                f"speedup {baseline['elapsed'] / summary['elapsed']:.2f}x"
+            )
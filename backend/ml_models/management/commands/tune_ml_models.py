@@ -0,0 +1,146 @@
+# backend/ml_models/management/commands/tune_ml_models.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ml_models.training import TRAINERS, extract_snapshot, register_model
+from ml_models.tuning import SEARCH_SPACES, successive_halving, tuning_xy
+
+
+class Command(BaseCommand):
+    help = 'Busca os hiperparâmetros das florestas com validação temporal dentro de um orçamento de tempo/CPU'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model-type',
+            action='append',
+            choices=sorted(SEARCH_SPACES),
+            help='Ajusta apenas o tipo informado (pode ser repetido)'
+        )
+        parser.add_argument(
+            '--days-back',
+            type=int,
+            default=30,
+            help='Número de dias de dados (padrão: 30)'
+        )
+        parser.add_argument(
+            '--candidates',
+            type=int,
+            default=27,
+            help='Configurações sorteadas para a primeira rodada (padrão: 27)'
+        )
+        parser.add_argument(
+            '--eta',
+            type=int,
+            default=3,
+            help='Fator de corte por rodada do successive halving (padrão: 3)'
+        )
+        parser.add_argument(
+            '--splits',
+            type=int,
+            default=3,
+            help='Dobras do TimeSeriesSplit (padrão: 3)'
+        )
+        parser.add_argument(
+            '--time-budget',
+            type=float,
+            default=300.0,
+            help='Orçamento de tempo de relógio por tipo, em segundos (padrão: 300)'
+        )
+        parser.add_argument(
+            '--cpu-budget',
+            type=float,
+            help='Orçamento de CPU por tipo, somado entre os processos, em segundos (padrão: sem limite)'
+        )
+        parser.add_argument(
+            '--latency-weight',
+            type=float,
+            default=0.05,
+            help='Peso da latência (ms por predição) no objetivo MAE + peso * latência (padrão: 0.05)'
+        )
+        parser.add_argument(
+            '--n-jobs',
+            type=int,
+            default=-1,
+            help='Processos para as avaliações (padrão: -1, todos os núcleos)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Semente do sorteio das configurações (padrão: 42)'
+        )
+        parser.add_argument(
+            '--save',
+            action='store_true',
+            help='Treina a configuração vencedora e a registra como nova versão (usada pelos próximos treinos)'
+        )
+        parser.add_argument(
+            '--activate',
+            action='store_true',
+            help='Com --save, ativa o modelo registrado'
+        )
+
+    def handle(self, *args, **options):
+        if options['candidates'] < 1 or options['eta'] < 2 or options['splits'] < 2:
+            raise CommandError("--candidates deve ser positivo, --eta e --splits pelo menos 2")
+        if options['activate'] and not options['save']:
+            raise CommandError("--activate exige --save")
+
+        snapshot = extract_snapshot(options['days_back'])
+
+        for model_type in options['model_type'] or sorted(SEARCH_SPACES):
+            try:
+                X, y = tuning_xy(model_type, snapshot)
+            except ValueError as e:
+                self.stdout.write(self.style.WARNING(f"{model_type}: {str(e)}"))
+                continue
+
+            search = successive_halving(
+                model_type, X, y,
+                n_candidates=options['candidates'],
+                eta=options['eta'],
+                n_splits=options['splits'],
+                time_budget=options['time_budget'],
+                cpu_budget=options['cpu_budget'],
+                latency_weight=options['latency_weight'],
+                n_jobs=options['n_jobs'],
+                random_state=options['seed']
+            )
+            best = search['best']
+
+            self.stdout.write(self.style.SUCCESS(f"{model_type}: {best['params']}"))
+            for index, round_info in enumerate(search['rounds'], 1):
+                self.stdout.write(
+                    f"  rodada {index}: {round_info['candidates']} candidatos x {round_info['resource']} amostras "
+                    f"em {round_info['elapsed']:.1f}s (CPU {round_info['cpu_time']:.1f}s)"
+                )
+            self.stdout.write(
+                f"  MAE {best['mae']:.4f}, latência {best['latency_ms']:.3f} ms, objetivo {best['objective']:.4f}"
+            )
+            self.stdout.write(f"  Total: {search['elapsed']:.1f}s, CPU {search['cpu_time']:.1f}s")
+            if search['stopped_by_budget']:
+                self.stdout.write(self.style.WARNING("  busca interrompida pelo orçamento"))
+
+            if not options['save']:
+                continue
+
+            artifact, metrics = TRAINERS[model_type](snapshot, options['n_jobs'], best['params'])
+            ml_model = register_model(model_type, artifact, metrics, activate=options['activate'])
+            ml_model.description = 'Treinado por tune_ml_models'
+            ml_model.hyperparameters['tuning'] = {
+                'params': best['params'],
+                'mae': best['mae'],
+                'latency_ms': best['latency_ms'],
+                'objective': best['objective'],
+                'latency_weight': options['latency_weight'],
+                'splits': options['splits'],
+                'rounds': len(search['rounds']),
+                'elapsed': search['elapsed'],
+                'cpu_time': search['cpu_time'],
+                'stopped_by_budget': search['stopped_by_budget'],
+                'days_back': options['days_back'],
+            }
+            ml_model.save(update_fields=['description', 'hyperparameters'])
+            self.stdout.write(self.style.SUCCESS(
+                f"  registrado como {ml_model} (id {ml_model.id}){', ativo' if options['activate'] else ''}"
+            ))
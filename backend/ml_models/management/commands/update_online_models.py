@@ -0,0 +1,80 @@
+# backend/ml_models/management/commands/update_online_models.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ml_models.incremental import STREAMS, update_learner
+from ml_models.training import activate_model
+
+
+class Command(BaseCommand):
+    help = 'Atualiza os modelos incrementais (partial_fit) com as leituras novas, sem retreino completo'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model-type',
+            action='append',
+            choices=sorted(STREAMS),
+            help='Atualiza apenas o tipo informado (pode ser repetido)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=256,
+            help='Amostras por micro-lote (padrão: 256)'
+        )
+        parser.add_argument(
+            '--checkpoint-every',
+            type=int,
+            default=20,
+            help='Lotes entre checkpoints no MLModel (padrão: 20; sempre há um ao final)'
+        )
+        parser.add_argument(
+            '--init',
+            action='store_true',
+            help='Cria o modelo incremental do tipo se ainda não existir'
+        )
+        parser.add_argument(
+            '--days-back',
+            type=int,
+            default=7,
+            help='Histórico incorporado por um modelo recém-criado (padrão: 7)'
+        )
+        parser.add_argument(
+            '--activate',
+            action='store_true',
+            help='Ativa o modelo incremental do tipo após a atualização'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['checkpoint_every'] < 1:
+            raise CommandError("--batch-size e --checkpoint-every devem ser positivos")
+
+        for model_type in options['model_type'] or sorted(STREAMS):
+            stats = update_learner(
+                model_type,
+                batch_size=options['batch_size'],
+                checkpoint_every=options['checkpoint_every'],
+                days_back=options['days_back'],
+                create=options['init']
+            )
+            if stats is None:
+                self.stdout.write(self.style.WARNING(
+                    f"{model_type}: nenhum modelo incremental (use --init para criar)"
+                ))
+                continue
+
+            ml_model = stats['model']
+            self.stdout.write(self.style.SUCCESS(f"{model_type}: {ml_model} (id {ml_model.id})"))
+            self.stdout.write(
+                f"  {stats['samples']} amostras novas em {stats['batches']} lotes, "
+                f"{stats['checkpoints']} checkpoints ({stats['samples_seen']} no total)"
+            )
+            if stats['recent_mae'] is not None:
+                self.stdout.write(f"  MAE prequencial recente: {stats['recent_mae']:.3f}")
+
+            if options['activate'] and not ml_model.is_active:
+                if not ml_model.artifact_path:
+                    self.stdout.write(self.style.WARNING("  sem amostras ainda; modelo não ativado"))
+                    continue
+                activate_model(ml_model)
+                self.stdout.write(self.style.SUCCESS("  ativado"))
@@ -0,0 +1,99 @@
+# backend/ml_models/management/commands/verify_predictions.py
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ml_models.models import MLModel
+from ml_models.verification import verify_temperature_predictions, compute_performance_metrics
+
+
+class Command(BaseCommand):
+    help = 'Verifica as predições de temperatura com as leituras reais e grava MAE/RMSE por janela'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Período de predições processado em dias (padrão: 30)'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=int,
+            default=30,
+            help='Distância máxima em minutos entre o horário previsto e a leitura (padrão: 30)'
+        )
+        parser.add_argument(
+            '--window-hours',
+            type=int,
+            default=24,
+            help='Tamanho da janela das métricas em horas (padrão: 24)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Predições lidas por consulta (padrão: 5000)'
+        )
+        parser.add_argument(
+            '--skip-metrics',
+            action='store_true',
+            help='Apenas preenche actual_value/is_verified'
+        )
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options['days'])
+
+        start = time.perf_counter()
+        stats = verify_temperature_predictions(
+            since,
+            tolerance_minutes=options['tolerance'],
+            batch_size=options['batch_size']
+        )
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Predições verificadas: {stats['verified']} de {stats['scanned']} em {elapsed:.1f}s"
+        ))
+        self.stdout.write(
+            f"  horizontes com leitura: {stats['matched_points']} / sem leitura: {stats['missing_points']}"
+        )
+        if stats['unrecognized']:
+            self.stdout.write(self.style.WARNING(
+                f"  {stats['unrecognized']} predições em formato desconhecido marcadas como verificadas sem valor real"
+            ))
+        if stats['pending']:
+            self.stdout.write(self.style.WARNING(
+                f"  {stats['pending']} predições aguardando leituras do horário previsto"
+            ))
+
+        if options['skip_metrics']:
+            return
+
+        start = time.perf_counter()
+        results = compute_performance_metrics(
+            since,
+            window_hours=options['window_hours'],
+            batch_size=options['batch_size']
+        )
+        elapsed = time.perf_counter() - start
+
+        if not results:
+            self.stdout.write(self.style.WARNING("Nenhuma predição verificada para calcular métricas"))
+            return
+
+        names = dict(MLModel.objects.filter(
+            id__in={item['model_id'] for item in results}
+        ).values_list('id', 'name'))
+        self.stdout.write(self.style.SUCCESS(
+            f"Métricas gravadas: {len(results)} janelas de {options['window_hours']}h em {elapsed:.1f}s"
+        ))
+        for item in results:
+            self.stdout.write(
+                f"  {names.get(item['model_id'], item['model_id'])} "
+                f"{item['window_start'].strftime('%Y-%m-%d %H:%M')}: "
+                f"MAE {item['mae']:.3f} / RMSE {item['rmse']:.3f} ({item['samples']} pontos)"
+            )
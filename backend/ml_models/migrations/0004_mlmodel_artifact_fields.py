@@ -0,0 +1,95 @@
+import hashlib
+import os
+import pickle
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def export_model_data(apps, schema_editor):
+    """Grava os modelos armazenados em model_data como artefatos em ML_MODELS_DIR"""
+    import joblib
+
+    MLModel = apps.get_model('ml_models', 'MLModel')
+    for ml_model in MLModel.objects.exclude(model_data=None).iterator():
+        try:
+            model_data = pickle.loads(bytes(ml_model.model_data))
+        except Exception as e:
+            print(f"Modelo {ml_model.pk} ignorado: não foi possível ler model_data ({e})")
+            continue
+
+        path = os.path.join(ml_model.model_type, f'{ml_model.model_type}_v{ml_model.version}.joblib')
+        full_path = os.path.join(settings.ML_MODELS_DIR, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        joblib.dump(model_data, full_path)
+
+        digest = hashlib.sha256()
+        with open(full_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+
+        ml_model.artifact_path = path
+        ml_model.artifact_checksum = digest.hexdigest()
+        ml_model.artifact_size = os.path.getsize(full_path)
+        ml_model.save(update_fields=['artifact_path', 'artifact_checksum', 'artifact_size'])
+
+
+def import_model_data(apps, schema_editor):
+    """Reverso: grava em model_data os artefatos dos registros que não o têm"""
+    import lzma
+
+    import joblib
+    from joblib.compressor import BinaryZlibFile
+
+    MLModel = apps.get_model('ml_models', 'MLModel')
+    for ml_model in MLModel.objects.filter(model_data=None).exclude(artifact_path='').iterator():
+        full_path = os.path.join(settings.ML_MODELS_DIR, ml_model.artifact_path)
+        try:
+            # Artefatos compactados (objects/<sha>.joblib.z ou .xz) são lidos
+            # pelo arquivo descompactador; os demais direto
+            if full_path.endswith('.z'):
+                with BinaryZlibFile(full_path, 'rb') as artifact_file:
+                    model_data = joblib.load(artifact_file)
+            elif full_path.endswith('.xz'):
+                with lzma.LZMAFile(full_path, 'rb') as artifact_file:
+                    model_data = joblib.load(artifact_file)
+            else:
+                model_data = joblib.load(full_path)
+        except Exception as e:
+            print(f"Modelo {ml_model.pk} ignorado: não foi possível ler {ml_model.artifact_path} ({e})")
+            continue
+
+        ml_model.model_data = pickle.dumps(model_data)
+        ml_model.save(update_fields=['model_data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ml_models', '0003_merge_20251007_1900'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mlmodel',
+            name='artifact_path',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='mlmodel',
+            name='artifact_checksum',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='mlmodel',
+            name='artifact_size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        # model_data continua no banco por uma versão: o rollback volta a
+        # usá-lo e load_model recria o artefato a partir dele se o arquivo
+        # se perder
+        migrations.RunPython(
+            code=export_model_data,
+            reverse_code=import_model_data,
+        ),
+    ]
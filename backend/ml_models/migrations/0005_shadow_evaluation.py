@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ml_models', '0004_mlmodel_artifact_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShadowPrediction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('input_data', models.JSONField()),
+                ('active_output', models.JSONField()),
+                ('shadow_output', models.JSONField(blank=True, null=True)),
+                ('active_latency_ms', models.FloatField()),
+                ('shadow_latency_ms', models.FloatField(blank=True, null=True)),
+                ('agreement', models.BooleanField(blank=True, null=True)),
+                ('difference', models.FloatField(blank=True, null=True)),
+                ('error_message', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='mlmodel',
+            name='is_shadow',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddConstraint(
+            model_name='mlmodel',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_shadow', True)), fields=('model_type',), name='unique_shadow_model_per_type'),
+        ),
+        migrations.AddField(
+            model_name='shadowprediction',
+            name='active_model',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='shadowed_predictions', to='ml_models.mlmodel'),
+        ),
+        migrations.AddField(
+            model_name='shadowprediction',
+            name='shadow_model',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shadow_predictions', to='ml_models.mlmodel'),
+        ),
+        migrations.AddIndex(
+            model_name='shadowprediction',
+            index=models.Index(fields=['shadow_model', 'created_at'], name='ml_models_s_shadow__6d162a_idx'),
+        ),
+    ]
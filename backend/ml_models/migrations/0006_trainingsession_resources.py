@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ml_models', '0005_shadow_evaluation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trainingsession',
+            name='cpu_time_seconds',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='trainingsession',
+            name='wall_time_seconds',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
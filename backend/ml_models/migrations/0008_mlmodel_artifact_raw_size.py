@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ml_models', '0007_trainingsession_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mlmodel',
+            name='artifact_raw_size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
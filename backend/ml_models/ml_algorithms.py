@@ -4,11 +4,11 @@ import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestRegressor, IsolationForest
 from sklearn.linear_model import LinearRegression
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 import joblib
 import os
 import logging
@@ -18,6 +18,12 @@ from sensors.models import Reading, FanState, FanLog
 from .models import MLModel, MLPrediction, TrainingSession, ModelPerformanceMetric
 from .base import BaseMLModel
 from .cache import model_cache
+from .features import compute_features, state_at, to_micros
+from .tree_compiler import compiled_models
+from .inference import RowBuffer, get_model_columns, get_row_buffer, transform_rows
+from .online_stats import device_stats
+from .snapshots import snapshot_store
+from .verification import HOUR, asof_join, load_readings
 
 logger = logging.getLogger(__name__)
 
@@ -25,8 +31,14 @@ logger = logging.getLogger(__name__)
 class TemperaturePredictionModel(BaseMLModel):
     """
     Modelo para predição de temperatura baseado em dados históricos
+    
+    Aceita dois tipos de estimador: o recursivo (uma saída, aplicado hora a
+    hora) e o direto (uma saída por horizonte, ver train_direct).
     """
     
+    # Horizontes, em horas, do previsor direto de múltiplas saídas
+    FORECAST_HORIZON = 24
+    
     def __init__(self):
         super().__init__(model_type='temperature_prediction')
         self._scaler = None
@@ -36,12 +48,30 @@ class TemperaturePredictionModel(BaseMLModel):
             'temp_rolling_mean_3', 'temp_rolling_std_3',
             'fan_state'
         ]
+        self.lag_columns = [
+            'temp_lag_1', 'temp_lag_2', 'temp_lag_3',
+            'temp_rolling_mean_3', 'temp_rolling_std_3'
+        ]
+        # O previsor direto também recebe a temperatura da leitura de origem
+        self.direct_feature_columns = self.feature_columns + ['temperature']
 
     @property
     def scaler(self):
         if self._scaler is None:
             self._scaler = StandardScaler()
         return self._scaler
+
+    @scaler.setter
+    def scaler(self, value):
+        self._scaler = value
+        
+    @property
+    def horizon(self):
+        """Horizontes previstos por chamada do modelo (1 no recursivo)"""
+        estimator = self.model
+        if isinstance(estimator, Pipeline):
+            estimator = estimator.steps[-1][1]
+        return int(getattr(estimator, 'n_outputs_', 1))
         
     def get_default_model(self):
         """
@@ -49,73 +79,163 @@ class TemperaturePredictionModel(BaseMLModel):
         """
         return RandomForestRegressor(n_estimators=50, random_state=42)
     
+    def get_default_direct_model(self):
+        """Floresta de múltiplas saídas do previsor direto"""
+        return RandomForestRegressor(
+            n_estimators=100,
+            max_depth=10,
+            min_samples_leaf=5,
+            random_state=42,
+            n_jobs=-1
+        )
+    
     def prepare_features(self, df):
         """
         Prepara features temporais e de lag para o modelo
-        """
-        # Features temporais
-        df['hour'] = df['timestamp'].dt.hour
-        df['day_of_week'] = df['timestamp'].dt.dayofweek
-        df['month'] = df['timestamp'].dt.month
-        
-        # Features de lag (temperaturas anteriores)
-        df['temp_lag_1'] = df['temperature'].shift(1)
-        df['temp_lag_2'] = df['temperature'].shift(2)
-        df['temp_lag_3'] = df['temperature'].shift(3)
         
-        # Features de rolling (médias móveis)
-        df['temp_rolling_mean_3'] = df['temperature'].rolling(window=3).mean()
-        df['temp_rolling_std_3'] = df['temperature'].rolling(window=3).std()
-        
-        # Estado do ventilador (assumindo que existe um modelo FanState)
-        # Se não houver correspondência exata, usar interpolação
-        df['fan_state'] = 0  # Default
+        As definições ficam em features.py, compartilhadas com a detecção de
+        anomalias e com as estatísticas online da inferência.
+        """
+        computed = compute_features(df['timestamp'], df['temperature'])
+        for column in self.feature_columns:
+            df[column] = computed[column]
+        return self.with_inference_fan_state(df)
+    
+    def with_inference_fan_state(self, df):
+        """
+        Zera o estado do ventilador das features
         
+        A inferência não conhece o estado do ventilador nas horas previstas
+        (predict usa 0), então o treino também usa 0.
+        """
+        df['fan_state'] = 0
         return df
     
+    def training_features(self, frame):
+        """Matriz de features do modelo a partir do DataFrame de feature_store (sem NaN)"""
+        df = frame.dropna(subset=[*self.feature_columns, 'temperature'])
+        return self.with_inference_fan_state(df[self.feature_columns].copy()), df['temperature']
+    
     def get_training_data(self, days_back=30):
         """
         Obtém dados de treinamento dos últimos N dias
+        
+        Leituras e estados vêm do snapshot colunar (ver snapshots.py).
         """
         end_date = timezone.now()
         start_date = end_date - timedelta(days=days_back)
         
         # Buscar dados de temperatura
-        readings = Reading.objects.filter(
-            timestamp__gte=start_date,
-            timestamp__lte=end_date
-        ).order_by('timestamp')
+        readings = snapshot_store.frame('readings', start_date, end_date)
         
-        if not readings.exists():
+        if readings.empty:
             raise ValueError("Não há dados suficientes para treinamento")
         
-        # Converter para DataFrame
-        df = pd.DataFrame(list(readings.values()))
+        # Buscar estados do ventilador
+        fan_states = snapshot_store.frame('fan_states', start_date, end_date)
+        
+        return self.training_frame(readings, fan_states)
+    
+    def training_frame(self, readings, fan_states):
+        """
+        Monta os dados de treino a partir de leituras e estados já carregados
+        
+        Usado por get_training_data e pelo treinamento em paralelo, que lê
+        o banco uma única vez para todos os modelos (ver training.py).
+        """
+        df = readings.sort_values('timestamp', kind='stable').reset_index(drop=True)
         df['timestamp'] = pd.to_datetime(df['timestamp'])
         
-        # Buscar estados do ventilador
-        fan_states = FanState.objects.filter(
-            timestamp__gte=start_date,
-            timestamp__lte=end_date
-        ).order_by('timestamp')
-        
-        if fan_states.exists():
-            fan_df = pd.DataFrame(list(fan_states.values()))
-            fan_df['timestamp'] = pd.to_datetime(fan_df['timestamp'])
-            
-            # Merge com interpolação
-            df = pd.merge_asof(
-                df.sort_values('timestamp'),
-                fan_df[['timestamp', 'state']].sort_values('timestamp'),
-                on='timestamp',
-                direction='backward'
+        if not fan_states.empty:
+            fan_df = fan_states.sort_values('timestamp', kind='stable')
+            # Último estado em ou antes de cada leitura (0 antes do primeiro)
+            df['fan_state'] = state_at(
+                to_micros(df['timestamp']), to_micros(fan_df['timestamp']), fan_df['state'].to_numpy()
             )
-            df['fan_state'] = df['state'].fillna(0).astype(int)
         else:
             df['fan_state'] = 0
         
         return df
     
+    def build_direct_dataset(self, df, horizon=FORECAST_HORIZON, tolerance_minutes=30):
+        """
+        Features de cada leitura e alvos deslocados de 1 a `horizon` horas
+        
+        As leituras não são igualmente espaçadas (a cada minuto durante um
+        acionamento do ventilador, de hora em hora fora dele), então o alvo
+        de h horas é a última leitura em ou antes de timestamp + h (join
+        as-of com tolerância), e não um shift de h linhas.
+        
+        Returns:
+            tuple: (X com direct_feature_columns, Y com uma coluna por
+                    horizonte, instantes das leituras em segundos)
+        """
+        df = self.prepare_features(df.sort_values('timestamp').reset_index(drop=True))
+        times = (df['timestamp'] - df['timestamp'].iloc[0]).dt.total_seconds().to_numpy()
+        temperatures = df['temperature'].to_numpy(dtype=np.float64)
+        
+        offsets = np.arange(1, horizon + 1) * HOUR
+        targets = (times[:, None] + offsets).ravel()
+        Y = asof_join(times, temperatures, targets, tolerance_minutes * 60.0).reshape(len(df), horizon)
+        
+        X = df[self.direct_feature_columns].astype(np.float64)
+        valid = X.notna().all(axis=1).to_numpy() & ~np.isnan(Y).any(axis=1)
+        return X[valid].reset_index(drop=True), Y[valid], times[valid]
+    
+    @staticmethod
+    def temporal_split(times, horizon, test_size=0.2):
+        """
+        Índices de treino e teste em ordem temporal
+        
+        Leituras de treino cujo último alvo cai no período de teste são
+        descartadas, para que nenhum alvo de teste seja visto no treino.
+        
+        Returns:
+            tuple: (índices de treino, índices de teste)
+        """
+        split = int(len(times) * (1 - test_size))
+        if split <= 0 or split >= len(times):
+            raise ValueError("Dados insuficientes para separar treino e teste")
+        train = np.flatnonzero(times[:split] + horizon * HOUR < times[split])
+        return train, np.arange(split, len(times))
+    
+    def train_direct(self, days_back=30, horizon=FORECAST_HORIZON, test_size=0.2):
+        """
+        Treina o previsor direto: uma floresta com uma saída por horizonte
+        
+        Todas as horas da previsão saem de uma única avaliação da floresta,
+        sem realimentar previsões como lags. O modelo não é salvo nem
+        ativado; o chamador decide se o registra (ex.: como candidato em
+        sombra com benchmark_forecasters --save).
+        
+        Returns:
+            dict: Métricas no período de teste (inclui o MAE por horizonte)
+        """
+        X, Y, times = self.build_direct_dataset(self.get_training_data(days_back), horizon)
+        if len(X) < 10:
+            raise ValueError("Dados insuficientes após limpeza (mínimo 10 amostras)")
+        
+        train_idx, test_idx = self.temporal_split(times, horizon, test_size)
+        if not len(train_idx):
+            raise ValueError(f"Histórico curto demais para treinar {horizon} horizontes")
+        
+        model = self.get_default_direct_model()
+        model.fit(X.iloc[train_idx], Y[train_idx])
+        
+        Y_pred = model.predict(X.iloc[test_idx])
+        errors = Y_pred - Y[test_idx]
+        self._model = model
+        
+        return {
+            'mse': float(np.mean(errors ** 2)),
+            'mae': float(np.mean(np.abs(errors))),
+            'r2': float(r2_score(Y[test_idx], Y_pred)),
+            'mae_by_horizon': [float(value) for value in np.abs(errors).mean(axis=0)],
+            'horizon': horizon,
+            'training_samples': int(len(train_idx)),
+            'test_samples': int(len(test_idx))
+        }
+    
     def train(self, days_back=30, test_size=0.2, force_retrain=False):
         """
         Desativado em produção - use o script de treinamento separado
@@ -192,42 +312,142 @@ class TemperaturePredictionModel(BaseMLModel):
             self._model = self.get_default_model()
             return False
     
+    def get_columns(self):
+        """Ordem das colunas esperada pelo modelo carregado"""
+        return get_model_columns(self.model, self.feature_columns)
+    
     def predict(self, hours_ahead=1):
         """
         Faz predição de temperatura para as próximas horas
+        
+        As features da última leitura vêm das estatísticas online do
+        dispositivo (online_stats.py), sem reconstruir o histórico com pandas.
         """
         if self.model is None:
             raise ValueError("Modelo não foi treinado")
         
-        # Obter dados recentes para construir features
-        recent_data = self.get_training_data(days_back=7)
-        recent_data = self.prepare_features(recent_data)
-        recent_data = recent_data.dropna()
+        last_reading = Reading.objects.filter(
+            timestamp__gte=timezone.now() - timedelta(days=7)
+        ).order_by('-timestamp').first()
         
-        if len(recent_data) == 0:
+        features = device_stats.peek_reading(last_reading) if last_reading else None
+        if features is None or any(features[column] is None for column in self.lag_columns):
             raise ValueError("Não há dados recentes suficientes para predição")
         
-        predictions = []
-        current_data = recent_data.iloc[-1:].copy()
+        values = {
+            'hour': last_reading.timestamp.hour,
+            'day_of_week': last_reading.timestamp.weekday(),
+            'month': last_reading.timestamp.month,
+            'fan_state': 0,
+            'temperature': float(last_reading.temperature),
+            **{column: features[column] for column in self.lag_columns},
+        }
+        return self.forecast_from(values, hours_ahead)
+    
+    def forecast_from(self, values, hours_ahead):
+        """
+        Previsão das próximas horas a partir das features de uma leitura
+        
+        Modelos de múltiplas saídas respondem todos os horizontes em uma
+        avaliação (até self.horizon horas); os de uma saída são aplicados
+        recursivamente, hora a hora.
+        """
+        if self.horizon > 1:
+            return self._direct_forecast(values, hours_ahead)
+        return self._recursive_forecast(values, hours_ahead)
+    
+    def _direct_forecast(self, values, hours_ahead):
+        rows = self.predict_rows(get_row_buffer(self.get_columns()).fill(values))
+        return [float(value) for value in np.asarray(rows)[0][:hours_ahead]]
+    
+    def _recursive_forecast(self, values, hours_ahead):
+        values = dict(values)
+        buffer = get_row_buffer(self.get_columns())
         
+        predictions = []
         for i in range(hours_ahead):
             # Ajustar hora
-            next_hour = current_data['hour'].iloc[0] + 1
-            if next_hour >= 24:
-                next_hour = 0
-            current_data['hour'] = next_hour
+            values['hour'] = (values['hour'] + 1) % 24
             
             # Fazer predição
-            X = current_data[self.feature_columns]
-            pred = self.model.predict(X)[0]
+            pred = float(self.predict_rows(buffer.fill(values))[0])
             predictions.append(pred)
             
             # Atualizar features de lag para próxima iteração
-            current_data['temp_lag_3'] = current_data['temp_lag_2']
-            current_data['temp_lag_2'] = current_data['temp_lag_1']
-            current_data['temp_lag_1'] = pred
+            values['temp_lag_3'] = values['temp_lag_2']
+            values['temp_lag_2'] = values['temp_lag_1']
+            values['temp_lag_1'] = pred
         
         return predictions
+    
+    def predict_next_hour(self, current_temperature, current_hour, features=None):
+        """
+        Prediz a temperatura da próxima hora a partir da leitura atual
+        
+        Args:
+            features: Features online da leitura atual (ver online_stats.py).
+                      Se omitido, são estimadas sem alterar as estatísticas.
+        
+        Returns:
+            dict: {'temperature', 'confidence'}
+        """
+        if self.model is None:
+            raise ValueError("Modelo não foi treinado")
+        
+        if features is None:
+            features = device_stats.peek(current_temperature)
+        
+        now = timezone.now()
+        if self.horizon > 1:
+            return self._direct_next_hour(current_temperature, current_hour, features, now)
+        
+        # A leitura atual passa a ser o lag 1 da próxima hora
+        lags = [current_temperature, features['temp_lag_1'], features['temp_lag_2']]
+        rolling_mean = features['temp_rolling_mean_3']
+        rolling_std = features['temp_rolling_std_3']
+        complete = all(value is not None for value in (*lags, rolling_mean, rolling_std))
+        
+        values = {
+            'hour': (current_hour + 1) % 24,
+            'day_of_week': now.weekday(),
+            'month': now.month,
+            'temp_lag_1': lags[0],
+            'temp_lag_2': lags[1] if lags[1] is not None else current_temperature,
+            'temp_lag_3': lags[2] if lags[2] is not None else current_temperature,
+            'temp_rolling_mean_3': rolling_mean if rolling_mean is not None else current_temperature,
+            'temp_rolling_std_3': rolling_std if rolling_std is not None else 0.0,
+            'fan_state': 0,
+        }
+        
+        prediction = self.predict_rows(get_row_buffer(self.get_columns()).fill(values))[0]
+        return {
+            'temperature': float(prediction),
+            # Histórico incompleto: lags preenchidos com a temperatura atual
+            'confidence': 0.7 if complete else 0.5
+        }
+    
+    def _direct_next_hour(self, current_temperature, current_hour, features, now):
+        """Primeiro horizonte do previsor direto (features da própria leitura atual)"""
+        values = {
+            'hour': current_hour,
+            'day_of_week': now.weekday(),
+            'month': now.month,
+            'fan_state': 0,
+            'temperature': current_temperature,
+        }
+        complete = True
+        for column in self.lag_columns:
+            value = features.get(column)
+            if value is None:
+                complete = False
+                value = 0.0 if column == 'temp_rolling_std_3' else current_temperature
+            values[column] = value
+        
+        prediction = self.predict_rows(get_row_buffer(self.get_columns()).fill(values))
+        return {
+            'temperature': float(np.asarray(prediction)[0][0]),
+            'confidence': 0.7 if complete else 0.5
+        }
 
 
 class FanOptimizationModel(BaseMLModel):
@@ -239,6 +459,8 @@ class FanOptimizationModel(BaseMLModel):
         super().__init__(model_type='fan_optimization')
         self._scaler = None
         self.temperature_threshold = 24.0  # Temperatura mais confortável
+        self.feature_columns = ['temp_before', 'duration_minutes', 'hour', 'day_of_week']
+        self.durations = [5, 10, 15, 20, 25, 30, 35, 40]  # Opções de duração (minutos)
         
     def get_default_model(self):
         """
@@ -256,6 +478,10 @@ class FanOptimizationModel(BaseMLModel):
         if self._scaler is None:
             self._scaler = StandardScaler()
         return self._scaler
+
+    @scaler.setter
+    def scaler(self, value):
+        self._scaler = value
     
     def create_dummy_data(self):
         """
@@ -294,65 +520,33 @@ class FanOptimizationModel(BaseMLModel):
     
     def get_training_data(self, days_back=30):
         """
-        Obtém dados de eficiência do ventilador de forma otimizada
-        """
-        data = []
+        Obtém dados de eficiência do ventilador em uma única passada
         
+        Estados e leituras do período vêm do snapshot colunar como arrays
+        (ver snapshots.py). Cada ciclo (dois estados ligados consecutivos)
+        recebe as leituras do seu intervalo por np.searchsorted, e as
+        temperaturas inicial, final e média vêm de reduções por segmento
+        (somas acumuladas), sem consulta por ciclo nem limite de registros.
+        """
         try:
-            # Limita o período de busca
             end_date = timezone.now()
             start_date = end_date - timedelta(days=days_back)
             
-            # Busca limitada de estados do ventilador
-            fan_states = list(FanState.objects.filter(
-                timestamp__gte=start_date,
-                timestamp__lte=end_date,
-                state=True  # Só estados ativos
-            ).order_by('timestamp')[:50])  # Limite máximo de registros
+            fan_states = snapshot_store.load('fan_states', start_date, end_date)
+            # Só estados ativos
+            state_times = fan_states['timestamp'][fan_states['state']] / 1e6
             
-            if not fan_states:
+            if len(state_times) < 2:
                 print("Sem dados de ventilador suficientes. Usando dados sintéticos.")
                 return self.create_dummy_data()
             
-            # Processa os estados em lote
-            for i in range(len(fan_states) - 1):
-                current_state = fan_states[i]
-                next_state = fan_states[i + 1]
-                
-                # Ignora ciclos muito longos
-                duration = (next_state.timestamp - current_state.timestamp).total_seconds() / 60
-                if duration > 60:  # Máximo 1 hora
-                    continue
-                
-                try:
-                    # Busca leituras de temperatura de forma otimizada
-                    readings = list(Reading.objects.filter(
-                        timestamp__gte=current_state.timestamp,
-                        timestamp__lte=next_state.timestamp
-                    ).order_by('timestamp')[:30])  # Limite de leituras por ciclo
-                    
-                    if len(readings) < 3:
-                        continue
-                    
-                    temp_before = readings[0].temperature
-                    temp_after = readings[-1].temperature
-                    temps_during = [r.temperature for r in readings[1:-1]]
-                    temp_during_avg = sum(temps_during) / len(temps_during)
-                    
-                    if temp_after < temp_before:  # Só considera ciclos com resfriamento
-                        cooling_efficiency = temp_before - temp_after
-                        data.append({
-                            'temp_before': temp_before,
-                            'duration_minutes': duration,
-                            'hour': current_state.timestamp.hour,
-                            'day_of_week': current_state.timestamp.weekday(),
-                            'cooling_efficiency': cooling_efficiency
-                        })
-                except Exception as e:
-                    print(f"Erro ao processar ciclo: {str(e)}")
-                    continue
-                    
-            if len(data) < 5:
+            reading_times, temperatures = load_readings(
+                datetime.fromtimestamp(state_times[0], tz=dt_timezone.utc),
+                datetime.fromtimestamp(state_times[-1], tz=dt_timezone.utc)
+            )
+            df = self.cycles_frame(state_times, reading_times, temperatures)
+            
+            if len(df) < 5:
                 print("Dados reais insuficientes. Usando dados sintéticos.")
                 return self.create_dummy_data()
                 
@@ -360,7 +554,47 @@ class FanOptimizationModel(BaseMLModel):
             print(f"Erro ao buscar dados de treinamento: {str(e)}")
             return self.create_dummy_data()
             
-        return pd.DataFrame(data)
+        return df
+    
+    def cycles_frame(self, state_times, reading_times, temperatures):
+        """
+        Ciclos de resfriamento a partir dos arrays ordenados
+        
+        Args:
+            state_times: Instantes (s) dos estados ligados
+            reading_times: Instantes (s) das leituras
+            temperatures: Temperatura de cada leitura
+        """
+        cycle_start, cycle_end = state_times[:-1], state_times[1:]
+        duration = (cycle_end - cycle_start) / 60
+        
+        # Leituras de cada ciclo: [first, last) com os dois extremos inclusivos
+        first = np.searchsorted(reading_times, cycle_start, side='left')
+        last = np.searchsorted(reading_times, cycle_end, side='right')
+        counts = last - first
+        
+        # Ignora ciclos muito longos (máximo 1 hora) ou com poucas leituras
+        valid = (duration <= 60) & (counts >= 3)
+        first, last, counts = first[valid], last[valid], counts[valid]
+        
+        temp_before = temperatures[first]
+        temp_after = temperatures[last - 1]
+        # Média das leituras intermediárias: somas acumuladas por segmento
+        cumulative = np.concatenate([[0.0], np.cumsum(temperatures)])
+        temp_during_avg = (cumulative[last - 1] - cumulative[first + 1]) / (counts - 2)
+        
+        # Só considera ciclos com resfriamento
+        cooling = temp_after < temp_before
+        started = pd.to_datetime(cycle_start[valid][cooling], unit='s', utc=True)
+        
+        return pd.DataFrame({
+            'temp_before': temp_before[cooling],
+            'duration_minutes': duration[valid][cooling],
+            'hour': started.hour,
+            'day_of_week': started.dayofweek,
+            'temp_during_avg': temp_during_avg[cooling],
+            'cooling_efficiency': (temp_before - temp_after)[cooling]
+        })
     
     def train(self, days_back=30, force_retrain=False):
         """
@@ -373,7 +607,7 @@ class FanOptimizationModel(BaseMLModel):
         """
         Método legado mantido para referência e desenvolvimento
         """
-        features = ['temp_before', 'duration_minutes', 'hour', 'day_of_week']
+        features = self.feature_columns
         
         # Verificar cache
         if not force_retrain and model_cache.get('fan_optimization'):
@@ -382,8 +616,7 @@ class FanOptimizationModel(BaseMLModel):
             return True
             
         try:
-            # Obtém dados limitados a 7 dias
-            df = self.get_training_data(days_back=min(days_back, 7))
+            df = self.get_training_data(days_back=days_back)
             
             # Verifica se precisa usar dados sintéticos
             if len(df) < 5:
@@ -444,43 +677,17 @@ class FanOptimizationModel(BaseMLModel):
             if self.model is None:
                 return self._simple_rule(current_temp)
                 
-            # Mais opções de duração
-            durations = [5, 10, 15, 20, 25, 30, 35, 40]
-            best_duration = None
-            best_efficiency = float('-inf')  # Começar com -infinito
-            
-            features = {
-                'temp_before': current_temp,
-                'hour': current_hour,
-                'day_of_week': datetime.now().weekday()
-            }
+            # Uma linha por duração, avaliadas em uma única chamada
+            buffer = get_row_buffer(get_model_columns(self.model, self.feature_columns), n_rows=len(self.durations))
+            buffer.set_column('temp_before', current_temp)
+            buffer.set_column('hour', current_hour)
+            buffer.set_column('day_of_week', datetime.now().weekday())
+            buffer.set_column('duration_minutes', self.durations)
+            predictions = self.predict_rows(buffer.rows)
             
-            # Testa diferentes durações
-            for duration in durations:
-                try:
-                    X_pred = pd.DataFrame([{
-                        **features,
-                        'duration_minutes': duration
-                    }])
-                    
-                    predicted_efficiency = float(self.model.predict(X_pred)[0])
-                    
-                    # Nova fórmula de eficiência que equilibra resfriamento e energia
-                    temp_reduction_weight = 2.0  # Peso para redução de temperatura
-                    energy_penalty = duration / 60  # Penalidade por consumo de energia
-                    
-                    # Score que favorece maior redução de temperatura com menor tempo
-                    efficiency_score = (predicted_efficiency * temp_reduction_weight) - energy_penalty
-                    
-                    if efficiency_score > best_efficiency:
-                        best_efficiency = efficiency_score
-                        best_duration = duration
-                except Exception as e:
-                    logger.warning(f"Erro ao testar duração {duration}: {str(e)}")
-                    continue
-            
-            if best_duration is not None:
-                return best_duration
+            best_duration = self._best_durations(predictions.reshape(1, -1))[0]
+            if best_duration > 0:
+                return int(best_duration)
                 
             return self._simple_rule(current_temp)
             
@@ -488,6 +695,71 @@ class FanOptimizationModel(BaseMLModel):
             logger.error(f"Erro na otimização: {str(e)}")
             return self._simple_rule(current_temp)
     
+    def optimize_fan_durations(self, temperatures, hours, days_of_week=None):
+        """
+        Versão em lote de optimize_fan_duration
+        
+        Todas as combinações entrada x duração são avaliadas em uma única
+        chamada do modelo.
+        
+        Returns:
+            ndarray: Duração recomendada (minutos) para cada entrada, na ordem
+        """
+        temperatures = np.asarray(temperatures, dtype=np.float64)
+        hours = np.asarray(hours, dtype=np.float64)
+        if days_of_week is None:
+            days_of_week = np.full(len(temperatures), datetime.now().weekday())
+        days_of_week = np.asarray(days_of_week, dtype=np.float64)
+        
+        results = np.zeros(len(temperatures), dtype=int)
+        pending = np.flatnonzero(temperatures > self.temperature_threshold)
+        if pending.size == 0:
+            return results
+        
+        try:
+            if self.model is None:
+                return np.array([self._simple_rule(t) for t in temperatures], dtype=int)
+            
+            n_durations = len(self.durations)
+            buffer = RowBuffer(get_model_columns(self.model, self.feature_columns), n_rows=pending.size * n_durations)
+            buffer.set_column('temp_before', np.repeat(temperatures[pending], n_durations))
+            buffer.set_column('hour', np.repeat(hours[pending], n_durations))
+            buffer.set_column('day_of_week', np.repeat(days_of_week[pending], n_durations))
+            buffer.set_column('duration_minutes', np.tile(self.durations, pending.size))
+            predictions = self.predict_rows(buffer.rows).reshape(pending.size, n_durations)
+            
+            results[pending] = self._best_durations(predictions)
+        except Exception as e:
+            logger.error(f"Erro na otimização em lote: {str(e)}")
+            results[pending] = 0
+        
+        # Entradas sem score válido seguem a regra simples
+        for i in pending[results[pending] == 0]:
+            results[i] = self._simple_rule(temperatures[i])
+        return results
+    
+    def _best_durations(self, predictions):
+        """
+        Melhor duração por linha de predições (uma coluna por duração)
+        
+        Returns:
+            ndarray: Duração escolhida por linha, ou 0 se nenhum score for válido
+        """
+        durations = np.asarray(self.durations, dtype=np.float64)
+        # Nova fórmula de eficiência que equilibra resfriamento e energia
+        temp_reduction_weight = 2.0  # Peso para redução de temperatura
+        energy_penalty = durations / 60  # Penalidade por consumo de energia
+        
+        # Score que favorece maior redução de temperatura com menor tempo
+        scores = (np.asarray(predictions, dtype=np.float64) * temp_reduction_weight) - energy_penalty
+        scores = np.where(np.isnan(scores), -np.inf, scores)
+        
+        # argmax retorna a primeira duração com o maior score, como a busca
+        # sequencial que trocava de duração apenas com score estritamente maior
+        best = np.argmax(scores, axis=1)
+        valid = np.isfinite(scores[np.arange(len(scores)), best])
+        return np.where(valid, durations[best], 0).astype(int)
+    
     def _simple_rule(self, current_temp):
         """
         Regra simples e conservadora baseada na temperatura
@@ -511,6 +783,8 @@ class AnomalyDetectionModel(BaseMLModel):
         super().__init__(model_type='anomaly_detection')
         self._scaler = StandardScaler()
         self.feature_names = ['temperature', 'hour', 'temp_diff', 'temp_deviation']
+        # Colunas de features.py usadas pelo modelo (temp_rolling_mean só entra no desvio)
+        self.derived_columns = ['hour', 'temp_diff', 'temp_rolling_mean', 'temp_deviation']
         self.normal_range = {'min': 18, 'max': 32}  # Faixa mais realista
         self.is_fitted = False
         
@@ -533,25 +807,27 @@ class AnomalyDetectionModel(BaseMLModel):
         end_date = timezone.now()
         start_date = end_date - timedelta(days=days_back)
         
-        readings = Reading.objects.filter(
-            timestamp__gte=start_date,
-            timestamp__lte=end_date
-        ).order_by('timestamp')
-        
-        df = pd.DataFrame(list(readings.values()))
-        if df.empty:
+        return self.training_frame(snapshot_store.frame('readings', start_date, end_date))
+    
+    def training_frame(self, readings):
+        """Features de anomalia a partir de leituras já carregadas (ver training.py)"""
+        if readings.empty:
             raise ValueError("Não há dados para treinamento de anomalias")
         
+        df = readings.copy()
         df['timestamp'] = pd.to_datetime(df['timestamp'])
         
-        # Features para detecção de anomalias
-        df['hour'] = df['timestamp'].dt.hour
-        df['temp_diff'] = df['temperature'].diff()
-        df['temp_rolling_mean'] = df['temperature'].rolling(window=5).mean()
-        df['temp_deviation'] = abs(df['temperature'] - df['temp_rolling_mean'])
+        # Features para detecção de anomalias (definições em features.py)
+        computed = compute_features(df['timestamp'], df['temperature'])
+        for column in self.derived_columns:
+            df[column] = computed[column]
         
         return df.dropna()
     
+    def training_features(self, frame):
+        """Matriz de features do modelo a partir do DataFrame de feature_store (sem NaN)"""
+        return frame.dropna(subset=self.derived_columns)[self.feature_names].fillna(0)
+    
     def train(self, days_back=30, force_retrain=False):
         """
         Desativado em produção - use o script de treinamento separado
@@ -622,9 +898,12 @@ class AnomalyDetectionModel(BaseMLModel):
             self.is_fitted = False
             return False
     
-    def detect_anomaly(self, temperature, hour=None):
+    def detect_anomaly(self, temperature, hour=None, temp_diff=0.0, temp_deviation=0.0):
         """
         Detecta se uma temperatura é anômala usando regras de negócio e modelo ML
+
+        temp_diff e temp_deviation devem vir das estatísticas online do
+        dispositivo (ver online_stats.py), as mesmas features do treinamento.
         """
         # 1. Verificação baseada em regras de negócio primeiro
         if temperature < self.normal_range['min'] or temperature > self.normal_range['max']:
@@ -647,33 +926,99 @@ class AnomalyDetectionModel(BaseMLModel):
             hour = datetime.now().hour
             
         try:
-            # Calcular features básicas (sem dados históricos completos)
-            temp_diff = 0  # Simplificado
-            temp_deviation = 0  # Simplificado
-            
-            X = np.array([[temperature, hour, temp_diff, temp_deviation]])
-            X_scaled = self.scaler.transform(X)
-            
-            prediction = self.model.predict(X_scaled)[0]
-            anomaly_score = self.model.score_samples(X_scaled)[0]
-            
-            # Determina se é uma anomalia baseado no score
-            is_anomaly = prediction == -1 and abs(anomaly_score) > 0.5
-            
-            return {
-                'is_anomaly': is_anomaly,
-                'anomaly_score': float(anomaly_score),
-                'confidence': float(abs(anomaly_score)),
-                'reason': 'ml_prediction' if is_anomaly else 'normal'
-            }
+            row = get_row_buffer(get_model_columns(self.scaler, self.feature_names)).fill({
+                'temperature': temperature,
+                'hour': hour,
+                'temp_diff': temp_diff,
+                'temp_deviation': temp_deviation
+            })
+            predictions, scores = self._evaluate(row)
+            return self._ml_result(predictions[0], scores[0])
         except Exception as e:
             # Fallback para regra simples em caso de erro
-            return {
-                'is_anomaly': False,
-                'anomaly_score': 0,
-                'confidence': 0.5,
-                'reason': f'error: {str(e)}'
-            }
+            return self._error_result(e)
+    
+    def detect_anomalies(self, temperatures, hours, temp_diffs, temp_deviations):
+        """
+        Versão em lote de detect_anomaly
+        
+        As entradas dentro da faixa normal são avaliadas em uma única
+        travessia da floresta.
+        
+        Returns:
+            list: Um resultado por entrada, na ordem recebida
+        """
+        temperatures = np.asarray(temperatures, dtype=np.float64)
+        out_of_range = (temperatures < self.normal_range['min']) | (temperatures > self.normal_range['max'])
+        results = [
+            {
+                'is_anomaly': True,
+                'anomaly_score': -1.0,
+                'confidence': 1.0,
+                'reason': 'temperature_out_of_range'
+            } if flag else None
+            for flag in out_of_range
+        ]
+        
+        pending = np.flatnonzero(~out_of_range)
+        if pending.size == 0:
+            return results
+        
+        if not self.is_fitted:
+            for i in pending:
+                results[i] = {
+                    'is_anomaly': False,
+                    'anomaly_score': 0.0,
+                    'confidence': 0.5,
+                    'reason': 'model_not_fitted'
+                }
+            return results
+        
+        try:
+            buffer = RowBuffer(get_model_columns(self.scaler, self.feature_names), n_rows=pending.size)
+            buffer.set_column('temperature', temperatures[pending])
+            buffer.set_column('hour', np.asarray(hours, dtype=np.float64)[pending])
+            buffer.set_column('temp_diff', np.asarray(temp_diffs, dtype=np.float64)[pending])
+            buffer.set_column('temp_deviation', np.asarray(temp_deviations, dtype=np.float64)[pending])
+            
+            predictions, scores = self._evaluate(buffer.rows)
+            for i, prediction, anomaly_score in zip(pending, predictions, scores):
+                results[i] = self._ml_result(prediction, anomaly_score)
+        except Exception as e:
+            error = self._error_result(e)
+            for i in pending:
+                results[i] = dict(error)
+        
+        return results
+    
+    def _evaluate(self, rows):
+        """Predições (1/-1) e scores das linhas, na ordem de colunas do scaler"""
+        X_scaled = transform_rows(self.scaler, rows)
+        
+        compiled = compiled_models.get(self.model)
+        if compiled is not None:
+            # Predição e score em uma única travessia da floresta
+            return compiled.evaluate(X_scaled)
+        return self.model.predict(X_scaled), self.model.score_samples(X_scaled)
+    
+    def _ml_result(self, prediction, anomaly_score):
+        # Determina se é uma anomalia baseado no score
+        is_anomaly = bool(prediction == -1 and abs(anomaly_score) > 0.5)
+        
+        return {
+            'is_anomaly': is_anomaly,
+            'anomaly_score': float(anomaly_score),
+            'confidence': float(abs(anomaly_score)),
+            'reason': 'ml_prediction' if is_anomaly else 'normal'
+        }
+    
+    def _error_result(self, error):
+        return {
+            'is_anomaly': False,
+            'anomaly_score': 0,
+            'confidence': 0.5,
+            'reason': f'error: {str(error)}'
+        }
 
 
 def train_all_models(force_retrain=False):
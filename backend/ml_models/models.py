@@ -2,8 +2,8 @@
 
 from django.db import models
 from django.utils import timezone
-import pickle
 import os
+import pickle
 from datetime import timedelta
 
 
@@ -30,6 +30,8 @@ class MLModel(models.Model):
     # Controle de versão
     version = models.CharField(max_length=20, default='1.0')
     is_active = models.BooleanField(default=False)
+    # Candidato avaliado em sombra (ver shadow.py) - no máximo um por tipo
+    is_shadow = models.BooleanField(default=False)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -39,33 +41,82 @@ class MLModel(models.Model):
     # Parâmetros do modelo (JSON)
     hyperparameters = models.JSONField(default=dict, blank=True)
     
-    # Modelo serializado armazenado no banco
+    # Artefato do modelo em disco (relativo a ML_MODELS_DIR)
+    artifact_path = models.CharField(max_length=255, blank=True)
+    artifact_checksum = models.CharField(max_length=64, blank=True)  # SHA-256
+    artifact_size = models.BigIntegerField(null=True, blank=True)  # bytes em disco (compactado)
+    artifact_raw_size = models.BigIntegerField(null=True, blank=True)  # bytes descompactado
+    
+    # Legado: modelo serializado com pickle no banco. Não é mais gravado, mas
+    # fica por uma versão para permitir rollback e recriar o artefato caso
+    # ML_MODELS_DIR seja perdido (ver load_model)
     model_data = models.BinaryField(null=True, blank=True)
     
     class Meta:
         ordering = ['-created_at']
         unique_together = ['model_type', 'version']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['model_type'],
+                condition=models.Q(is_shadow=True),
+                name='unique_shadow_model_per_type'
+            ),
+        ]
     
     def __str__(self):
+        if self.is_shadow:
+            return f"{self.name} v{self.version} (Sombra)"
         return f"{self.name} v{self.version} ({'Ativo' if self.is_active else 'Inativo'})"
     
+    def clean(self):
+        from django.core.exceptions import ValidationError
+
+        if self.is_active and self.is_shadow:
+            raise ValidationError("Um modelo ativo não pode ser também o candidato em sombra")
+    
     
     def load_model(self):
-        """Carrega o modelo pickle dos dados binários"""
+        """
+        Carrega o modelo do artefato em disco (arrays mapeados em memória)
+        
+        Se o arquivo não existir mas o registro ainda tiver o model_data
+        legado, o artefato é recriado a partir dele.
+        """
+        from .artifacts import artifact_store
+
         try:
+            if self.artifact_path and os.path.exists(artifact_store.resolve(self.artifact_path)):
+                return artifact_store.load(self.artifact_path, self.artifact_checksum)
             if self.model_data:
-                return pickle.loads(self.model_data)
-            else:
-                print("Modelo não encontrado no banco de dados")
+                print(f"Artefato ausente; recriando a partir do model_data legado: {self}")
+                # Só o artefato muda: o modelo não foi retreinado (last_trained fica)
+                artifact = artifact_store.save(pickle.loads(bytes(self.model_data)))
+                self.artifact_path = artifact['path']
+                self.artifact_checksum = artifact['checksum']
+                self.artifact_size = artifact['size']
+                self.artifact_raw_size = artifact['raw_size']
+                self.save(update_fields=['artifact_path', 'artifact_checksum', 'artifact_size', 'artifact_raw_size'])
+                return artifact_store.load(self.artifact_path, self.artifact_checksum)
+            print("Artefato do modelo não encontrado")
         except Exception as e:
             print(f"Erro ao carregar modelo: {e}")
         return None
     
+    def has_artifact(self):
+        """Indica se o modelo pode ser carregado (arquivo em disco ou model_data legado)"""
+        from .artifacts import artifact_store
+
+        if self.artifact_path and os.path.exists(artifact_store.resolve(self.artifact_path)):
+            return True
+        return bool(self.model_data)
+    
     def save_model(self, model_data):
         """
-        Salva o modelo como dados binários
+        Salva o modelo como artefato versionado em ML_MODELS_DIR
         model_data pode ser o modelo direto ou um dicionário com modelo e scaler
         """
+        from .artifacts import artifact_store
+
         try:
             # Se for apenas o modelo, converte para dicionário
             if not isinstance(model_data, dict):
@@ -75,8 +126,13 @@ class MLModel(models.Model):
             if 'model' not in model_data:
                 raise ValueError("model_data deve conter a chave 'model'")
             
-            # Serializa o modelo para dados binários
-            self.model_data = pickle.dumps(model_data)
+            # Grava o artefato (compactado, endereçado pelo conteúdo) e guarda
+            # apenas caminho, checksum e tamanhos
+            artifact = artifact_store.save(model_data)
+            self.artifact_path = artifact['path']
+            self.artifact_checksum = artifact['checksum']
+            self.artifact_size = artifact['size']
+            self.artifact_raw_size = artifact['raw_size']
             
             # Atualiza o timestamp
             self.last_trained = timezone.now()
@@ -135,16 +191,32 @@ class TrainingSession(models.Model):
     
     # Status
     STATUS_CHOICES = [
+        ('queued', 'Na fila'),
         ('running', 'Executando'),
         ('completed', 'Concluído'),
         ('failed', 'Falhou'),
+        ('cancelled', 'Cancelado'),
     ]
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
     
+    # Job em segundo plano (ver jobs.py): a sessão do job agrupa as sessões
+    # de cada tipo treinado e é acompanhada pelo worker e pela API
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, related_name='children', null=True, blank=True)
+    job_options = models.JSONField(default=dict, blank=True)
+    progress = models.PositiveSmallIntegerField(default=0)  # 0-100
+    progress_message = models.CharField(max_length=200, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    cancel_requested = models.BooleanField(default=False)
+    worker = models.CharField(max_length=100, blank=True)
+    
     # Timestamps
     started_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     
+    # Recursos do ajuste (ver training.py): tempo de relógio e de CPU do processo
+    wall_time_seconds = models.FloatField(null=True, blank=True)
+    cpu_time_seconds = models.FloatField(null=True, blank=True)
+    
     # Log de erros
     error_message = models.TextField(blank=True)
     
@@ -152,7 +224,10 @@ class TrainingSession(models.Model):
         ordering = ['-started_at']
     
     def __str__(self):
-        return f"Treinamento {self.model.name} - {self.started_at.strftime('%Y-%m-%d %H:%M')}"
+        if self.job_options:
+            return f"Job de treinamento #{self.id} - {self.started_at.strftime('%Y-%m-%d %H:%M')}"
+        name = self.model.name if self.model else 'sem modelo'
+        return f"Treinamento {name} - {self.started_at.strftime('%Y-%m-%d %H:%M')}"
     
     @property
     def duration(self):
@@ -187,3 +262,43 @@ class ModelPerformanceMetric(models.Model):
     
     def __str__(self):
         return f"{self.model.name} - {self.metric_name}: {self.metric_value:.4f}"
+
+
+class ShadowPrediction(models.Model):
+    """
+    Saída de um modelo candidato (sombra) para as mesmas entradas do modelo ativo
+
+    Gravada em segundo plano por shadow.py, fora do caminho da requisição,
+    para comparar concordância e latência antes de promover o candidato.
+    """
+    shadow_model = models.ForeignKey(MLModel, on_delete=models.CASCADE, related_name='shadow_predictions')
+    active_model = models.ForeignKey(
+        MLModel, on_delete=models.SET_NULL, related_name='shadowed_predictions', null=True, blank=True
+    )
+    
+    # Entradas compartilhadas e saídas dos dois modelos (JSON)
+    input_data = models.JSONField()
+    active_output = models.JSONField()
+    shadow_output = models.JSONField(null=True, blank=True)
+    
+    # Latência da inferência em milissegundos
+    active_latency_ms = models.FloatField()
+    shadow_latency_ms = models.FloatField(null=True, blank=True)
+    
+    # Comparação: decisão igual e diferença absoluta da saída numérica
+    agreement = models.BooleanField(null=True, blank=True)
+    difference = models.FloatField(null=True, blank=True)
+    
+    error_message = models.TextField(blank=True)
+    
+    # Timestamp
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['shadow_model', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Sombra {self.shadow_model.model_type} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
@@ -0,0 +1,289 @@
+# backend/ml_models/online_stats.py
+
+import logging
+import math
+import threading
+from collections import deque
+
+from .features import ANOMALY_WINDOW, LAG_WINDOW
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEVICE_ID = 'default-device'
+
+
+class RollingWindow:
+    """
+    Janela deslizante de tamanho fixo com média e desvio padrão
+
+    Como a janela é pequena e de tamanho fixo, cada atualização e consulta
+    custa O(tamanho da janela) = O(1), sem acúmulo de erro de arredondamento.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._values = deque(maxlen=size)
+
+    def push(self, value):
+        self._values.append(float(value))
+
+    def __len__(self):
+        return len(self._values)
+
+    @property
+    def is_full(self):
+        return len(self._values) == self.size
+
+    def mean(self, extra=None):
+        values = self._with(extra)
+        if not values:
+            return None
+        return math.fsum(values) / len(values)
+
+    def std(self, extra=None):
+        """Desvio padrão amostral (ddof=1), como pandas.Series.rolling().std()"""
+        values = self._with(extra)
+        if len(values) < 2:
+            return None
+        mean = math.fsum(values) / len(values)
+        return math.sqrt(math.fsum((v - mean) ** 2 for v in values) / (len(values) - 1))
+
+    def values(self):
+        return list(self._values)
+
+    def _with(self, extra):
+        if extra is None:
+            return list(self._values)
+        # Simula a entrada de um novo valor sem alterar a janela
+        values = list(self._values)[1:] if self.is_full else list(self._values)
+        values.append(float(extra))
+        return values
+
+
+class EWMA:
+    """Média móvel exponencial"""
+
+    def __init__(self, alpha):
+        self.alpha = alpha
+        self.value = None
+
+    def push(self, value):
+        if self.value is None:
+            self.value = float(value)
+        else:
+            self.value = self.alpha * float(value) + (1 - self.alpha) * self.value
+
+
+class RunningStats:
+    """Média e variância acumuladas pelo algoritmo de Welford"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def push(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self):
+        if self.count < 2:
+            return None
+        return self._m2 / (self.count - 1)
+
+
+class DeviceStats:
+    """
+    Estatísticas de temperatura de um dispositivo, atualizadas a cada leitura
+
+    Versão incremental das features de treino de features.py (mesmas
+    janelas), calculadas em O(1) por leitura sem consultar o histórico.
+    """
+
+    ANOMALY_WINDOW = ANOMALY_WINDOW
+    LAG_WINDOW = LAG_WINDOW
+
+    def __init__(self, ewma_alpha=0.1):
+        self.last_reading_id = None
+        self.last_temperature = None
+        self._previous_temperature = None
+        self._previous_lags = []
+        self.anomaly_window = RollingWindow(self.ANOMALY_WINDOW)
+        self.lag_window = RollingWindow(self.LAG_WINDOW)
+        self.ewma = EWMA(ewma_alpha)
+        self.totals = RunningStats()
+
+    def push(self, temperature, reading_id=None):
+        """
+        Incorpora uma nova leitura
+
+        Returns:
+            bool: False se a leitura já havia sido incorporada
+        """
+        if reading_id is not None and self.last_reading_id is not None and reading_id <= self.last_reading_id:
+            return False
+
+        temperature = float(temperature)
+        self._previous_temperature = self.last_temperature
+        self._previous_lags = self.lag_window.values()
+        self.last_temperature = temperature
+        self.anomaly_window.push(temperature)
+        self.lag_window.push(temperature)
+        self.ewma.push(temperature)
+        self.totals.push(temperature)
+        if reading_id is not None:
+            self.last_reading_id = reading_id
+        return True
+
+    def features(self):
+        """Features da última leitura incorporada"""
+        if self.last_temperature is None:
+            return self._empty_features()
+
+        return self._build(
+            self.last_temperature,
+            self._previous_temperature,
+            self._previous_lags,
+            self.anomaly_window.mean(),
+            self.lag_window
+        )
+
+    def peek_features(self, temperature):
+        """Features que uma nova leitura teria, sem incorporá-la"""
+        temperature = float(temperature)
+        rolling_mean = self.anomaly_window.mean(extra=temperature)
+        window = RollingWindow(self.LAG_WINDOW)
+        for value in self.lag_window.values():
+            window.push(value)
+        window.push(temperature)
+        return self._build(temperature, self.last_temperature, self.lag_window.values(), rolling_mean, window)
+
+    def _build(self, temperature, previous, previous_lags, rolling_mean, lag_window):
+        lags = list(reversed(previous_lags))
+        return {
+            'temp_diff': temperature - previous if previous is not None else 0.0,
+            'temp_deviation': abs(temperature - rolling_mean) if rolling_mean is not None else 0.0,
+            'temp_lag_1': lags[0] if len(lags) > 0 else None,
+            'temp_lag_2': lags[1] if len(lags) > 1 else None,
+            'temp_lag_3': lags[2] if len(lags) > 2 else None,
+            'temp_rolling_mean_3': lag_window.mean(),
+            'temp_rolling_std_3': lag_window.std(),
+            'temp_ewma': self.ewma.value,
+            'samples': self.totals.count,
+        }
+
+    @staticmethod
+    def _empty_features():
+        return {
+            'temp_diff': 0.0,
+            'temp_deviation': 0.0,
+            'temp_lag_1': None,
+            'temp_lag_2': None,
+            'temp_lag_3': None,
+            'temp_rolling_mean_3': None,
+            'temp_rolling_std_3': None,
+            'temp_ewma': None,
+            'samples': 0,
+        }
+
+
+class DeviceStatsRegistry:
+    """
+    Estatísticas online por dispositivo, mantidas em memória no processo
+
+    Na primeira utilização de um dispositivo, as janelas são preenchidas com
+    as últimas leituras do banco (uma única consulta); a partir daí cada
+    leitura nova é incorporada em O(1) pelo processamento de ingestão.
+
+    Cada worker do gunicorn tem o seu registro e só vê as leituras que ele
+    mesmo ingeriu. Quando a leitura não é a sucessora direta da última
+    incorporada (ids intercalados com outro worker, lacunas, leitura fora de
+    ordem), as janelas são recarregadas do banco até ela, também em uma
+    única consulta, para que as features sejam as exatas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._devices = {}
+
+    def update(self, reading, device_id=DEFAULT_DEVICE_ID):
+        """Incorpora uma leitura e retorna suas features"""
+        with self._lock:
+            stats = self._devices.get(device_id)
+            if stats is None or not self._follows(stats, reading.id):
+                seeded = DeviceStats()
+                self._seed(seeded, until_id=reading.id)
+                # Uma leitura antiga não faz o estado voltar no tempo
+                if stats is None or stats.last_reading_id is None or reading.id is None \
+                        or reading.id > stats.last_reading_id:
+                    self._devices[device_id] = seeded
+                stats = seeded
+            stats.push(reading.temperature, reading.id)
+            return stats.features()
+
+    def peek(self, temperature, device_id=DEFAULT_DEVICE_ID):
+        """Features de uma temperatura avulsa (ex.: chamadas da API)"""
+        with self._lock:
+            stats = self._get_or_seed(device_id)
+            return stats.peek_features(temperature)
+
+    def peek_reading(self, reading, device_id=DEFAULT_DEVICE_ID):
+        """Features de uma leitura já gravada, sem alterar o estado (ex.: predições)"""
+        with self._lock:
+            stats = self._devices.get(device_id)
+            if stats is not None and reading.id is not None and stats.last_reading_id is not None:
+                if reading.id == stats.last_reading_id:
+                    return stats.features()
+                if reading.id == stats.last_reading_id + 1:
+                    return stats.peek_features(reading.temperature)
+
+        seeded = DeviceStats()
+        self._seed(seeded, until_id=reading.id)
+        seeded.push(reading.temperature, reading.id)
+        return seeded.features()
+
+    def reset(self, device_id=None):
+        with self._lock:
+            if device_id is None:
+                self._devices.clear()
+            else:
+                self._devices.pop(device_id, None)
+
+    @staticmethod
+    def _follows(stats, reading_id):
+        """A leitura é a última incorporada ou a sucessora direta dela"""
+        if reading_id is None:
+            return True
+        if stats.last_reading_id is None:
+            return False
+        return reading_id in (stats.last_reading_id, stats.last_reading_id + 1)
+
+    def _get_or_seed(self, device_id):
+        stats = self._devices.get(device_id)
+        if stats is None:
+            stats = DeviceStats()
+            self._seed(stats)
+            self._devices[device_id] = stats
+        return stats
+
+    def _seed(self, stats, until_id=None):
+        """Preenche as janelas com as últimas leituras do banco (até until_id, inclusive)"""
+        from sensors.models import Reading
+
+        queryset = Reading.objects.order_by('-id')
+        if until_id is not None:
+            queryset = queryset.filter(id__lte=until_id)
+        try:
+            recent = list(queryset.values_list('id', 'temperature')[:DeviceStats.ANOMALY_WINDOW])
+        except Exception as e:
+            logger.warning(f"Não foi possível carregar o histórico recente de leituras: {str(e)}")
+            return
+
+        for reading_id, temperature in reversed(recent):
+            stats.push(temperature, reading_id)
+
+
+device_stats = DeviceStatsRegistry()
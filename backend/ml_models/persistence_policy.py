@@ -0,0 +1,164 @@
+# backend/ml_models/persistence_policy.py
+
+import threading
+import time
+
+from django.conf import settings
+
+
+# Política padrão por tipo de modelo:
+#   state_field     -> grava quando o valor deste campo muda
+#   score_field     -> grava quando o valor variar mais que score_delta
+#                      em relação à última predição gravada
+#   sample_interval -> grava pelo menos uma predição a cada N segundos
+# Uma política None grava todas as predições.
+DEFAULT_PERSISTENCE_POLICIES = {
+    'anomaly_detection': {
+        'state_field': 'is_anomaly',
+        'score_field': 'anomaly_score',
+        'score_delta': 0.1,
+        'sample_interval': 600,
+    },
+    'fan_optimization': {
+        'state_field': 'should_turn_on',
+        'score_field': 'recommended_duration_minutes',
+        'score_delta': 5,
+        'sample_interval': 600,
+    },
+    'temperature_prediction': {
+        'state_field': None,
+        'score_field': 'predicted_temperature',
+        'score_delta': 0.5,
+        'sample_interval': 600,
+    },
+}
+
+
+class PersistencePolicy:
+    """
+    Decide quais predições devem ser gravadas em MLPrediction
+
+    Cada fluxo de predições (tipo de modelo + chave opcional) guarda o
+    estado e o score da última predição gravada. Predições que não mudam
+    o estado, não variam o score e chegam antes do intervalo de amostragem
+    não são gravadas, apenas contabilizadas em memória.
+
+    A configuração vem de DEFAULT_PERSISTENCE_POLICIES e pode ser
+    sobrescrita por tipo de modelo em settings.ML_PREDICTION_PERSISTENCE.
+    """
+
+    def __init__(self, policies=None):
+        self._policies = policies
+        self._lock = threading.Lock()
+        self._last_stored = {}
+        self._counters = {}
+
+    def get_policy(self, model_type):
+        """Retorna a política efetiva para um tipo de modelo"""
+        policies = self._policies
+        if policies is None:
+            policies = dict(DEFAULT_PERSISTENCE_POLICIES)
+            policies.update(getattr(settings, 'ML_PREDICTION_PERSISTENCE', {}))
+        policy = policies.get(model_type)
+        if policy is None:
+            return None
+        return {
+            'state_field': None,
+            'score_field': None,
+            'score_delta': None,
+            'sample_interval': None,
+            **policy,
+        }
+
+    def should_persist(self, model_type, prediction, key=None):
+        """
+        Registra a predição nos contadores e indica se ela deve ser gravada
+
+        Args:
+            model_type: Tipo do modelo (MLModel.model_type)
+            prediction: Dicionário com o resultado da predição
+            key: Identifica fluxos distintos de um mesmo tipo de modelo
+
+        Returns:
+            tuple: (bool deve_gravar, str motivo)
+        """
+        policy = self.get_policy(model_type)
+        stream = (model_type, key)
+        now = time.monotonic()
+
+        state = score = None
+        if policy and isinstance(prediction, dict):
+            if policy['state_field']:
+                state = prediction.get(policy['state_field'])
+            if policy['score_field']:
+                score = self._to_float(prediction.get(policy['score_field']))
+
+        with self._lock:
+            counters = self._counters.setdefault(model_type, {
+                'seen': 0,
+                'stored': 0,
+                'skipped': 0,
+                'reasons': {},
+                'states': {},
+            })
+            counters['seen'] += 1
+            if state is not None:
+                state_name = str(state)
+                counters['states'][state_name] = counters['states'].get(state_name, 0) + 1
+
+            reason = self._decide(policy, self._last_stored.get(stream), state, score, now)
+
+            if reason is None:
+                counters['skipped'] += 1
+                return False, 'skipped'
+
+            counters['stored'] += 1
+            counters['reasons'][reason] = counters['reasons'].get(reason, 0) + 1
+            self._last_stored[stream] = {'state': state, 'score': score, 'time': now}
+            return True, reason
+
+    def get_stats(self):
+        """Retorna cópia dos contadores por tipo de modelo"""
+        with self._lock:
+            return {
+                model_type: {
+                    **counters,
+                    'reasons': dict(counters['reasons']),
+                    'states': dict(counters['states']),
+                }
+                for model_type, counters in self._counters.items()
+            }
+
+    def reset(self):
+        """Esquece o último estado gravado e zera os contadores"""
+        with self._lock:
+            self._last_stored.clear()
+            self._counters.clear()
+
+    def _decide(self, policy, last, state, score, now):
+        if policy is None:
+            return 'always'
+        if last is None:
+            return 'first'
+        if policy['state_field'] and state != last['state']:
+            return 'state_change'
+        if (
+            policy['score_delta'] is not None
+            and score is not None
+            and last['score'] is not None
+            and abs(score - last['score']) >= policy['score_delta']
+        ):
+            return 'score_delta'
+        if policy['sample_interval'] is not None and now - last['time'] >= policy['sample_interval']:
+            return 'sample'
+        return None
+
+    @staticmethod
+    def _to_float(value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+
+persistence_policy = PersistencePolicy()
@@ -0,0 +1,220 @@
+# backend/ml_models/prediction_sink.py
+
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from .models import MLPrediction
+from .persistence_policy import persistence_policy
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionSink:
+    """
+    Buffer assíncrono para gravação de predições (MLPrediction)
+
+    As predições são acumuladas em memória e gravadas em lote com
+    bulk_create por uma thread de fundo, quando o buffer atinge
+    ML_PREDICTION_BATCH_SIZE registros ou a cada
+    ML_PREDICTION_FLUSH_INTERVAL segundos. Se o buffer chegar a
+    ML_PREDICTION_MAX_BUFFER registros, novas predições são descartadas
+    (e contabilizadas) em vez de bloquear quem está registrando.
+
+    Antes de enfileirar, cada predição passa pela política de persistência
+    (ver persistence_policy.py); as que não trazem informação nova são
+    apenas contabilizadas.
+
+    Observação: created_at é preenchido no momento do flush, portanto pode
+    ficar até um intervalo de flush atrasado em relação à inferência.
+    """
+
+    def __init__(self, batch_size=None, flush_interval=None, max_buffer=None):
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._max_buffer = max_buffer
+        self._reset()
+
+    def _reset(self):
+        """(Re)inicializa o estado interno - usado também após um fork"""
+        self._pid = os.getpid()
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self._stats = {
+            'recorded': 0,
+            'skipped': 0,
+            'flushed': 0,
+            'dropped': 0,
+            'failed': 0,
+            'flushes': 0,
+        }
+
+    @property
+    def batch_size(self):
+        if self._batch_size is None:
+            return getattr(settings, 'ML_PREDICTION_BATCH_SIZE', 100)
+        return self._batch_size
+
+    @property
+    def flush_interval(self):
+        if self._flush_interval is None:
+            return getattr(settings, 'ML_PREDICTION_FLUSH_INTERVAL', 5.0)
+        return self._flush_interval
+
+    @property
+    def max_buffer(self):
+        if self._max_buffer is None:
+            return getattr(settings, 'ML_PREDICTION_MAX_BUFFER', 10000)
+        return self._max_buffer
+
+    def record(self, model, input_data, prediction, confidence=None, key=None):
+        """
+        Enfileira uma predição para gravação em lote
+
+        Args:
+            key: Fluxo de predições usado pela política de persistência
+                 (ex.: 'forecast' e 'next_hour' para o mesmo modelo)
+
+        Returns:
+            bool: True se a predição foi enfileirada, False se foi
+                  descartada ou dispensada pela política de persistência
+        """
+        if self._pid != os.getpid():
+            # Processo filho (fork do gunicorn): não herda buffer nem thread
+            self._reset()
+
+        persist, _ = persistence_policy.should_persist(model.model_type, prediction, key)
+        if not persist:
+            with self._lock:
+                self._stats['skipped'] += 1
+            return False
+
+        record = MLPrediction(
+            model=model,
+            input_data=input_data,
+            prediction=prediction,
+            confidence=confidence
+        )
+
+        with self._lock:
+            if self._stopped or len(self._buffer) >= self.max_buffer:
+                self._stats['dropped'] += 1
+                return False
+            self._buffer.append(record)
+            self._stats['recorded'] += 1
+            pending = len(self._buffer)
+
+        self._ensure_worker()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def flush(self):
+        """
+        Grava imediatamente todas as predições pendentes
+
+        Returns:
+            int: Quantidade de predições gravadas
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._buffer)
+                self._buffer.clear()
+
+            if not batch:
+                return 0
+
+            try:
+                MLPrediction.objects.bulk_create(batch, batch_size=self.batch_size)
+                saved = len(batch)
+            except Exception as e:
+                logger.error(f"Erro ao gravar lote de {len(batch)} predições: {str(e)}")
+                saved = self._save_individually(batch)
+
+            with self._lock:
+                self._stats['flushed'] += saved
+                self._stats['failed'] += len(batch) - saved
+                self._stats['flushes'] += 1
+            return saved
+
+    def _save_individually(self, batch):
+        """Isola registros inválidos para que não descartem o lote inteiro"""
+        saved = 0
+        for record in batch:
+            try:
+                record.save()
+                saved += 1
+            except Exception as e:
+                logger.error(f"Predição descartada ({record.model_id}): {str(e)}")
+        return saved
+
+    def shutdown(self, timeout=10):
+        """Interrompe a thread de fundo e grava o que estiver pendente"""
+        if self._pid != os.getpid():
+            return
+
+        with self._lock:
+            if self._stopped or (self._thread is None and not self._buffer):
+                # Já encerrado ou nunca utilizado neste processo
+                self._stopped = True
+                return
+            self._stopped = True
+        self._wakeup.set()
+
+        thread = self._thread
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout)
+
+        flushed = self.flush()
+        stats = self.get_stats()
+        logger.info(
+            f"PredictionSink encerrado: {flushed} predições gravadas no encerramento - "
+            f"gravadas: {stats['flushed']}, descartadas: {stats['dropped']}, falhas: {stats['failed']}"
+        )
+
+    def get_stats(self):
+        """Retorna os contadores do buffer"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._buffer)
+        return stats
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._stopped or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._thread = threading.Thread(
+                target=self._run,
+                name='ml-prediction-sink',
+                daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+                if self._stopped:
+                    break
+                close_old_connections()
+                self.flush()
+        finally:
+            connection.close()
+
+
+prediction_sink = PredictionSink()
+
+# Garante que as predições pendentes sejam gravadas ao encerrar o processo
+atexit.register(prediction_sink.shutdown)
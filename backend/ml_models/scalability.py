@@ -0,0 +1,260 @@
+# backend/ml_models/scalability.py
+
+import gc
+import logging
+import math
+import multiprocessing
+import resource
+import shutil
+import tempfile
+import time
+from datetime import datetime, time as dt_time, timezone as dt_timezone
+
+import numpy as np
+from django.db import connections
+from django.utils import timezone
+from threadpoolctl import threadpool_limits
+
+from .snapshots import ColumnarSnapshotStore, EPOCH, MICROSECOND
+from .training import MODEL_TYPES, STAGES, snapshot_features
+
+logger = logging.getLogger(__name__)
+
+# Expoente de escala (log tempo / log linhas) a partir do qual a etapa é superlinear
+SUPERLINEAR_EXPONENT = 1.2
+# Etapas mais rápidas que isso não entram no cálculo do expoente (ruído do relógio)
+MIN_SCALING_SECONDS = 0.05
+
+
+def synthetic_history(rows, seed=42):
+    """
+    Histórico sintético de leituras (uma por minuto) e estados do ventilador
+
+    Temperatura com ciclo diário, deriva sazonal e ruído; nas horas quentes
+    o ventilador liga no início da hora por 15 a 45 minutos e a temperatura
+    cai enquanto ele está ligado. O histórico termina antes da meia-noite
+    UTC de hoje, para que todo ele fique em segmentos fechados.
+
+    Returns:
+        tuple: (readings, fan_states) no formato de ColumnarSnapshotStore.load
+    """
+    rng = np.random.default_rng(seed)
+    today = datetime.combine(timezone.now().astimezone(dt_timezone.utc).date(), dt_time.min, tzinfo=dt_timezone.utc)
+    minute = 60 * 1_000_000
+    first = (today - EPOCH) // MICROSECOND - rows * minute
+    timestamps = first + np.arange(rows, dtype=np.int64) * minute
+
+    minutes = np.arange(rows)
+    hour_of_day = (timestamps // (3600 * 1_000_000)) % 24
+    day = minutes / 1440
+    noise = np.convolve(rng.normal(0, 0.4, rows), np.ones(5) / 5, mode='same')
+    temperature = 24 + 3 * np.sin(2 * np.pi * (hour_of_day - 9) / 24) + 2 * np.sin(2 * np.pi * day / 365) + noise
+
+    # Um ciclo por hora quente: liga no início da hora, desliga após `duration` minutos
+    blocks = minutes // 60
+    n_blocks = int(blocks[-1]) + 1 if rows else 0
+    block_mean = np.bincount(blocks, weights=temperature, minlength=n_blocks) / np.maximum(
+        np.bincount(blocks, minlength=n_blocks), 1)
+    fan_on = block_mean > 25
+    duration = rng.integers(15, 46, n_blocks)
+
+    in_block = minutes % 60
+    cooling = fan_on[blocks] & (in_block < duration[blocks])
+    temperature = temperature - np.where(cooling, in_block / duration[blocks] * rng.uniform(1.5, 3.0), 0)
+
+    on_blocks = np.flatnonzero(fan_on)
+    on_times = first + on_blocks * 60 * minute
+    off_times = on_times + duration[on_blocks] * minute
+    state_times = np.empty(2 * len(on_blocks), dtype=np.int64)
+    state_times[0::2], state_times[1::2] = on_times, off_times
+    states = np.zeros(len(state_times), dtype=np.bool_)
+    states[0::2] = True
+    keep = state_times < timestamps[-1] if rows else state_times < 0
+
+    readings = {
+        'id': np.arange(1, rows + 1, dtype=np.int64),
+        'timestamp': timestamps,
+        'temperature': np.round(temperature, 1),
+    }
+    fan_states = {
+        'id': np.arange(1, int(keep.sum()) + 1, dtype=np.int64),
+        'timestamp': state_times[keep],
+        'state': states[keep],
+    }
+    return readings, fan_states
+
+
+def _reset_peak_rss():
+    """Zera o pico de memória do processo (VmHWM); False se o sistema não permite"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _memory_mb():
+    """RSS atual e pico (MB); fora do Linux, o pico é o do processo inteiro"""
+    try:
+        with open('/proc/self/status') as status:
+            fields = dict(line.split(':', 1) for line in status)
+        return int(fields['VmRSS'].split()[0]) / 1024, int(fields['VmHWM'].split()[0]) / 1024
+    except (OSError, KeyError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return peak, peak
+
+
+class StageRecorder:
+    """Mede relógio, CPU, pico de memória e linhas/s de cada etapa"""
+
+    def __init__(self):
+        self.stages = {}
+        self.exact_peak = True
+
+    def run(self, name, rows, func, *args):
+        gc.collect()
+        self.exact_peak = _reset_peak_rss() and self.exact_peak
+        rss_start, _ = _memory_mb()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+
+        result = func(*args)
+
+        wall_time = time.perf_counter() - wall_start
+        cpu_time = time.process_time() - cpu_start
+        _, peak = _memory_mb()
+        self.stages[name] = {
+            'rows': int(rows),
+            'wall_time': wall_time,
+            'cpu_time': cpu_time,
+            'rows_per_sec': rows / wall_time if wall_time > 0 else None,
+            'peak_rss_mb': peak,
+            'peak_over_start_mb': peak - rss_start,
+        }
+        return result
+
+
+def run_size(rows, model_types=MODEL_TYPES, n_jobs=-1, fit_max_rows=None, seed=42):
+    """
+    Executa as etapas do treino sobre um histórico sintético de `rows` leituras
+
+    Etapas: geração (não faz parte do treino), gravação do snapshot colunar,
+    extração (leitura mapeada dos segmentos para DataFrames), features
+    compartilhadas por leitura (features.py) e, por tipo, a montagem da
+    matriz de features e o ajuste de training.STAGES. O snapshot fica em um diretório
+    temporário e o banco não é consultado. O ajuste é pulado acima de
+    fit_max_rows leituras.
+
+    Returns:
+        dict: rows, fan_states, stages (por etapa) e exact_peak
+    """
+    recorder = StageRecorder()
+    base_dir = tempfile.mkdtemp(prefix='benchmark_training_')
+    try:
+        store = ColumnarSnapshotStore(base_dir=base_dir)
+        readings, fan_states = recorder.run('generate', rows, synthetic_history, rows, seed)
+        n_states = len(fan_states['id'])
+
+        def write_snapshot():
+            store.import_columns('readings', readings)
+            store.import_columns('fan_states', fan_states)
+
+        recorder.run('snapshot_write', rows, write_snapshot)
+        start = EPOCH + int(readings['timestamp'][0]) * MICROSECOND
+        end = EPOCH + int(readings['timestamp'][-1]) * MICROSECOND
+        del readings, fan_states
+
+        def extract():
+            return {
+                'start': start,
+                'end': end,
+                'readings': store.frame('readings', start, end, sync=False),
+                'fan_states': store.frame('fan_states', start, end, sync=False),
+            }
+
+        snapshot = recorder.run('extraction', rows, extract)
+        recorder.run('features', rows, snapshot_features, snapshot)
+
+        skipped = []
+        for model_type in model_types:
+            build_features, train = STAGES[model_type]
+            features = recorder.run(f'{model_type}.features', rows, build_features, snapshot)
+            if fit_max_rows is not None and rows > fit_max_rows:
+                skipped.append(f'{model_type}.fit')
+                continue
+            with threadpool_limits(limits=None if n_jobs == -1 else n_jobs):
+                recorder.run(f'{model_type}.fit', len(features[0]), train, *features, n_jobs)
+            del features
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+    return {
+        'rows': rows,
+        'fan_states': n_states,
+        'stages': recorder.stages,
+        'skipped': skipped,
+        'exact_peak': recorder.exact_peak,
+    }
+
+
+def _run_size_child(conn, rows, options):
+    try:
+        conn.send(run_size(rows, **options))
+    except Exception as e:
+        conn.send({'rows': rows, 'error': str(e)})
+    finally:
+        conn.close()
+
+
+def run_isolated(rows, **options):
+    """
+    Como run_size, em um processo filho novo
+
+    Cada tamanho parte de um processo limpo, então os picos de memória não
+    herdam a heap dos tamanhos anteriores. Se o filho morrer (ex.: sem
+    memória), retorna rows e error.
+    """
+    connections.close_all()
+    parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_run_size_child, args=(child_conn, rows, options))
+    process.start()
+    child_conn.close()
+    try:
+        result = parent_conn.recv()
+    except EOFError:
+        result = None
+    process.join()
+    if result is None:
+        result = {'rows': rows, 'error': f"Processo encerrou com código {process.exitcode}"}
+    if 'error' in result:
+        logger.warning(f"Benchmark de treino com {rows} linhas falhou: {result['error']}")
+    return result
+
+
+def scaling_exponents(results):
+    """
+    Expoente de escala de cada etapa entre tamanhos consecutivos
+
+    1 é linear; acima de SUPERLINEAR_EXPONENT a etapa cresce mais rápido
+    que o histórico. Usa as linhas de entrada da etapa (amostras, no ajuste).
+
+    Returns:
+        dict: etapa -> lista de {from, to, exponent, superlinear}
+    """
+    scaling = {}
+    completed = [result for result in results if 'stages' in result]
+    for smaller, larger in zip(completed, completed[1:]):
+        for stage, before in smaller['stages'].items():
+            after = larger['stages'].get(stage)
+            if (after is None or before['wall_time'] < MIN_SCALING_SECONDS
+                    or after['rows'] <= before['rows'] or before['rows'] == 0):
+                continue
+            exponent = math.log(after['wall_time'] / before['wall_time']) / math.log(after['rows'] / before['rows'])
+            scaling.setdefault(stage, []).append({
+                'from': smaller['rows'],
+                'to': larger['rows'],
+                'exponent': exponent,
+                'superlinear': exponent > SUPERLINEAR_EXPONENT,
+            })
+    return scaling
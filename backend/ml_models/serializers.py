@@ -1,5 +1,9 @@
 # backend/ml_models/serializers.py
 
+from datetime import datetime
+
+import numpy as np
+from django.conf import settings
 from rest_framework import serializers
 from .models import MLModel, MLPrediction, TrainingSession, ModelPerformanceMetric
 
@@ -47,7 +51,9 @@ class TrainingSessionSerializer(serializers.ModelSerializer):
             'id', 'model', 'model_name', 'data_start_date', 'data_end_date',
             'training_samples', 'validation_samples', 'training_metrics',
             'validation_metrics', 'status', 'started_at', 'completed_at',
-            'duration_str', 'error_message'
+            'duration_str', 'wall_time_seconds', 'cpu_time_seconds', 'error_message',
+            'parent', 'job_options', 'progress', 'progress_message', 'heartbeat_at',
+            'cancel_requested'
         ]
         read_only_fields = ['id', 'started_at', 'completed_at', 'model_name', 'duration_str']
     
@@ -106,6 +112,81 @@ class AnomalyDetectionRequestSerializer(serializers.Serializer):
     hour = serializers.IntegerField(default=None, min_value=0, max_value=23, allow_null=True)
 
 
+def _float_column(inputs, field, default=None, min_value=None, max_value=None):
+    """
+    Extrai um campo numérico de todas as entradas de um lote como array float64
+
+    Entradas sem o campo recebem default; sem default, o campo é obrigatório.
+    """
+    values = np.empty(len(inputs), dtype=np.float64)
+    for i, item in enumerate(inputs):
+        value = item.get(field, default)
+        if value is None:
+            raise serializers.ValidationError(f"Entrada {i}: campo '{field}' é obrigatório")
+        try:
+            values[i] = float(value)
+        except (TypeError, ValueError):
+            raise serializers.ValidationError(f"Entrada {i}: '{field}' deve ser numérico")
+
+    if not np.isfinite(values).all():
+        raise serializers.ValidationError(f"'{field}' deve conter apenas valores finitos")
+    if min_value is not None and (values < min_value).any():
+        raise serializers.ValidationError(f"'{field}' deve ser maior ou igual a {min_value}")
+    if max_value is not None and (values > max_value).any():
+        raise serializers.ValidationError(f"'{field}' deve ser menor ou igual a {max_value}")
+    return values
+
+
+class AnomalyDetectionBatchRequestSerializer(serializers.Serializer):
+    """
+    Serializer para detecção de anomalias em lote
+
+    Cada entrada tem temperature e, opcionalmente, hour, temp_diff e
+    temp_deviation (features do histórico; padrão 0). As entradas são
+    convertidas em colunas NumPy.
+    """
+    inputs = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=settings.ML_BATCH_MAX_SIZE
+    )
+    persist = serializers.BooleanField(default=False)
+
+    def validate_inputs(self, inputs):
+        current_hour = datetime.now().hour
+        return {
+            'count': len(inputs),
+            'temperature': _float_column(inputs, 'temperature'),
+            'hour': _float_column(inputs, 'hour', default=current_hour, min_value=0, max_value=23),
+            'temp_diff': _float_column(inputs, 'temp_diff', default=0.0),
+            'temp_deviation': _float_column(inputs, 'temp_deviation', default=0.0, min_value=0),
+        }
+
+
+class FanOptimizationBatchRequestSerializer(serializers.Serializer):
+    """
+    Serializer para otimização do ventilador em lote
+
+    Cada entrada tem current_temperature e, opcionalmente, current_hour e
+    day_of_week (0 = segunda-feira).
+    """
+    inputs = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=settings.ML_BATCH_MAX_SIZE
+    )
+    persist = serializers.BooleanField(default=False)
+
+    def validate_inputs(self, inputs):
+        now = datetime.now()
+        return {
+            'count': len(inputs),
+            'current_temperature': _float_column(inputs, 'current_temperature'),
+            'current_hour': _float_column(inputs, 'current_hour', default=now.hour, min_value=0, max_value=23),
+            'day_of_week': _float_column(inputs, 'day_of_week', default=now.weekday(), min_value=0, max_value=6),
+        }
+
+
 class TrainingRequestSerializer(serializers.Serializer):
     """
     Serializer para requisições de treinamento
@@ -0,0 +1,324 @@
+# backend/ml_models/shadow.py
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .ml_algorithms import (
+    TemperaturePredictionModel,
+    FanOptimizationModel,
+    AnomalyDetectionModel
+)
+from .models import MLModel, ShadowPrediction
+from .utils import serialize_ml_output
+
+logger = logging.getLogger(__name__)
+
+
+def _score_anomaly(loaded, inputs):
+    anomaly_model = AnomalyDetectionModel()
+    anomaly_model.model = loaded
+    anomaly_model.is_fitted = True
+    return anomaly_model.detect_anomaly(
+        inputs['temperature'],
+        inputs['hour'],
+        temp_diff=inputs['temp_diff'],
+        temp_deviation=inputs['temp_deviation']
+    )
+
+
+def _score_temperature(loaded, inputs):
+    temp_model = TemperaturePredictionModel()
+    temp_model.model = loaded
+    prediction = temp_model.predict_next_hour(
+        inputs['current_temperature'],
+        inputs['hour'],
+        features=inputs['features']
+    )
+    return {
+        'predicted_temperature': round(float(prediction['temperature']), 1),
+        'confidence': float(prediction['confidence'])
+    }
+
+
+def _score_fan(loaded, inputs):
+    fan_model = FanOptimizationModel()
+    fan_model.model = loaded
+    duration = fan_model.optimize_fan_duration(inputs['temperature_used'], inputs['current_hour'])
+    return {
+        'recommended_duration_minutes': int(duration),
+        'should_turn_on': duration > 0
+    }
+
+
+def _compare_anomaly(active, shadow):
+    agreement = bool(active['is_anomaly']) == bool(shadow['is_anomaly'])
+    return agreement, abs(float(active['anomaly_score']) - float(shadow['anomaly_score']))
+
+
+def _compare_temperature(active, shadow):
+    difference = abs(float(active['predicted_temperature']) - float(shadow['predicted_temperature']))
+    tolerance = getattr(settings, 'ML_SHADOW_TEMPERATURE_TOLERANCE', 0.5)
+    return difference <= tolerance, difference
+
+
+def _compare_fan(active, shadow):
+    active_duration = int(active['recommended_duration_minutes'])
+    shadow_duration = int(shadow['recommended_duration_minutes'])
+    return active_duration == shadow_duration, float(abs(active_duration - shadow_duration))
+
+
+# Por tipo de modelo: inferência do candidato e comparação com o ativo
+SHADOW_HANDLERS = {
+    'anomaly_detection': (_score_anomaly, _compare_anomaly),
+    'temperature_prediction': (_score_temperature, _compare_temperature),
+    'fan_optimization': (_score_fan, _compare_fan),
+}
+
+
+class ShadowEvaluator:
+    """
+    Avalia em sombra o modelo candidato de cada tipo
+
+    Depois que o modelo ativo responde, as mesmas entradas são enviadas a
+    um pool de threads de fundo, onde o candidato (MLModel.is_shadow) faz
+    a sua inferência. Saídas, latências e a comparação com o ativo são
+    gravadas em ShadowPrediction; nada disso acontece no caminho da
+    requisição nem altera a resposta.
+
+    O candidato de cada tipo é consultado no banco pelas threads de fundo e
+    memorizado por CANDIDATE_TTL segundos, então tipos sem candidato não
+    geram trabalho. Com ML_SHADOW_MAX_PENDING avaliações pendentes, novas
+    avaliações são descartadas (e contabilizadas) em vez de acumular.
+    """
+
+    CANDIDATE_TTL = 30
+
+    def __init__(self, max_workers=None, max_pending=None):
+        self._max_workers = max_workers
+        self._max_pending = max_pending
+        self._reset()
+
+    def _reset(self):
+        """(Re)inicializa o estado interno - usado também após um fork"""
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._candidates = {}
+        self._stats = {
+            'submitted': 0,
+            'evaluated': 0,
+            'errors': 0,
+            'dropped': 0,
+        }
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'ML_SHADOW_ENABLED', True)
+
+    @property
+    def max_workers(self):
+        if self._max_workers is None:
+            return getattr(settings, 'ML_SHADOW_WORKERS', 2)
+        return self._max_workers
+
+    @property
+    def max_pending(self):
+        if self._max_pending is None:
+            return getattr(settings, 'ML_SHADOW_MAX_PENDING', 100)
+        return self._max_pending
+
+    def submit(self, model_type, active_model, inputs, active_output, active_latency_ms):
+        """
+        Agenda a avaliação do candidato para as entradas do modelo ativo
+
+        Args:
+            model_type: Tipo do modelo (chave de SHADOW_HANDLERS)
+            active_model: MLModel que produziu active_output
+            inputs: Entradas usadas pelo modelo ativo (JSON)
+            active_output: Resultado do modelo ativo
+            active_latency_ms: Latência da inferência do modelo ativo
+
+        Returns:
+            bool: True se a avaliação foi agendada
+        """
+        if self._pid != os.getpid():
+            self._reset()
+
+        if not self.enabled or model_type not in SHADOW_HANDLERS:
+            return False
+
+        with self._lock:
+            cached = self._candidates.get(model_type)
+        if cached is not None and cached[0] is None and cached[1] > time.monotonic():
+            # Nenhum candidato configurado para o tipo
+            return False
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['dropped'] += 1
+            return False
+
+        try:
+            future = self._get_executor().submit(
+                self._evaluate, model_type, active_model, inputs, active_output, active_latency_ms
+            )
+        except RuntimeError:
+            # Executor encerrado (ex.: processo saindo)
+            self._slots.release()
+            return False
+        future.add_done_callback(lambda _: self._slots.release())
+
+        with self._lock:
+            self._stats['submitted'] += 1
+        return True
+
+    def get_candidate(self, model_type):
+        """MLModel candidato do tipo (memorizado por CANDIDATE_TTL segundos)"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._candidates.get(model_type)
+        if cached is not None and cached[1] > now:
+            return cached[0]
+
+        candidate = MLModel.objects.filter(model_type=model_type, is_shadow=True).first()
+        with self._lock:
+            self._candidates[model_type] = (candidate, now + self.CANDIDATE_TTL)
+        return candidate
+
+    def invalidate(self):
+        """Descarta os candidatos memorizados (ex.: após trocar o candidato)"""
+        with self._lock:
+            self._candidates.clear()
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='ml-shadow'
+                )
+            return self._executor
+
+    def _evaluate(self, model_type, active_model, inputs, active_output, active_latency_ms):
+        close_old_connections()
+        try:
+            candidate = self.get_candidate(model_type)
+            if candidate is None or candidate.pk == active_model.pk:
+                return
+
+            record = ShadowPrediction(
+                shadow_model=candidate,
+                active_model=active_model,
+                input_data=inputs,
+                active_output=active_output,
+                active_latency_ms=active_latency_ms
+            )
+            score, compare = SHADOW_HANDLERS[model_type]
+            try:
+                loaded = candidate.load_model()
+                if loaded is None:
+                    # Sem isso o modelo carregaria o ativo por lazy loading
+                    raise ValueError("Artefato do candidato indisponível")
+
+                start = time.perf_counter()
+                shadow_output = score(loaded, inputs)
+                record.shadow_latency_ms = (time.perf_counter() - start) * 1000
+
+                record.shadow_output = serialize_ml_output(shadow_output)
+                record.agreement, record.difference = compare(active_output, record.shadow_output)
+                outcome = 'evaluated'
+            except Exception as e:
+                record.error_message = str(e)
+                outcome = 'errors'
+
+            record.save()
+            with self._lock:
+                self._stats[outcome] += 1
+        except Exception as e:
+            logger.error(f"Erro na avaliação em sombra de {model_type}: {str(e)}")
+            with self._lock:
+                self._stats['errors'] += 1
+        finally:
+            close_old_connections()
+
+
+shadow_evaluator = ShadowEvaluator()
+
+
+def _percentile(values, q):
+    return round(float(np.percentile(values, q)), 3) if len(values) else None
+
+
+def build_shadow_report(model_type=None, days=7):
+    """
+    Compara cada candidato com o modelo ativo avaliado junto com ele
+
+    Returns:
+        list: Um dicionário por par (candidato, ativo) com concordância,
+              diferença média e latências p50/p95 (ms) dos dois modelos
+    """
+    queryset = ShadowPrediction.objects.filter(
+        created_at__gte=timezone.now() - timedelta(days=days)
+    ).select_related('shadow_model', 'active_model')
+    if model_type:
+        queryset = queryset.filter(shadow_model__model_type=model_type)
+
+    groups = {}
+    for record in queryset.iterator():
+        groups.setdefault((record.shadow_model_id, record.active_model_id), []).append(record)
+
+    report = []
+    for records in groups.values():
+        shadow_model = records[0].shadow_model
+        active_model = records[0].active_model
+        compared = [r for r in records if r.agreement is not None]
+
+        active_latency = np.array([r.active_latency_ms for r in compared], dtype=np.float64)
+        shadow_latency = np.array([r.shadow_latency_ms for r in compared], dtype=np.float64)
+        differences = np.array([r.difference for r in compared if r.difference is not None], dtype=np.float64)
+
+        active_p50, shadow_p50 = _percentile(active_latency, 50), _percentile(shadow_latency, 50)
+        active_p95, shadow_p95 = _percentile(active_latency, 95), _percentile(shadow_latency, 95)
+
+        report.append({
+            'model_type': shadow_model.model_type,
+            'shadow_model': {'id': shadow_model.id, 'name': shadow_model.name, 'version': shadow_model.version},
+            'active_model': {
+                'id': active_model.id, 'name': active_model.name, 'version': active_model.version
+            } if active_model else None,
+            'samples': len(records),
+            'compared': len(compared),
+            'errors': len(records) - len(compared),
+            'agreement_rate': round(sum(r.agreement for r in compared) / len(compared), 4) if compared else None,
+            'mean_difference': round(float(differences.mean()), 4) if len(differences) else None,
+            'max_difference': round(float(differences.max()), 4) if len(differences) else None,
+            'active_latency_ms': {'p50': active_p50, 'p95': active_p95},
+            'shadow_latency_ms': {'p50': shadow_p50, 'p95': shadow_p95},
+            'latency_delta_ms': {
+                'p50': round(shadow_p50 - active_p50, 3) if compared else None,
+                'p95': round(shadow_p95 - active_p95, 3) if compared else None,
+            },
+        })
+
+    report.sort(key=lambda item: (item['model_type'], -item['samples']))
+    return report
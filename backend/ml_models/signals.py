@@ -6,6 +6,7 @@ import logging
 
 from sensors.models import Reading
 from .integrations import process_sensor_reading
+from .forecast_cache import forecast_cache
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +17,9 @@ def process_reading_with_ml(sender, instance, created, **kwargs):
     Signal para processar automaticamente novas leituras com ML
     """
     if created and not getattr(instance, '_processing_ml', False):
+        # A previsão memorizada foi calculada com a leitura anterior
+        forecast_cache.invalidate()
+
         try:
             # Marca a instância para evitar loops
             instance._processing_ml = True
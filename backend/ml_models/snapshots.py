@@ -0,0 +1,288 @@
+# backend/ml_models/snapshots.py
+
+import json
+import logging
+import os
+import shutil
+import threading
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db.models import Count, Max
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from sensors.models import Reading, FanState
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+DAY = timedelta(days=1)
+
+# Tabela -> (modelo, coluna de valor e dtype); id e timestamp (µs) sempre presentes
+TABLES = {
+    'readings': (Reading, 'temperature', np.float64),
+    'fan_states': (FanState, 'state', np.bool_),
+}
+
+
+def _to_micros(moment):
+    return (moment - EPOCH) // MICROSECOND
+
+
+def _day_start(moment):
+    """Meia-noite UTC do dia do instante"""
+    moment = moment.astimezone(dt_timezone.utc)
+    return datetime.combine(moment.date(), time.min, tzinfo=dt_timezone.utc)
+
+
+class ColumnarSnapshotStore:
+    """
+    Cópia colunar das leituras e dos estados do ventilador em ML_MODELS_DIR
+
+    Cada dia UTC já fechado vira um segmento com um .npy por coluna (id,
+    timestamp em µs desde o epoch e o valor), carregado com mmap_mode='r':
+    30 dias de treino são alguns arquivos lidos do page cache, sem montar
+    tuplas ou dicionários no ORM. O dia corrente sempre vem do banco.
+
+    Um manifesto por tabela guarda linhas e maior id de cada dia. sync
+    compara com uma agregação por dia no banco (uma consulta) e regrava só
+    os dias novos ou alterados, o que cobre leituras atrasadas, removidas
+    e estados regravados (FanState.timestamp é auto_now). Alterações de
+    valor sem mudança de contagem exigem --rebuild em sync_training_snapshot.
+    """
+
+    def __init__(self, base_dir=None):
+        self._base_dir = base_dir
+        self._lock = threading.Lock()
+
+    @property
+    def base_dir(self):
+        return os.path.join(self._base_dir or settings.ML_MODELS_DIR, 'snapshots')
+
+    def _segment_dir(self, table, day):
+        return os.path.join(self.base_dir, table, day)
+
+    def _manifest_path(self, table):
+        return os.path.join(self.base_dir, table, 'manifest.json')
+
+    def read_manifest(self, table):
+        try:
+            with open(self._manifest_path(table)) as manifest_file:
+                return json.load(manifest_file)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, table, manifest):
+        path = self._manifest_path(table)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as manifest_file:
+            json.dump(manifest, manifest_file, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def _day_counts(self, table, start, end):
+        """Linhas e maior id por dia UTC em [start, end), numa agregação"""
+        model = TABLES[table][0]
+        queryset = model.objects.filter(timestamp__lt=end)
+        if start is not None:
+            queryset = queryset.filter(timestamp__gte=start)
+        rows = queryset.annotate(
+            day=TruncDate('timestamp', tzinfo=dt_timezone.utc)
+        ).values('day').annotate(rows=Count('id'), last_id=Max('id')).order_by('day')
+        return {row['day'].isoformat(): {'rows': row['rows'], 'last_id': row['last_id']} for row in rows}
+
+    def _query_columns(self, table, start, end, end_inclusive=False):
+        """Colunas de [start, end) direto do banco, ordenadas por instante"""
+        model, value_column, dtype = TABLES[table]
+        rows = list(model.objects.filter(
+            timestamp__gte=start,
+            **{'timestamp__lte' if end_inclusive else 'timestamp__lt': end}
+        ).order_by('timestamp', 'id').values_list('id', 'timestamp', value_column))
+        return {
+            'id': np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows)),
+            'timestamp': np.fromiter((_to_micros(row[1]) for row in rows), dtype=np.int64, count=len(rows)),
+            value_column: np.fromiter((row[2] for row in rows), dtype=dtype, count=len(rows)),
+        }
+
+    def _write_segment(self, table, day):
+        start = datetime.combine(date.fromisoformat(day), time.min, tzinfo=dt_timezone.utc)
+        self._save_columns(table, day, self._query_columns(table, start, start + DAY))
+
+    def _save_columns(self, table, day, columns):
+        segment_dir = self._segment_dir(table, day)
+        os.makedirs(segment_dir, exist_ok=True)
+        for name, values in columns.items():
+            path = os.path.join(segment_dir, f'{name}.npy')
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as column_file:
+                np.save(column_file, values)
+            os.replace(tmp_path, path)
+
+    def _load_segment(self, table, day, rows):
+        """Colunas mapeadas do segmento, ou None se incompleto (gravação em curso)"""
+        value_column = TABLES[table][1]
+        segment_dir = self._segment_dir(table, day)
+        try:
+            columns = {
+                name: np.load(os.path.join(segment_dir, f'{name}.npy'), mmap_mode='r')
+                for name in ('id', 'timestamp', value_column)
+            }
+        except (OSError, ValueError):
+            return None
+        if any(len(values) != rows for values in columns.values()):
+            return None
+        return columns
+
+    def sync(self, table, start=None, end=None, rebuild=False):
+        """
+        Grava os segmentos dos dias fechados de [start, end) que faltam ou mudaram
+
+        Os dias já no manifesto são conferidos por uma única contagem (linhas
+        e maior id do trecho); a quebra por dia, mais cara, só roda para os
+        dias novos ou quando essa contagem diverge.
+
+        Args:
+            start: Início do período (None: desde a primeira linha)
+            end: Fim do período (limitado à meia-noite UTC de hoje)
+            rebuild: Regrava todos os dias do período
+
+        Returns:
+            dict: days (dias com linhas no período verificado), written e removed
+        """
+        today = _day_start(timezone.now())
+        end = today if end is None else min(_day_start(end) + DAY, today)
+        if start is not None:
+            start = _day_start(start)
+        if start is not None and start >= end:
+            return {'days': 0, 'written': 0, 'removed': 0}
+
+        manifest = self.read_manifest(table)
+        start_key = start.date().isoformat() if start is not None else ''
+        end_key = end.date().isoformat()
+        known = sorted(day for day in manifest if start_key <= day < end_key)
+
+        check_from = start
+        if known and not rebuild:
+            known_end = datetime.combine(date.fromisoformat(known[-1]), time.min, tzinfo=dt_timezone.utc) + DAY
+            queryset = TABLES[table][0].objects.filter(timestamp__lt=known_end)
+            if start is not None:
+                queryset = queryset.filter(timestamp__gte=start)
+            totals = queryset.aggregate(rows=Count('id'), last_id=Max('id'))
+            if (totals['rows'] == sum(manifest[day]['rows'] for day in known)
+                    and totals['last_id'] == max(manifest[day]['last_id'] for day in known)):
+                check_from = known_end
+                start_key = known_end.date().isoformat()
+                known = []
+
+        current = self._day_counts(table, check_from, end) if check_from is None or check_from < end else {}
+        with self._lock:
+            os.makedirs(os.path.join(self.base_dir, table), exist_ok=True)
+            manifest = self.read_manifest(table)
+            written = removed = 0
+
+            for day, info in current.items():
+                if rebuild or manifest.get(day) != info:
+                    self._write_segment(table, day)
+                    manifest[day] = info
+                    written += 1
+
+            for day in [day for day in manifest if start_key <= day < end_key and day not in current]:
+                shutil.rmtree(self._segment_dir(table, day), ignore_errors=True)
+                del manifest[day]
+                removed += 1
+
+            if written or removed:
+                self._write_manifest(table, manifest)
+
+        if written or removed:
+            logger.info(f"Snapshot {table}: {written} dias gravados, {removed} removidos")
+        return {'days': len(current), 'written': written, 'removed': removed}
+
+    def import_columns(self, table, columns):
+        """
+        Grava colunas já montadas (fora do banco) como segmentos diários
+
+        Usado por benchmark_training para históricos sintéticos; as colunas
+        seguem o formato de load e devem estar ordenadas por instante. Um
+        sync posterior reconcilia esses dias com o banco.
+
+        Returns:
+            int: dias gravados
+        """
+        timestamps = np.asarray(columns['timestamp'], dtype=np.int64)
+        day_index = timestamps // (DAY // MICROSECOND)
+        bounds = np.flatnonzero(np.diff(day_index)) + 1
+        first_rows = np.concatenate([[0], bounds])
+        last_rows = np.concatenate([bounds, [len(timestamps)]])
+
+        with self._lock:
+            os.makedirs(os.path.join(self.base_dir, table), exist_ok=True)
+            manifest = self.read_manifest(table)
+            written = 0
+            for first, last in zip(first_rows, last_rows):
+                if first == last:
+                    continue
+                day = (EPOCH + int(day_index[first]) * DAY).date().isoformat()
+                segment = {name: np.asarray(values[first:last]) for name, values in columns.items()}
+                self._save_columns(table, day, segment)
+                manifest[day] = {'rows': int(last - first), 'last_id': int(segment['id'].max())}
+                written += 1
+            self._write_manifest(table, manifest)
+        return written
+
+    def load(self, table, start, end, sync=True):
+        """
+        Colunas da tabela em [start, end], ordenadas por instante
+
+        Sincroniza antes os dias fechados do período (sync=False lê só o
+        que já está no manifesto). Dias fechados vêm dos segmentos mapeados;
+        o dia corrente (e qualquer segmento incompleto) vem do banco.
+
+        Returns:
+            dict: id, timestamp (µs desde o epoch) e a coluna de valor
+        """
+        value_column = TABLES[table][1]
+        if sync:
+            self.sync(table, start, end)
+        manifest = self.read_manifest(table)
+        today = _day_start(timezone.now())
+
+        parts = []
+        day = _day_start(start)
+        while day <= end and day < today:
+            key = day.date().isoformat()
+            if key in manifest:
+                segment = self._load_segment(table, key, manifest[key]['rows'])
+                parts.append(segment if segment is not None else self._query_columns(table, day, day + DAY))
+            day += DAY
+        if end >= today:
+            parts.append(self._query_columns(table, max(start, today), end, end_inclusive=True))
+
+        dtypes = {'id': np.int64, 'timestamp': np.int64, value_column: TABLES[table][2]}
+        columns = {
+            name: np.concatenate([part[name] for part in parts]) if parts else np.empty(0, dtype=dtype)
+            for name, dtype in dtypes.items()
+        }
+
+        # Recorta o primeiro e o último dia para [start, end]
+        first = np.searchsorted(columns['timestamp'], _to_micros(start), side='left')
+        last = np.searchsorted(columns['timestamp'], _to_micros(end), side='right')
+        return {name: values[first:last] for name, values in columns.items()}
+
+    def frame(self, table, start, end, sync=True):
+        """Como load, em DataFrame com timestamp em datetime UTC (como o ORM)"""
+        columns = self.load(table, start, end, sync=sync)
+        df = pd.DataFrame(columns)
+        df['timestamp'] = pd.to_datetime(columns['timestamp'], unit='us', utc=True)
+        return df
+
+    def clear(self, table=None):
+        """Remove os segmentos (de uma tabela ou de todas)"""
+        with self._lock:
+            shutil.rmtree(os.path.join(self.base_dir, table) if table else self.base_dir, ignore_errors=True)
+
+
+snapshot_store = ColumnarSnapshotStore()
@@ -1,3 +1,715 @@
-from django.test import TestCase
+import os
+import pickle
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from sensors.models import Reading
+from sklearn.ensemble import IsolationForest, RandomForestRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from . import jobs, persistence_policy as persistence_policy_module, tuning
+from .artifacts import GC_GRACE_SECONDS, ModelArtifactStore
+from .features import FEATURE_COLUMNS, compute_features, to_micros, trailing_stats
+from .forecast_cache import ForecastCache
+from .ml_algorithms import FanOptimizationModel
+from .models import MLModel, MLPrediction, ModelPerformanceMetric, TrainingSession
+from .persistence_policy import PersistencePolicy
+from .tree_compiler import (
+    CompiledForestRegressor,
+    CompiledIsolationForest,
+    CompiledStandardScaler,
+    compile_model,
+)
+from .verification import asof_join, compute_performance_metrics, expand_forecasts
+
+
+class TreeCompilerTests(SimpleTestCase):
+    """As florestas compiladas devem reproduzir o sklearn bit a bit"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        rng = np.random.default_rng(42)
+        cls.X = rng.normal(size=(400, 4))
+        cls.y = cls.X @ np.array([1.0, -2.0, 0.5, 3.0]) + rng.normal(scale=0.1, size=400)
+        # Corpus mais largo que o treino, para cair nos dois lados dos limiares
+        cls.corpus = rng.normal(scale=3.0, size=(300, 4))
+
+    def assertExact(self, expected, actual):
+        expected = np.asarray(expected, dtype=np.float64)
+        actual = np.asarray(actual, dtype=np.float64)
+        self.assertEqual(expected.shape, actual.shape)
+        self.assertTrue(np.array_equal(expected, actual), f"maior diferença {np.max(np.abs(expected - actual))}")
+
+    def test_random_forest_regressor(self):
+        forest = RandomForestRegressor(n_estimators=15, random_state=0, n_jobs=1).fit(self.X, self.y)
+        compiled = compile_model(forest)
+
+        self.assertIsInstance(compiled, CompiledForestRegressor)
+        self.assertExact(forest.predict(self.corpus), compiled.predict(self.corpus))
+        self.assertExact(forest.predict(self.corpus[:1]), compiled.predict(self.corpus[0]))
+
+    def test_multi_output_forest(self):
+        targets = np.column_stack([self.y, self.y ** 2])
+        forest = RandomForestRegressor(n_estimators=10, max_depth=6, random_state=0, n_jobs=1).fit(self.X, targets)
+
+        self.assertExact(forest.predict(self.corpus), compile_model(forest).predict(self.corpus))
+
+    def test_pipeline_with_scaler(self):
+        pipeline = Pipeline([
+            ('scaler', StandardScaler()),
+            ('regressor', RandomForestRegressor(n_estimators=10, random_state=0, n_jobs=1)),
+        ]).fit(self.X, self.y)
+
+        self.assertExact(pipeline.predict(self.corpus), compile_model(pipeline).predict(self.corpus))
+
+    def test_isolation_forest(self):
+        for max_features in (1.0, 2):
+            with self.subTest(max_features=max_features):
+                forest = IsolationForest(
+                    n_estimators=30, max_features=max_features, contamination=0.05, random_state=0, n_jobs=1
+                ).fit(self.X)
+                compiled = compile_model(forest)
+
+                self.assertIsInstance(compiled, CompiledIsolationForest)
+                predictions, scores = compiled.evaluate(self.corpus)
+                self.assertExact(forest.predict(self.corpus), predictions)
+                self.assertExact(forest.score_samples(self.corpus), scores)
+                self.assertExact(forest.decision_function(self.corpus), compiled.decision_function(self.corpus))
+
+    def test_standard_scaler(self):
+        scaler = StandardScaler().fit(self.X)
+        compiled = compile_model(scaler)
+
+        self.assertIsInstance(compiled, CompiledStandardScaler)
+        self.assertExact(scaler.transform(self.corpus), compiled.transform(self.corpus))
+
+    def test_unsupported_estimators(self):
+        self.assertIsNone(compile_model(StandardScaler()))
+        self.assertIsNone(compile_model(RandomForestRegressor()))
+        self.assertIsNone(compile_model(Pipeline([('regressor', object())])))
+
+
+class ArtifactGarbageCollectionTests(SimpleTestCase):
+    """A coleta não pode apagar objetos de um registro ainda não gravado"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = ModelArtifactStore(self.tmp.name)
+
+    def age(self, artifact, seconds):
+        moment = time.time() - seconds
+        os.utime(self.store.resolve(artifact['path']), (moment, moment))
+
+    def exists(self, artifact):
+        return os.path.exists(self.store.resolve(artifact['path']))
+
+    def test_keeps_recent_objects(self):
+        old = self.store.save({'version': 1})
+        recent = self.store.save({'version': 2})
+        self.age(old, GC_GRACE_SECONDS + 60)
+
+        removed = self.store.collect_garbage([], started_at=time.time())
+
+        self.assertEqual(removed['objects'], 1)
+        self.assertFalse(self.exists(old))
+        self.assertTrue(self.exists(recent))
+
+    def test_reused_object_is_renewed(self):
+        artifact = self.store.save({'version': 1})
+        self.age(artifact, GC_GRACE_SECONDS + 60)
+
+        # Um novo treino com o mesmo conteúdo reaproveita o objeto
+        self.assertEqual(self.store.save({'version': 1})['path'], artifact['path'])
+        self.store.collect_garbage([], started_at=time.time())
+
+        self.assertTrue(self.exists(artifact))
+
+
+class PersistencePolicyTests(SimpleTestCase):
+    """Quais predições são gravadas em MLPrediction"""
+
+    POLICIES = {
+        'anomaly_detection': {
+            'state_field': 'is_anomaly',
+            'score_field': 'anomaly_score',
+            'score_delta': 0.1,
+            'sample_interval': 600,
+        },
+        'temperature_prediction': {
+            'score_field': 'predicted_temperature',
+            'score_delta': 0.5,
+        },
+        'fan_optimization': None,
+    }
+
+    def setUp(self):
+        self.now = 1000.0
+        clock = mock.Mock()
+        clock.monotonic.side_effect = lambda: self.now
+        patcher = mock.patch.object(persistence_policy_module, 'time', clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.policy = PersistencePolicy(self.POLICIES)
+
+    def decide(self, model_type, prediction, key=None):
+        return self.policy.should_persist(model_type, prediction, key)
+
+    def test_first_state_change_and_skip(self):
+        self.assertEqual(self.decide('anomaly_detection', {'is_anomaly': False, 'anomaly_score': 0.2}), (True, 'first'))
+        self.assertEqual(self.decide('anomaly_detection', {'is_anomaly': False, 'anomaly_score': 0.25}), (False, 'skipped'))
+        self.assertEqual(
+            self.decide('anomaly_detection', {'is_anomaly': True, 'anomaly_score': 0.25}),
+            (True, 'state_change')
+        )
+
+    def test_score_delta_is_measured_from_last_stored(self):
+        self.decide('temperature_prediction', {'predicted_temperature': 25.0})
+        # A variação conta a partir da última predição gravada, não da anterior
+        self.assertFalse(self.decide('temperature_prediction', {'predicted_temperature': 25.3})[0])
+        self.assertEqual(
+            self.decide('temperature_prediction', {'predicted_temperature': 25.6}),
+            (True, 'score_delta')
+        )
+        self.assertFalse(self.decide('temperature_prediction', {'predicted_temperature': 25.9})[0])
+
+    def test_sample_interval(self):
+        prediction = {'is_anomaly': False, 'anomaly_score': 0.2}
+        self.decide('anomaly_detection', prediction)
+        self.now += 599
+        self.assertFalse(self.decide('anomaly_detection', prediction)[0])
+        self.now += 1
+        self.assertEqual(self.decide('anomaly_detection', prediction), (True, 'sample'))
+
+    def test_streams_are_independent(self):
+        prediction = {'is_anomaly': False, 'anomaly_score': 0.2}
+        self.assertEqual(self.decide('anomaly_detection', prediction, key=1), (True, 'first'))
+        self.assertEqual(self.decide('anomaly_detection', prediction, key=2), (True, 'first'))
+        self.assertFalse(self.decide('anomaly_detection', prediction, key=1)[0])
+
+    def test_none_policy_and_unknown_type_store_everything(self):
+        for model_type in ('fan_optimization', 'unknown'):
+            with self.subTest(model_type=model_type):
+                for _ in range(2):
+                    self.assertEqual(self.decide(model_type, {'should_turn_on': True}), (True, 'always'))
+
+    def test_unparseable_score_is_ignored(self):
+        self.decide('temperature_prediction', {'predicted_temperature': 25.0})
+        self.assertFalse(self.decide('temperature_prediction', {'predicted_temperature': 'n/a'})[0])
+        self.assertFalse(self.decide('temperature_prediction', {})[0])
+
+    def test_stats(self):
+        self.decide('anomaly_detection', {'is_anomaly': False, 'anomaly_score': 0.2})
+        self.decide('anomaly_detection', {'is_anomaly': False, 'anomaly_score': 0.2})
+        self.decide('anomaly_detection', {'is_anomaly': True, 'anomaly_score': 0.9})
+
+        stats = self.policy.get_stats()['anomaly_detection']
+        self.assertEqual((stats['seen'], stats['stored'], stats['skipped']), (3, 2, 1))
+        self.assertEqual(stats['reasons'], {'first': 1, 'state_change': 1})
+        self.assertEqual(stats['states'], {'False': 2, 'True': 1})
+
+        self.policy.reset()
+        self.assertEqual(self.policy.get_stats(), {})
+        self.assertEqual(self.decide('anomaly_detection', {'is_anomaly': False}), (True, 'first'))
+
+
+class AsofJoinTests(SimpleTestCase):
+    """Última leitura em ou antes de cada alvo, dentro da tolerância"""
+
+    def setUp(self):
+        self.times = np.array([100.0, 200.0, 300.0])
+        self.values = np.array([20.0, 21.0, 22.0])
+
+    def assertJoined(self, expected, targets, tolerance=50):
+        actual = asof_join(self.times, self.values, np.asarray(targets, dtype=np.float64), tolerance)
+        np.testing.assert_array_equal(np.asarray(expected, dtype=np.float64), actual)
+
+    def test_matches_reading_at_or_before_target(self):
+        self.assertJoined([20.0, 20.0, 21.0, 22.0], [100, 149, 200, 340])
+
+    def test_outside_tolerance_or_before_first_reading(self):
+        self.assertJoined([np.nan, np.nan, np.nan], [99, 151, 351])
+
+    def test_unsorted_targets(self):
+        self.assertJoined([22.0, 20.0, 21.0], [300, 100, 210])
+
+    def test_empty_inputs(self):
+        self.assertEqual(len(asof_join(np.array([]), np.array([]), np.array([1.0, 2.0]), 10)), 2)
+        self.assertTrue(np.isnan(asof_join(np.array([]), np.array([]), np.array([1.0]), 10)).all())
+        self.assertEqual(len(asof_join(self.times, self.values, np.array([]), 10)), 0)
+
+
+class ExpandForecastsTests(SimpleTestCase):
+    """Os três formatos de predição de temperatura viram pontos por horizonte"""
+
+    def test_formats(self):
+        indices, horizons, values = expand_forecasts([
+            {'predicted_temperature': 25.0},
+            {'forecast': [
+                {'hour_offset': 2, 'predicted_temperature': 26.0},
+                {'predicted_temperature': 27.0},
+            ]},
+            {'temperatures': [28.0, None, 29.0]},
+        ])
+
+        self.assertEqual(indices.tolist(), [0, 1, 1, 2, 2])
+        self.assertEqual(horizons.tolist(), [1, 2, 2, 1, 3])
+        self.assertEqual(values.tolist(), [25.0, 26.0, 27.0, 28.0, 29.0])
+
+    def test_unrecognized_predictions_have_no_points(self):
+        indices, horizons, values = expand_forecasts([None, 'x', {}, {'other': 1}, {'temperatures': []}])
+
+        self.assertEqual(len(indices), 0)
+        self.assertEqual(indices.dtype, np.intp)
+        self.assertEqual((len(horizons), len(values)), (0, 0))
+
+
+class FanCyclesFrameTests(SimpleTestCase):
+    """cycles_frame deve reproduzir o laço antigo, ciclo a ciclo"""
+
+    @staticmethod
+    def reference_cycles(state_times, reading_times, temperatures):
+        # Laço anterior a cycles_frame, sem os limites de registros por consulta
+        rows = []
+        for start, end in zip(state_times[:-1], state_times[1:]):
+            duration = (end - start) / 60
+            if duration > 60:
+                continue
+            readings = [
+                temperature for moment, temperature in zip(reading_times, temperatures)
+                if start <= moment <= end
+            ]
+            if len(readings) < 3:
+                continue
+            temp_before, temp_after = readings[0], readings[-1]
+            if temp_after < temp_before:
+                started = datetime.fromtimestamp(start, tz=dt_timezone.utc)
+                rows.append({
+                    'temp_before': temp_before,
+                    'duration_minutes': duration,
+                    'hour': started.hour,
+                    'day_of_week': started.weekday(),
+                    'temp_during_avg': sum(readings[1:-1]) / len(readings[1:-1]),
+                    'cooling_efficiency': temp_before - temp_after,
+                })
+        return rows
+
+    def test_matches_reference_loop(self):
+        rng = np.random.default_rng(7)
+        # Intervalos de 1 a 90 minutos: parte dos ciclos passa de 1 hora
+        state_times = 1_700_000_000 + np.cumsum(rng.integers(60, 5400, size=300)).astype(np.float64)
+        reading_times = np.sort(np.concatenate([
+            rng.uniform(state_times[0], state_times[-1], size=3000),
+            # Leituras no instante exato de um estado entram nos dois ciclos vizinhos
+            state_times[::4],
+        ]))
+        temperatures = np.round(rng.normal(26.0, 1.5, size=len(reading_times)), 2)
+
+        frame = FanOptimizationModel().cycles_frame(state_times, reading_times, temperatures)
+        expected = self.reference_cycles(state_times.tolist(), reading_times.tolist(), temperatures.tolist())
+
+        self.assertGreater(len(expected), 20)
+        self.assertEqual(len(frame), len(expected))
+        for column in expected[0]:
+            with self.subTest(column=column):
+                np.testing.assert_allclose(
+                    frame[column].to_numpy(dtype=np.float64),
+                    [row[column] for row in expected],
+                    rtol=1e-9
+                )
+
+    def test_no_cycles(self):
+        frame = FanOptimizationModel().cycles_frame(np.array([100.0]), np.array([100.0]), np.array([25.0]))
+
+        self.assertEqual(len(frame), 0)
+        self.assertIn('temp_before', frame.columns)
+
+
+class ComputeFeaturesTests(SimpleTestCase):
+    """compute_features deve coincidir com a definição em pandas usada antes"""
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        # Leituras espalhadas por mais de um ano, para variar hora, dia e mês
+        self.times = pd.to_datetime(
+            np.sort(rng.integers(1_600_000_000, 1_640_000_000, size=500)), unit='s', utc=True
+        )
+        self.temperatures = np.round(rng.normal(25.0, 2.0, size=500), 2)
+        self.state_times = pd.to_datetime(
+            np.sort(rng.integers(1_600_100_000, 1_640_000_000, size=80)), unit='s', utc=True
+        )
+        self.states = rng.integers(0, 2, size=80).astype(bool)
+
+    def reference_frame(self):
+        df = pd.DataFrame({'timestamp': self.times, 'temperature': self.temperatures})
+        df['hour'] = df['timestamp'].dt.hour
+        df['day_of_week'] = df['timestamp'].dt.dayofweek
+        df['month'] = df['timestamp'].dt.month
+        for periods in (1, 2, 3):
+            df[f'temp_lag_{periods}'] = df['temperature'].shift(periods)
+        df['temp_rolling_mean_3'] = df['temperature'].rolling(window=3).mean()
+        df['temp_rolling_std_3'] = df['temperature'].rolling(window=3).std()
+        df['temp_diff'] = df['temperature'].diff()
+        df['temp_rolling_mean'] = df['temperature'].rolling(window=5).mean()
+        df['temp_deviation'] = (df['temperature'] - df['temp_rolling_mean']).abs()
+        states = pd.DataFrame({'timestamp': self.state_times, 'fan_state': self.states.astype(int)})
+        df = pd.merge_asof(df, states, on='timestamp', direction='backward')
+        df['fan_state'] = df['fan_state'].fillna(0)
+        return df
+
+    def test_matches_pandas(self):
+        features = compute_features(self.times, self.temperatures, to_micros(self.state_times), self.states)
+        expected = self.reference_frame()
+
+        self.assertEqual(set(features), set(FEATURE_COLUMNS))
+        for column in FEATURE_COLUMNS:
+            with self.subTest(column=column):
+                np.testing.assert_allclose(
+                    np.asarray(features[column], dtype=np.float64),
+                    expected[column].to_numpy(dtype=np.float64),
+                    rtol=1e-9, atol=1e-12
+                )
+
+    def test_accepts_microseconds_and_datetimes(self):
+        from_datetimes = compute_features(list(self.times.to_pydatetime()), self.temperatures)
+        from_micros = compute_features(to_micros(self.times), self.temperatures)
+
+        for column in FEATURE_COLUMNS:
+            np.testing.assert_array_equal(from_datetimes[column], from_micros[column])
+        self.assertFalse(from_micros['fan_state'].any())
+
+    def test_short_series(self):
+        features = compute_features(to_micros(self.times[:2]), self.temperatures[:2])
+
+        self.assertTrue(np.isnan(features['temp_lag_3']).all())
+        self.assertTrue(np.isnan(features['temp_rolling_std_3']).all())
+        self.assertEqual(features['temp_lag_1'][1], self.temperatures[0])
+
+    def test_trailing_stats(self):
+        times = to_micros(self.times)
+        window = 7 * 24 * 3600 * 1_000_000
+        targets = times[::25]
+
+        mean, std, count = trailing_stats(targets, times, self.temperatures, window)
+
+        for i, target in enumerate(targets):
+            values = self.temperatures[(times >= target - window) & (times < target)]
+            self.assertEqual(count[i], len(values))
+            if len(values):
+                self.assertAlmostEqual(mean[i], values.mean(), places=9)
+                self.assertAlmostEqual(std[i], values.std(), places=9)
+            else:
+                self.assertTrue(np.isnan(mean[i]))
+
+
+class SuccessiveHalvingTests(SimpleTestCase):
+    """Rodadas, recurso crescente e parada pelo orçamento da busca"""
+
+    CPU_PER_FIT = 2.0
+
+    def setUp(self):
+        self.X = np.arange(900, dtype=np.float64).reshape(-1, 1)
+        self.y = np.zeros(900)
+        self.fits = []
+        self.timed = []
+        for name, fake in (('_evaluate', self.fake_evaluate), ('_latency_ms', self.fake_latency)):
+            patcher = mock.patch.object(tuning, name, side_effect=fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def fake_evaluate(self, model_type, params, X, y, train_idx, test_idx, keep_estimator):
+        # MAE determinístico pelos parâmetros, sem ajustar floresta nenhuma
+        self.fits.append(len(X))
+        mae = params['min_samples_leaf'] + params['n_estimators'] / 1000
+        return mae, (dict(params) if keep_estimator else None), self.CPU_PER_FIT
+
+    def fake_latency(self, estimator, row):
+        self.timed.append(estimator)
+        return 0.1
+
+    def search(self, **kwargs):
+        return tuning.successive_halving('temperature_prediction', self.X, self.y, n_jobs=1, **kwargs)
+
+    def test_full_search(self):
+        result = self.search()
+
+        self.assertFalse(result['stopped_by_budget'])
+        self.assertEqual([item['candidates'] for item in result['rounds']], [27, 9, 3])
+        resources = [item['resource'] for item in result['rounds']]
+        self.assertEqual(resources, sorted(resources))
+        self.assertEqual(resources[-1], len(self.X))
+        self.assertEqual(len(self.fits), (27 + 9 + 3) * 3)
+        # Latência medida uma vez por candidato, no estimador da última dobra
+        self.assertEqual(len(self.timed), 27 + 9 + 3)
+        self.assertNotIn(None, self.timed)
+        self.assertGreaterEqual(result['cpu_time'], len(self.fits) * self.CPU_PER_FIT)
+
+        # O melhor do espaço amostrado sobrevive a todas as rodadas
+        first = result['rounds'][0]['best']
+        self.assertEqual(result['best']['params'], first['params'])
+        self.assertAlmostEqual(result['best']['objective'], first['mae'] + 0.05 * 0.1)
+
+    def test_cpu_budget_stops_before_next_round(self):
+        first_round = 27 * 3 * self.CPU_PER_FIT
+
+        result = self.search(cpu_budget=first_round * 1.5)
+
+        self.assertTrue(result['stopped_by_budget'])
+        self.assertEqual(len(result['rounds']), 1)
+        self.assertEqual(len(self.fits), 27 * 3)
+        self.assertEqual(result['best'], result['rounds'][0]['best'])
+
+    def test_first_round_always_runs(self):
+        result = self.search(time_budget=0)
+
+        self.assertTrue(result['stopped_by_budget'])
+        self.assertEqual(len(result['rounds']), 1)
+
+
+class TrainingJobTests(TestCase):
+    """Fila de treinamento: reserva, cancelamento e jobs sem heartbeat"""
+
+    def status(self, job):
+        return TrainingSession.objects.values_list('status', flat=True).get(id=job.id)
+
+    def test_claim_in_order_and_only_once(self):
+        first = jobs.submit_training(['temperature_prediction'])
+        second = jobs.submit_training()
+
+        claimed = jobs.claim_next_job('worker-a')
+        self.assertEqual(claimed.id, first.id)
+        self.assertEqual((claimed.status, claimed.worker), ('running', 'worker-a'))
+        self.assertIsNotNone(claimed.heartbeat_at)
+
+        self.assertEqual(jobs.claim_next_job('worker-b').id, second.id)
+        self.assertIsNone(jobs.claim_next_job('worker-c'))
+
+    def test_claim_skips_sessions_that_are_not_jobs(self):
+        now = timezone.now()
+        TrainingSession.objects.create(
+            data_start_date=now, data_end_date=now, training_samples=0, status='queued'
+        )
+
+        self.assertIsNone(jobs.claim_next_job('worker-a'))
+
+    def test_submit_rejects_unknown_types(self):
+        with self.assertRaises(ValueError):
+            jobs.submit_training(['temperature_prediction', 'unknown'])
+        self.assertFalse(jobs.jobs_queryset().exists())
+
+    def test_cancel_queued_job(self):
+        job = jobs.submit_training()
+
+        self.assertTrue(jobs.request_cancel(job))
+        self.assertEqual(self.status(job), 'cancelled')
+        self.assertIsNone(jobs.claim_next_job('worker-a'))
+        self.assertIsNone(jobs.get_active_job())
+
+    def test_cancel_running_job_is_cooperative(self):
+        job = jobs.submit_training()
+        jobs.claim_next_job('worker-a')
+
+        self.assertTrue(jobs.request_cancel(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.cancel_requested), ('running', True))
+        self.assertEqual(jobs.get_active_job().id, job.id)
+
+    def test_cancel_finished_job(self):
+        job = jobs.submit_training()
+        jobs.claim_next_job('worker-a')
+        jobs._close_job(job, 'completed', 'Treinamento concluído')
+
+        self.assertFalse(jobs.request_cancel(job))
+        self.assertEqual(self.status(job), 'completed')
+
+    def test_execute_job_stops_at_next_step_after_cancel(self):
+        job = jobs.submit_training(['temperature_prediction'])
+        jobs.claim_next_job('worker-a')
+        steps = []
+
+        def fake_train_models(model_types, parent, on_progress, **kwargs):
+            child = TrainingSession.objects.create(
+                parent=parent, data_start_date=parent.data_start_date, data_end_date=parent.data_end_date,
+                training_samples=0, status='running'
+            )
+            on_progress(1, 3, 'Snapshot carregado')
+            steps.append('snapshot')
+            jobs.request_cancel(parent)
+            on_progress(2, 3, 'Ajuste concluído')
+            steps.append('fit')
+            return child
+
+        with mock.patch.object(jobs, 'train_models', side_effect=fake_train_models):
+            jobs.execute_job(job.id)
+
+        self.assertEqual(steps, ['snapshot'])
+        self.assertEqual(self.status(job), 'cancelled')
+        self.assertEqual(
+            list(TrainingSession.objects.filter(parent=job).values_list('status', flat=True)), ['cancelled']
+        )
+
+    def test_recover_stale_jobs(self):
+        stale = jobs.submit_training()
+        alive = jobs.submit_training()
+        jobs.claim_next_job('worker-a')
+        jobs.claim_next_job('worker-b')
+        TrainingSession.objects.filter(id=stale.id).update(
+            heartbeat_at=timezone.now() - timedelta(seconds=jobs.STALE_SECONDS + 1)
+        )
+
+        self.assertEqual(jobs.recover_stale_jobs(), 1)
+        self.assertEqual(self.status(stale), 'failed')
+        self.assertEqual(self.status(alive), 'running')
+
+
+class TrainModelsAPITests(TestCase):
+    """Validação do corpo de POST /ml/api/train/"""
+
+    def setUp(self):
+        Reading.objects.bulk_create(Reading(temperature=25.0) for _ in range(10))
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('ml', password='ml'))
+
+    def submit(self, body):
+        return self.client.post(reverse('ml_models:train_models'), body, format='json')
+
+    def test_activate_is_parsed_strictly(self):
+        for value, expected in ((True, True), ('true', True), ('false', False), ('0', False), (False, False)):
+            with self.subTest(activate=value):
+                TrainingSession.objects.all().delete()
+                response = self.submit({'activate': value})
+
+                self.assertEqual(response.status_code, 202)
+                job = TrainingSession.objects.get(id=response.data['details']['training_session_id'])
+                self.assertIs(job.job_options['activate'], expected)
+
+    def test_defaults_to_inactive(self):
+        response = self.submit({})
+
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(jobs.get_active_job().job_options['activate'])
+
+    def test_invalid_activate(self):
+        for value in ('maybe', 1, None):
+            with self.subTest(activate=value):
+                response = self.submit({'activate': value})
+
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data['details']['type'], 'invalid_request')
+        self.assertFalse(jobs.jobs_queryset().exists())
+
+
+class PerformanceMetricsTests(TestCase):
+    """Janelas de MAE/RMSE recalculadas por compute_performance_metrics"""
+
+    def setUp(self):
+        self.model = MLModel.objects.create(name='temp', model_type='temperature_prediction', version='1')
+        self.day = datetime(2026, 1, 10, tzinfo=dt_timezone.utc)
+
+    def predict(self, created_at, prediction, actual_value):
+        item = MLPrediction.objects.create(
+            model=self.model, input_data={}, prediction=prediction,
+            actual_value=actual_value, is_verified=True
+        )
+        MLPrediction.objects.filter(id=item.id).update(created_at=created_at)
+
+    def metric(self, name, start):
+        return ModelPerformanceMetric.objects.get(
+            model=self.model, metric_name=name, evaluation_start=start
+        ).metric_value
+
+    def test_window_includes_predictions_made_before_it(self):
+        # Horizontes de 1 a 4h a partir de 22h da véspera: o primeiro cai fora da janela
+        self.predict(
+            self.day - timedelta(hours=2),
+            {'temperatures': [20.0, 21.0, 22.0, 23.0]},
+            {'temperatures': [25.0, 21.0, 21.0, 21.0]}
+        )
+        self.predict(self.day + timedelta(hours=1), {'predicted_temperature': 25.0}, {'temperature': 24.0})
+        previous_day = self.day - timedelta(days=1)
+        ModelPerformanceMetric.objects.create(
+            model=self.model, metric_name='mae', metric_value=9.0,
+            evaluation_start=previous_day, evaluation_end=self.day
+        )
+
+        results = compute_performance_metrics(self.day + timedelta(hours=5))
+
+        self.assertEqual([item['window_start'] for item in results], [self.day])
+        self.assertEqual(self.metric('samples', self.day), 4)
+        self.assertAlmostEqual(self.metric('mae', self.day), (0 + 1 + 2 + 1) / 4)
+        self.assertAlmostEqual(self.metric('rmse', self.day), np.sqrt((0 + 1 + 4 + 1) / 4))
+        # A janela anterior não foi recalculada e fica como estava
+        self.assertEqual(self.metric('mae', previous_day), 9.0)
+
+    def test_rerun_replaces_metrics(self):
+        self.predict(self.day + timedelta(hours=1), {'predicted_temperature': 25.0}, {'temperature': 24.0})
+
+        compute_performance_metrics(self.day)
+        compute_performance_metrics(self.day)
+
+        self.assertEqual(ModelPerformanceMetric.objects.filter(model=self.model).count(), 3)
+        self.assertEqual(self.metric('mae', self.day), 1.0)
+
+
+class LegacyModelDataTests(TestCase):
+    """Modelos com model_data legado e sem arquivo em disco"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = mock.patch('ml_models.artifacts.artifact_store', ModelArtifactStore(self.tmp.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_load_recreates_artifact_without_retraining(self):
+        trained = datetime(2025, 5, 1, tzinfo=dt_timezone.utc)
+        ml_model = MLModel.objects.create(
+            name='legacy', model_type='anomaly_detection', version='1', last_trained=trained,
+            model_data=pickle.dumps({'model': [1, 2, 3], 'scaler': None})
+        )
+
+        self.assertEqual(ml_model.load_model()['model'], [1, 2, 3])
+
+        ml_model.refresh_from_db()
+        self.assertTrue(ml_model.artifact_path)
+        self.assertEqual(ml_model.last_trained, trained)
+        self.assertEqual(MLModel.objects.get(id=ml_model.id).load_model()['model'], [1, 2, 3])
+
+
+class ForecastHorizonTests(TestCase):
+    """hours_ahead menor que 1 não pode devolver a previsão memorizada"""
+
+    def setUp(self):
+        self.model = MLModel.objects.create(name='temp', model_type='temperature_prediction', version='1', is_active=True)
+        # Token: a view assíncrona autentica por conta própria, fora do DRF
+        token = Token.objects.create(user=User.objects.create_user('ml', password='ml'))
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def test_cache_returns_nothing_for_non_positive_horizon(self):
+        cache = ForecastCache()
+        compute = mock.Mock(side_effect=lambda hours: [25.0] * hours)
+
+        self.assertEqual(len(cache.get_forecast(self.model, 3, compute)), 3)
+        for hours_ahead in (0, -5):
+            self.assertEqual(cache.get_forecast(self.model, hours_ahead, compute), [])
+
+    def test_views_reject_non_positive_horizon(self):
+        for url in (reverse('ml_models:temperature_prediction'), reverse('ml_models:temperature_prediction_async')):
+            for hours_ahead in (0, -5):
+                with self.subTest(url=url, hours_ahead=hours_ahead):
+                    response = self.client.get(url, {'hours_ahead': hours_ahead})
+
+                    self.assertEqual(response.status_code, 400)
@@ -32,7 +32,7 @@ def train_models():
     # Treina modelo de ventilador
     print("\n2. Treinando modelo de otimização do ventilador...")
     fan_model = FanOptimizationModel()
-    metrics = fan_model._train_legacy(days_back=7, force_retrain=True)
+    metrics = fan_model._train_legacy(days_back=30, force_retrain=True)
     print("Métricas:", metrics)
     
     # Treina modelo de anomalias
@@ -0,0 +1,491 @@
+# backend/ml_models/training.py
+
+import logging
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+import django
+import joblib
+import numpy as np
+import pandas as pd
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from threadpoolctl import threadpool_limits
+
+from .features import feature_store
+from .models import MLModel, TrainingSession
+from .ml_algorithms import TemperaturePredictionModel, FanOptimizationModel, AnomalyDetectionModel
+from .snapshots import snapshot_store
+
+logger = logging.getLogger(__name__)
+
+MODEL_TYPES = tuple(choice for choice, _ in MLModel.MODEL_TYPES)
+# Tentativas de registro quando a versão (instante) já existe para o tipo
+VERSION_ATTEMPTS = 5
+
+
+def extract_snapshot(days_back=30):
+    """
+    Lê uma única vez as leituras e os estados do ventilador do período
+
+    O mesmo snapshot alimenta os três modelos, em vez de cada
+    get_training_data consultar o banco por conta própria. Os dias
+    fechados vêm dos segmentos colunares de snapshots.py.
+
+    Returns:
+        dict: start, end, readings (id/timestamp/temperature) e
+              fan_states (id/timestamp/state) como DataFrames ordenados,
+              e features (readings com as colunas de features.py)
+    """
+    end = timezone.now()
+    start = end - timedelta(days=days_back)
+
+    readings = snapshot_store.frame('readings', start, end)
+    fan_states = snapshot_store.frame('fan_states', start, end)
+    snapshot = {'start': start, 'end': end, 'readings': readings, 'fan_states': fan_states}
+    snapshot_features(snapshot)
+    return snapshot
+
+
+def _seconds(timestamps):
+    """Instantes de uma coluna de datas como segundos desde o epoch"""
+    return ((pd.to_datetime(timestamps, utc=True) - pd.Timestamp(0, tz='UTC')) / pd.Timedelta(seconds=1)).to_numpy()
+
+
+# Hiperparâmetros das florestas quando não há configuração ajustada (tune_ml_models)
+DEFAULT_PARAMS = {
+    'temperature_prediction': {'n_estimators': 100, 'max_depth': 10},
+    'fan_optimization': {'n_estimators': 20, 'max_depth': 5},
+}
+
+
+def build_estimator(model_type, params=None, n_jobs=-1):
+    """Floresta do tipo com os hiperparâmetros dados (ou os padrões)"""
+    forest = RandomForestRegressor(
+        **(params or DEFAULT_PARAMS[model_type]), random_state=42, n_jobs=n_jobs
+    )
+    if model_type == 'temperature_prediction':
+        return Pipeline([('scaler', StandardScaler()), ('regressor', forest)])
+    return forest
+
+
+def tuned_params(model_type):
+    """Configuração vencedora da última busca do tipo (ver tuning.py), ou None"""
+    ml_model = MLModel.objects.filter(
+        model_type=model_type,
+        hyperparameters__has_key='tuning'
+    ).order_by('-created_at').first()
+    return ml_model.hyperparameters['tuning']['params'] if ml_model else None
+
+
+def snapshot_features(snapshot):
+    """
+    Features por leitura do snapshot (features.py), calculadas uma única vez
+
+    extract_snapshot já as inclui, então os processos do pool recebem as
+    features prontas com o snapshot em vez de recalculá-las por tipo.
+    """
+    if 'features' not in snapshot:
+        snapshot['features'] = feature_store.frame(snapshot['readings'], snapshot['fan_states'])
+    return snapshot['features']
+
+
+def _temperature_xy(snapshot):
+    """Features e alvo de temperatura do snapshot, em ordem temporal"""
+    if snapshot['readings'].empty:
+        raise ValueError("Não há dados suficientes para treinamento")
+
+    X, y = TemperaturePredictionModel().training_features(snapshot_features(snapshot))
+    if len(X) < 10:
+        raise ValueError("Dados insuficientes após limpeza (mínimo 10 amostras)")
+    return X, y
+
+
+def _fan_xy(snapshot):
+    """
+    Features e eficiência dos ciclos do ventilador, em ordem temporal
+
+    Returns:
+        tuple: (X, y, using_synthetic); sintético com menos de 5 ciclos
+    """
+    fan_model = FanOptimizationModel()
+    readings = snapshot['readings']
+    states = snapshot['fan_states']
+    active = states[states['state'].astype(bool)]
+
+    df = pd.DataFrame()
+    if len(active) >= 2 and not readings.empty:
+        df = fan_model.cycles_frame(
+            _seconds(active['timestamp']),
+            _seconds(readings['timestamp']),
+            readings['temperature'].to_numpy(dtype=np.float64)
+        )
+
+    using_synthetic = len(df) < 5
+    if using_synthetic:
+        df = fan_model.create_dummy_data()
+    return df[fan_model.feature_columns], df['cooling_efficiency'], using_synthetic
+
+
+def _anomaly_x(snapshot):
+    """Features de anomalia do snapshot (sem alvo)"""
+    if snapshot['readings'].empty:
+        raise ValueError("Não há dados para treinamento de anomalias")
+    return AnomalyDetectionModel().training_features(snapshot_features(snapshot))
+
+
+def _fit_temperature(snapshot, n_jobs, params=None):
+    X, y = _temperature_xy(snapshot)
+    return _train_temperature(X, y, n_jobs, params)
+
+
+def _train_temperature(X, y, n_jobs, params=None):
+    """Mesmo pipeline de TemperaturePredictionModel._train_legacy"""
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, shuffle=False)
+    model = build_estimator('temperature_prediction', params, n_jobs)
+    model.fit(X_train, y_train)
+    y_pred = model.predict(X_test)
+
+    metrics = {
+        'mse': float(mean_squared_error(y_test, y_pred)),
+        'mae': float(mean_absolute_error(y_test, y_pred)),
+        'r2': float(r2_score(y_test, y_pred)),
+        'training_samples': int(len(X_train)),
+        'test_samples': int(len(X_test))
+    }
+    return model, metrics
+
+
+def _fit_fan(snapshot, n_jobs, params=None):
+    X, y, using_synthetic = _fan_xy(snapshot)
+    return _train_fan(X, y, using_synthetic, n_jobs, params)
+
+
+def _train_fan(X, y, using_synthetic, n_jobs, params=None):
+    """Mesmo ajuste de FanOptimizationModel._train_legacy (sintético sem ciclos suficientes)"""
+    if using_synthetic:
+        model = LinearRegression()
+    else:
+        model = build_estimator('fan_optimization', params, n_jobs)
+
+    model.fit(X, y)
+    y_pred = model.predict(X)
+
+    metrics = {
+        'mse': float(mean_squared_error(y, y_pred)),
+        'mae': float(mean_absolute_error(y, y_pred)),
+        'r2': float(r2_score(y, y_pred)),
+        'training_samples': int(len(X)),
+        'using_synthetic': using_synthetic
+    }
+    return model, metrics
+
+
+def _fit_anomaly(snapshot, n_jobs, params=None):
+    return _train_anomaly(_anomaly_x(snapshot), n_jobs, params)
+
+
+def _train_anomaly(X, n_jobs, params=None):
+    """Mesmo ajuste de AnomalyDetectionModel._train_legacy"""
+    anomaly_model = AnomalyDetectionModel()
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    model = anomaly_model.get_default_model().set_params(n_jobs=n_jobs)
+    model.fit(X_scaled)
+
+    predictions = model.predict(X_scaled)
+    scores = model.score_samples(X_scaled)
+    metrics = {
+        'anomaly_ratio': float((predictions == -1).sum() / len(predictions)),
+        'total_samples': int(len(X)),
+        'training_samples': int(len(X)),
+        'anomalies_detected': int((predictions == -1).sum()),
+        'average_score': float(np.mean(scores)),
+        'min_score': float(np.min(scores)),
+        'max_score': float(np.max(scores))
+    }
+    return {'model': model, 'scaler': scaler, 'is_fitted': True}, metrics
+
+
+TRAINERS = {
+    'temperature_prediction': _fit_temperature,
+    'fan_optimization': _fit_fan,
+    'anomaly_detection': _fit_anomaly,
+}
+
+# Etapas de cada trainer, medidas separadamente por benchmark_training:
+# features(snapshot) -> tupla de argumentos de train(*features, n_jobs)
+STAGES = {
+    'temperature_prediction': (_temperature_xy, _train_temperature),
+    'fan_optimization': (_fan_xy, _train_fan),
+    'anomaly_detection': (lambda snapshot: (_anomaly_x(snapshot),), _train_anomaly),
+}
+
+
+def _init_worker():
+    # Com spawn o processo filho começa sem o Django configurado
+    django.setup()
+
+
+def run_job(model_type, snapshot_path, n_jobs=-1, params=None):
+    """
+    Ajusta um tipo de modelo a partir do snapshot salvo em disco
+
+    Roda no processo do pool (ou no próprio processo, no modo sequencial)
+    sem acessar o banco. O limite de threads vale para o n_jobs do sklearn
+    e para as bibliotecas nativas (BLAS/OpenMP) via threadpoolctl.
+
+    Args:
+        params: Hiperparâmetros da floresta (None: DEFAULT_PARAMS)
+
+    Returns:
+        dict: model_type, artifact, metrics, wall_time e cpu_time do ajuste
+    """
+    snapshot = joblib.load(snapshot_path)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+
+    with threadpool_limits(limits=None if n_jobs == -1 else n_jobs):
+        artifact, metrics = TRAINERS[model_type](snapshot, n_jobs, params)
+
+    return {
+        'model_type': model_type,
+        'artifact': artifact,
+        'metrics': metrics,
+        'wall_time': time.perf_counter() - wall_start,
+        # process_time soma todas as threads do processo (inclui as do n_jobs)
+        'cpu_time': time.process_time() - cpu_start,
+    }
+
+
+def _estimator_params(artifact):
+    """Hiperparâmetros serializáveis do estimador final do artefato"""
+    estimator = artifact['model'] if isinstance(artifact, dict) else artifact
+    if isinstance(estimator, Pipeline):
+        estimator = estimator.steps[-1][1]
+    return {
+        key: value for key, value in estimator.get_params(deep=False).items()
+        if value is None or isinstance(value, (bool, int, float, str))
+    }
+
+
+def activate_model(ml_model):
+    """Torna o modelo o ativo do seu tipo, desativando o anterior na mesma transação"""
+    with transaction.atomic():
+        MLModel.objects.filter(model_type=ml_model.model_type, is_active=True).update(is_active=False)
+        ml_model.is_active = True
+        ml_model.save(update_fields=['is_active'])
+
+
+def register_model(model_type, artifact, metrics, activate=False):
+    """
+    Registra o artefato treinado como nova versão do tipo
+
+    A versão é o instante do registro, com microssegundos: registros do
+    mesmo tipo no mesmo segundo (ex.: tune_ml_models --save junto com o
+    worker de treino) não colidem em (model_type, version). Se ainda
+    assim colidirem, o registro é refeito com um novo instante. Sem
+    activate, o modelo fica inativo (pode ser avaliado em sombra antes da
+    troca); com activate, substitui o ativo do tipo em uma transação.
+    """
+    for attempt in range(VERSION_ATTEMPTS):
+        version = timezone.now().strftime('%Y%m%d%H%M%S%f')
+        try:
+            with transaction.atomic():
+                ml_model = MLModel.objects.create(
+                    name=dict(MLModel.MODEL_TYPES)[model_type],
+                    model_type=model_type,
+                    version=version,
+                    description='Treinado por train_ml_models',
+                    is_active=False,
+                    mse=metrics.get('mse'),
+                    mae=metrics.get('mae'),
+                    r2_score=metrics.get('r2'),
+                    hyperparameters=_estimator_params(artifact)
+                )
+            break
+        except IntegrityError:
+            if attempt == VERSION_ATTEMPTS - 1:
+                raise
+            time.sleep(0.001)
+    if not ml_model.save_model(artifact):
+        ml_model.delete()
+        raise RuntimeError(f"Erro ao salvar o artefato de {model_type}")
+
+    if activate:
+        activate_model(ml_model)
+
+    return ml_model
+
+
+def train_models(model_types=MODEL_TYPES, days_back=30, parallel=False, cores_per_job=None,
+                 activate=False, record=True, parent=None, on_progress=None):
+    """
+    Treina os tipos pedidos a partir de um único snapshot do banco
+
+    Em paralelo, cada tipo roda em um processo do pool com no máximo
+    cores_per_job threads (padrão: núcleos / número de tipos), em vez de
+    três ajustes com n_jobs=-1 disputando os mesmos núcleos. Cada ajuste
+    vira uma TrainingSession com tempo de relógio e de CPU. As florestas
+    usam a configuração da última busca de tune_ml_models, se houver.
+
+    Args:
+        record: Sem sessões nem modelos registrados (só mede os tempos,
+                como a linha de base de train_ml_models --compare)
+        parent: Sessão do job em segundo plano que agrupa as sessões
+        on_progress: Chamado com (etapas concluídas, total, mensagem) após
+                     o snapshot e cada ajuste; pode levantar uma exceção
+                     para interromper (cancelamento, ver jobs.py)
+
+    Returns:
+        dict: results (um por tipo), snapshot_time e elapsed (ponta a ponta)
+    """
+    model_types = list(model_types)
+    if parallel and cores_per_job is None:
+        cores_per_job = max(1, (os.cpu_count() or 1) // len(model_types))
+    n_jobs = cores_per_job or -1
+    # Snapshot, um ajuste por tipo e o registro dos modelos
+    total_steps = len(model_types) + 2
+
+    def report(done, message):
+        if on_progress is not None:
+            on_progress(done, total_steps, message)
+
+    params = {model_type: tuned_params(model_type) for model_type in model_types}
+
+    start = time.perf_counter()
+    snapshot = extract_snapshot(days_back)
+    snapshot_time = time.perf_counter() - start
+    report(1, f"Snapshot com {len(snapshot['readings'])} leituras")
+
+    sessions = {}
+    if record:
+        sessions = {
+            model_type: TrainingSession.objects.create(
+                model=None,
+                parent=parent,
+                data_start_date=snapshot['start'],
+                data_end_date=snapshot['end'],
+                training_samples=0,
+                status='running',
+                training_metrics={'model_type': model_type, 'parallel': parallel, 'cores': cores_per_job}
+            )
+            for model_type in model_types
+        }
+
+    workdir = tempfile.mkdtemp(prefix='ml-training-')
+    jobs = {}
+    try:
+        snapshot_path = os.path.join(workdir, 'snapshot.joblib')
+        joblib.dump(snapshot, snapshot_path)
+
+        if parallel:
+            # Conexões abertas não podem ser compartilhadas com os processos filhos
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=len(model_types), initializer=_init_worker) as pool:
+                futures = {
+                    pool.submit(run_job, model_type, snapshot_path, n_jobs, params[model_type]): model_type
+                    for model_type in model_types
+                }
+                try:
+                    for future in as_completed(futures):
+                        try:
+                            jobs[futures[future]] = future.result()
+                        except Exception as e:
+                            jobs[futures[future]] = e
+                        report(1 + len(jobs), f"{futures[future]} ajustado")
+                except BaseException:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    raise
+        else:
+            for model_type in model_types:
+                report(1 + len(jobs), f"Ajustando {model_type}")
+                try:
+                    jobs[model_type] = run_job(model_type, snapshot_path, n_jobs, params[model_type])
+                except Exception as e:
+                    jobs[model_type] = e
+            report(1 + len(jobs), "Ajustes concluídos")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if record:
+        results = [_finish_session(sessions[model_type], jobs[model_type], activate) for model_type in model_types]
+    else:
+        results = [_job_summary(model_type, jobs[model_type]) for model_type in model_types]
+
+    return {
+        'results': results,
+        'parallel': parallel,
+        'cores_per_job': cores_per_job,
+        'snapshot_time': snapshot_time,
+        'elapsed': time.perf_counter() - start,
+    }
+
+
+def _job_summary(model_type, job):
+    if isinstance(job, Exception):
+        return {'model_type': model_type, 'status': 'failed', 'error': str(job), 'wall_time': None, 'cpu_time': None}
+    return {
+        'model_type': model_type,
+        'status': 'completed',
+        'metrics': job['metrics'],
+        'error': None,
+        'wall_time': job['wall_time'],
+        'cpu_time': job['cpu_time'],
+    }
+
+
+def _finish_session(session, job, activate):
+    """Registra o modelo e fecha a TrainingSession do ajuste"""
+    session.completed_at = timezone.now()
+
+    if isinstance(job, Exception):
+        logger.error(f"Erro no treinamento de {session.training_metrics['model_type']}: {str(job)}")
+        session.status = 'failed'
+        session.error_message = str(job)
+        session.save()
+        return {
+            'model_type': session.training_metrics['model_type'],
+            'status': 'failed',
+            'session_id': session.id,
+            'error': str(job),
+            'wall_time': None,
+            'cpu_time': None,
+        }
+
+    metrics = job['metrics']
+    session.wall_time_seconds = job['wall_time']
+    session.cpu_time_seconds = job['cpu_time']
+    session.training_samples = metrics.get('training_samples', 0)
+    session.validation_samples = metrics.get('test_samples')
+    session.training_metrics.update(metrics)
+
+    try:
+        session.model = register_model(job['model_type'], job['artifact'], metrics, activate=activate)
+        session.status = 'completed'
+    except Exception as e:
+        logger.error(f"Erro ao registrar {job['model_type']}: {str(e)}")
+        session.status = 'failed'
+        session.error_message = str(e)
+    session.save()
+
+    return {
+        'model_type': job['model_type'],
+        'status': session.status,
+        'session_id': session.id,
+        'model': session.model,
+        'metrics': metrics,
+        'error': session.error_message or None,
+        'wall_time': job['wall_time'],
+        'cpu_time': job['cpu_time'],
+    }
@@ -0,0 +1,316 @@
+# backend/ml_models/tree_compiler.py
+
+import logging
+import threading
+import weakref
+
+import numpy as np
+from sklearn.ensemble import IsolationForest, RandomForestRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+logger = logging.getLogger(__name__)
+
+
+class FlatForest:
+    """
+    Florestas de decisão achatadas em arrays NumPy contíguos
+
+    Os nós de todas as árvores são concatenados em arrays únicos (feature,
+    threshold, filhos) e a travessia avança um nível por iteração para
+    todas as árvores e amostras de uma vez. As folhas apontam para si
+    mesmas, então depois de max_depth iterações todas as travessias
+    terminam em uma folha.
+
+    A comparação segue o sklearn: X é convertido para float32 e comparado
+    com o threshold em float64 (x <= threshold vai para a esquerda;
+    NaN segue missing_go_to_left).
+    """
+
+    def __init__(self, trees, feature_maps=None):
+        features, thresholds, lefts, rights, missing_left, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for i, tree in enumerate(trees):
+            n_nodes = tree.node_count
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(n_nodes, dtype=np.intp)
+
+            feature = np.where(is_leaf, 0, tree.feature).astype(np.intp)
+            if feature_maps is not None and feature_maps[i] is not None:
+                feature = np.asarray(feature_maps[i], dtype=np.intp)[feature]
+
+            features.append(feature)
+            thresholds.append(np.asarray(tree.threshold, dtype=np.float64))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left).astype(np.intp) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right).astype(np.intp) + offset)
+            missing_left.append(np.where(is_leaf, True, np.asarray(tree.missing_go_to_left, dtype=bool)))
+            roots.append(offset)
+
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        self.feature = np.concatenate(features)
+        self.threshold = np.concatenate(thresholds)
+        self.left = np.concatenate(lefts)
+        self.right = np.concatenate(rights)
+        self.missing_left = np.concatenate(missing_left)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = max_depth
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def apply(self, X):
+        """
+        Índice global da folha alcançada por cada amostra em cada árvore
+
+        Args:
+            X: Array float32 de forma (n_amostras, n_features)
+
+        Returns:
+            ndarray: (n_amostras, n_árvores)
+        """
+        n_samples, n_features = X.shape
+        flat = X.ravel()
+        row_offsets = (np.arange(n_samples, dtype=np.intp) * n_features)[:, None]
+        has_missing = bool(np.isnan(flat).any())
+
+        nodes = np.repeat(self.roots[None, :], n_samples, axis=0)
+        for _ in range(self.max_depth):
+            values = flat[row_offsets + self.feature[nodes]]
+            go_left = values <= self.threshold[nodes]
+            if has_missing:
+                go_left |= np.isnan(values) & self.missing_left[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+
+class CompiledForestRegressor:
+    """RandomForestRegressor compilado (uma ou várias saídas)"""
+
+    def __init__(self, estimator, preprocess=None):
+        trees = [tree.tree_ for tree in estimator.estimators_]
+        self.forest = FlatForest(trees)
+        # value tem forma (n_nós, n_saídas, 1) em regressão
+        self.leaf_values = np.concatenate([tree.value[:, :, 0] for tree in trees]).astype(np.float64)
+        self.n_outputs = trees[0].n_outputs
+        self.n_features_in_ = estimator.n_features_in_
+        self.preprocess = preprocess or []
+
+    def predict(self, X):
+        X = _prepare_input(X, self.preprocess, self.n_features_in_)
+        leaves = self.forest.apply(X)
+        # Soma sequencial na ordem das árvores, como o sklearn acumula
+        # (np.sum usaria soma em pares e poderia diferir no último bit)
+        totals = np.cumsum(self.leaf_values[leaves], axis=1)[:, -1, :]
+        totals /= self.forest.n_trees
+        if self.n_outputs == 1:
+            return totals[:, 0]
+        return totals
+
+
+class CompiledIsolationForest:
+    """
+    IsolationForest compilado
+
+    O termo de profundidade de cada folha (_decision_path_lengths +
+    _average_path_length_per_tree - 1) é pré-calculado, então uma única
+    travessia produz o score e a predição.
+    """
+
+    def __init__(self, estimator, preprocess=None):
+        from sklearn.ensemble._iforest import _average_path_length
+
+        trees = [tree.tree_ for tree in estimator.estimators_]
+        feature_maps = None
+        if estimator._max_features != estimator.n_features_in_:
+            feature_maps = list(estimator.estimators_features_)
+
+        self.forest = FlatForest(trees, feature_maps)
+        self.leaf_terms = np.concatenate([
+            (path_lengths + average_lengths) - 1.0
+            for path_lengths, average_lengths in zip(
+                estimator._decision_path_lengths,
+                estimator._average_path_length_per_tree
+            )
+        ]).astype(np.float64)
+        self.denominator = len(estimator.estimators_) * _average_path_length([estimator._max_samples])
+        self.offset_ = float(estimator.offset_)
+        self.n_features_in_ = estimator.n_features_in_
+        self.preprocess = preprocess or []
+
+    def evaluate(self, X):
+        """
+        Predição e score em uma única travessia
+
+        Returns:
+            tuple: (predições 1/-1, score_samples)
+        """
+        X = _prepare_input(X, self.preprocess, self.n_features_in_)
+        leaves = self.forest.apply(X)
+        depths = np.cumsum(self.leaf_terms[leaves], axis=1)[:, -1]
+        scores = -(2 ** (
+            -np.divide(depths, self.denominator, out=np.ones_like(depths), where=self.denominator != 0)
+        ))
+        predictions = np.ones(len(scores), dtype=int)
+        predictions[scores - self.offset_ < 0] = -1
+        return predictions, scores
+
+    def predict(self, X):
+        return self.evaluate(X)[0]
+
+    def score_samples(self, X):
+        return self.evaluate(X)[1]
+
+    def decision_function(self, X):
+        return self.evaluate(X)[1] - self.offset_
+
+
+class CompiledStandardScaler:
+    """Mesmas operações de StandardScaler.transform, sem a validação por chamada"""
+
+    def __init__(self, scaler):
+        self.mean = np.asarray(scaler.mean_, dtype=np.float64) if scaler.with_mean else None
+        self.scale = np.asarray(scaler.scale_, dtype=np.float64) if scaler.with_std else None
+
+    def transform(self, X):
+        X = np.array(X, dtype=np.float64)
+        if self.mean is not None:
+            X -= self.mean
+        if self.scale is not None:
+            X /= self.scale
+        return X
+
+
+def _prepare_input(X, preprocess, n_features):
+    X = np.asarray(X, dtype=np.float64) if preprocess else X
+    for step in preprocess:
+        X = step.transform(X)
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+    if X.shape[1] != n_features:
+        raise ValueError(f"Esperadas {n_features} features, recebidas {X.shape[1]}")
+    return X
+
+
+def compile_model(estimator):
+    """
+    Compila um estimador treinado
+
+    Suporta RandomForestRegressor, IsolationForest, StandardScaler e
+    Pipelines formados por StandardScaler seguidos de uma das florestas.
+
+    Returns:
+        CompiledForestRegressor | CompiledIsolationForest |
+        CompiledStandardScaler | None se o estimador não for suportado
+    """
+    if type(estimator) is StandardScaler:
+        return CompiledStandardScaler(estimator) if hasattr(estimator, 'scale_') else None
+
+    preprocess = []
+    if isinstance(estimator, Pipeline):
+        for _, step in estimator.steps[:-1]:
+            if type(step) is not StandardScaler:
+                return None
+            preprocess.append(CompiledStandardScaler(step))
+        estimator = estimator.steps[-1][1]
+
+    if not hasattr(estimator, 'estimators_'):
+        return None
+    if type(estimator) is RandomForestRegressor:
+        return CompiledForestRegressor(estimator, preprocess)
+    if type(estimator) is IsolationForest:
+        return CompiledIsolationForest(estimator, preprocess)
+    return None
+
+
+class CompiledModelRegistry:
+    """
+    Memoriza a versão compilada de cada estimador carregado no processo
+
+    As entradas são indexadas pelo próprio objeto do estimador (referência
+    fraca), então somem junto com ele quando o modelo é trocado.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._compiled = weakref.WeakKeyDictionary()
+
+    def get(self, estimator):
+        """Retorna o modelo compilado ou None se o estimador não for suportado"""
+        if estimator is None:
+            return None
+        try:
+            with self._lock:
+                if estimator in self._compiled:
+                    return self._compiled[estimator]
+        except TypeError:
+            # Objeto sem suporte a referência fraca
+            return None
+
+        try:
+            compiled = compile_model(estimator)
+        except Exception as e:
+            logger.warning(f"Não foi possível compilar {type(estimator).__name__}: {str(e)}")
+            compiled = None
+
+        with self._lock:
+            self._compiled[estimator] = compiled
+        return compiled
+
+    def clear(self):
+        with self._lock:
+            self._compiled.clear()
+
+
+compiled_models = CompiledModelRegistry()
+
+
+def verify_compiled(estimator, X):
+    """
+    Compara o modelo compilado com o sklearn no corpus X
+
+    O sklearn é executado com n_jobs=1: com mais threads a ordem de soma
+    das árvores varia entre chamadas e o próprio sklearn deixa de ser
+    reprodutível no último bit.
+
+    Returns:
+        dict: Resultado por saída comparada ('exact' e maior diferença absoluta)
+    """
+    compiled = compile_model(estimator)
+    if compiled is None:
+        raise ValueError(f"Estimador não suportado: {type(estimator).__name__}")
+
+    final = estimator.steps[-1][1] if isinstance(estimator, Pipeline) else estimator
+    n_jobs = final.n_jobs
+    final.n_jobs = 1
+    try:
+        if isinstance(compiled, CompiledIsolationForest):
+            predictions, scores = compiled.evaluate(X)
+            pairs = {
+                'predict': (estimator.predict(X), predictions),
+                'score_samples': (estimator.score_samples(X), scores),
+                'decision_function': (estimator.decision_function(X), compiled.decision_function(X)),
+            }
+        else:
+            pairs = {'predict': (estimator.predict(X), compiled.predict(X))}
+    finally:
+        final.n_jobs = n_jobs
+
+    results = {}
+    for name, (expected, actual) in pairs.items():
+        expected = np.asarray(expected, dtype=np.float64)
+        actual = np.asarray(actual, dtype=np.float64)
+        results[name] = {
+            'exact': expected.shape == actual.shape and bool(np.array_equal(expected, actual)),
+            'max_abs_diff': float(np.max(np.abs(expected - actual))) if expected.shape == actual.shape else None,
+        }
+    return results
@@ -0,0 +1,173 @@
+# backend/ml_models/tuning.py
+
+import logging
+import math
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import ParameterSampler, TimeSeriesSplit
+from threadpoolctl import threadpool_limits
+
+from .inference import predict_rows
+from .training import _fan_xy, _temperature_xy, build_estimator
+
+logger = logging.getLogger(__name__)
+
+# Espaços de busca das florestas (tipos sem alvo, como anomalias, ficam de fora)
+SEARCH_SPACES = {
+    'temperature_prediction': {
+        'n_estimators': [25, 50, 100, 200],
+        'max_depth': [4, 6, 8, 10, 14, None],
+        'min_samples_leaf': [1, 2, 5, 10],
+        'max_features': [1.0, 0.5, 'sqrt'],
+    },
+    'fan_optimization': {
+        'n_estimators': [10, 20, 50, 100],
+        'max_depth': [3, 5, 8, None],
+        'min_samples_leaf': [1, 2, 5],
+        'max_features': [1.0, 0.5],
+    },
+}
+
+# Predições de uma linha usadas para medir a latência de cada candidato
+LATENCY_REPEATS = 200
+
+
+def tuning_xy(model_type, snapshot):
+    """
+    Features e alvo do tipo em ordem temporal, como no treinamento
+
+    Raises:
+        ValueError: sem dados reais (o ventilador cai no conjunto sintético)
+    """
+    if model_type == 'temperature_prediction':
+        X, y = _temperature_xy(snapshot)
+    else:
+        X, y, using_synthetic = _fan_xy(snapshot)
+        if using_synthetic:
+            raise ValueError("Ciclos do ventilador insuficientes; a busca usaria dados sintéticos")
+    return X.to_numpy(dtype=np.float64), y.to_numpy(dtype=np.float64)
+
+
+def _latency_ms(estimator, row):
+    """Mediana da predição de uma linha pelo caminho de produção (predict_rows)"""
+    predict_rows(estimator, row)
+    timings = np.empty(LATENCY_REPEATS)
+    for i in range(LATENCY_REPEATS):
+        start = time.perf_counter()
+        predict_rows(estimator, row)
+        timings[i] = time.perf_counter() - start
+    return float(np.median(timings) * 1000)
+
+
+def _evaluate(model_type, params, X, y, train_idx, test_idx, keep_estimator):
+    """
+    Ajusta um candidato em uma dobra (um núcleo) e mede o MAE
+
+    O estimador da última dobra (o mais próximo do tamanho final) volta para
+    o processo principal, que mede a latência depois dos ajustes: medida aqui,
+    com os outros núcleos ocupados, refletiria a disputa por CPU.
+    """
+    cpu_start = time.process_time()
+    with threadpool_limits(limits=1):
+        estimator = build_estimator(model_type, params, n_jobs=1)
+        estimator.fit(X[train_idx], y[train_idx])
+        mae = mean_absolute_error(y[test_idx], predict_rows(estimator, X[test_idx]))
+    return mae, (estimator if keep_estimator else None), time.process_time() - cpu_start
+
+
+def successive_halving(model_type, X, y, n_candidates=27, eta=3, n_splits=3, time_budget=300,
+                       cpu_budget=None, latency_weight=0.05, n_jobs=-1, random_state=42):
+    """
+    Busca de hiperparâmetros por successive halving com validação temporal
+
+    A cada rodada, os candidatos restantes são avaliados com TimeSeriesSplit
+    sobre as amostras mais recentes (o recurso cresce eta vezes por rodada,
+    até o histórico inteiro) e só o melhor 1/eta segue. As dobras de todos
+    os candidatos rodam em paralelo, um núcleo por ajuste.
+
+    O objetivo é MAE + latency_weight * latência (ms por predição de uma
+    linha), para preferir o modelo mais barato quando a precisão empata. A
+    latência é medida em série, após os ajustes paralelos da rodada.
+
+    Como cada rodada custa aproximadamente o mesmo, a busca para antes de
+    uma rodada que estouraria o orçamento de relógio ou de CPU (somada a
+    todos os processos) pelo custo da anterior; a primeira sempre roda.
+
+    Returns:
+        dict: best (params, mae, latency_ms, objective), rounds (histórico),
+              elapsed, cpu_time e stopped_by_budget
+    """
+    candidates = list(ParameterSampler(SEARCH_SPACES[model_type], n_candidates, random_state=random_state))
+    n_rounds = max(1, math.ceil(math.log(len(candidates), eta))) if len(candidates) > 1 else 1
+    min_resource = min(len(X), (n_splits + 1) * 20)
+
+    start = time.perf_counter()
+    cpu_used = 0.0
+    rounds = []
+    ranked = None
+    stopped_by_budget = False
+
+    for round_index in range(n_rounds):
+        if rounds:
+            previous = rounds[-1]
+            if time.perf_counter() - start + previous['elapsed'] > time_budget or (
+                    cpu_budget is not None and cpu_used + previous['cpu_time'] > cpu_budget):
+                stopped_by_budget = True
+                break
+
+        resource = int(len(X) * eta ** (round_index - n_rounds + 1))
+        resource = min(len(X), max(min_resource, resource))
+        X_round, y_round = X[-resource:], y[-resource:]
+        folds = list(TimeSeriesSplit(n_splits=n_splits).split(X_round))
+
+        round_start = time.perf_counter()
+        outputs = Parallel(n_jobs=n_jobs)(
+            delayed(_evaluate)(
+                model_type, params, X_round, y_round, train_idx, test_idx, fold == len(folds) - 1
+            )
+            for params in candidates
+            for fold, (train_idx, test_idx) in enumerate(folds)
+        )
+
+        # Com o pool ocioso: um candidato por vez, um núcleo, como na produção
+        latency_cpu_start = time.process_time()
+        row = X_round[folds[-1][1]][:1]
+        scored = []
+        for i, params in enumerate(candidates):
+            results = outputs[i * len(folds):(i + 1) * len(folds)]
+            mae = float(np.mean([result[0] for result in results]))
+            with threadpool_limits(limits=1):
+                latency = _latency_ms(results[-1][1], row)
+            scored.append({
+                'params': params,
+                'mae': mae,
+                'latency_ms': latency,
+                'objective': mae + latency_weight * latency,
+            })
+        round_cpu = sum(result[2] for result in outputs) + time.process_time() - latency_cpu_start
+        cpu_used += round_cpu
+
+        ranked = sorted(scored, key=lambda item: item['objective'])
+        rounds.append({
+            'resource': resource,
+            'candidates': len(candidates),
+            'elapsed': time.perf_counter() - round_start,
+            'cpu_time': round_cpu,
+            'best': ranked[0],
+        })
+        logger.info(
+            f"Rodada {round_index + 1}/{n_rounds} de {model_type}: {len(candidates)} candidatos, "
+            f"{resource} amostras, melhor objetivo {ranked[0]['objective']:.4f}"
+        )
+        candidates = [item['params'] for item in ranked[:max(1, math.ceil(len(candidates) / eta))]]
+
+    return {
+        'best': ranked[0],
+        'rounds': rounds,
+        'elapsed': time.perf_counter() - start,
+        'cpu_time': cpu_used,
+        'stopped_by_budget': stopped_by_budget,
+    }
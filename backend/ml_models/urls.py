@@ -3,6 +3,7 @@
 from django.urls import path
 from . import views
 from . import views_dashboard
+from . import views_async
 from django.views.decorators.csrf import csrf_exempt
 
 app_name = 'ml_models'
@@ -13,9 +14,20 @@ urlpatterns = [
     
     # API endpoints para ML
     path('api/train/', views.TrainModelsAPIView.as_view(), name='train_models'),
+    path('api/train/<int:job_id>/', views.TrainingJobStatusAPIView.as_view(), name='training_job_status'),
+    path('api/train/<int:job_id>/cancel/', views.TrainingJobCancelAPIView.as_view(), name='training_job_cancel'),
     path('api/predict/temperature/', views.TemperaturePredictionAPIView.as_view(), name='temperature_prediction'),
     path('api/optimize/fan/', csrf_exempt(views.FanOptimizationAPIView.as_view()), name='fan_optimization'),
     path('api/detect/anomaly/', views.AnomalyDetectionAPIView.as_view(), name='anomaly_detection'),
+    path('api/optimize/fan/batch/', csrf_exempt(views.FanOptimizationBatchAPIView.as_view()), name='fan_optimization_batch'),
+    path('api/detect/anomaly/batch/', views.AnomalyDetectionBatchAPIView.as_view(), name='anomaly_detection_batch'),
     path('api/models/status/', views.ModelStatusAPIView.as_view(), name='model_status'),
+    path('api/models/shadow/report/', views.ShadowReportAPIView.as_view(), name='shadow_report'),
+    path('api/ready/', views.ReadinessAPIView.as_view(), name='readiness'),
+    
+    # Versões assíncronas (ASGI) - ver views_async.py
+    path('api/async/predict/temperature/', views_async.temperature_prediction, name='temperature_prediction_async'),
+    path('api/async/detect/anomaly/', views_async.anomaly_detection, name='anomaly_detection_async'),
+    path('api/async/models/status/', views_async.model_status, name='model_status_async'),
     path('api/models/<int:model_id>/metrics/', views.ModelMetricsAPIView.as_view(), name='model_metrics'),
 ]
\ No newline at end of file
@@ -0,0 +1,334 @@
+# backend/ml_models/verification.py
+
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import MLPrediction, ModelPerformanceMetric
+from .snapshots import snapshot_store
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600.0
+METRIC_NAMES = ('mae', 'rmse', 'samples')
+# Maior horizonte gravado (as APIs de previsão limitam hours_ahead a 24)
+MAX_HORIZON_HOURS = 24
+
+
+def load_readings(start, end):
+    """
+    Leituras do período como arrays ordenados (segundos desde epoch, temperatura)
+
+    Vêm do snapshot colunar (ver snapshots.py), sem uma tupla por leitura:
+    os arrays servem de índice para o join as-of de todas as predições.
+    """
+    columns = snapshot_store.load('readings', start, end)
+    return columns['timestamp'] / 1e6, np.asarray(columns['temperature'])
+
+
+def asof_join(reading_times, reading_values, targets, tolerance):
+    """
+    Temperatura da última leitura em ou antes de cada instante alvo
+
+    Args:
+        reading_times: Instantes das leituras (ordenados, segundos)
+        targets: Instantes previstos (segundos)
+        tolerance: Distância máxima em segundos entre o alvo e a leitura
+
+    Returns:
+        ndarray: Temperatura real por alvo (NaN sem leitura dentro da tolerância)
+    """
+    actual = np.full(len(targets), np.nan)
+    if not len(reading_times) or not len(targets):
+        return actual
+
+    positions = np.searchsorted(reading_times, targets, side='right') - 1
+    valid = positions >= 0
+    positions = np.where(valid, positions, 0)
+    valid &= (targets - reading_times[positions]) <= tolerance
+    actual[valid] = reading_values[positions[valid]]
+    return actual
+
+
+def expand_forecasts(predictions):
+    """
+    Achata as predições de temperatura em pontos (predição, horizonte, valor)
+
+    Formatos gravados pela aplicação:
+        {'predicted_temperature': x}              -> próxima hora (integrations)
+        {'forecast': [{'hour_offset', 'predicted_temperature'}, ...]}
+        {'temperatures': [x1, x2, ...]}           -> API de previsão
+
+    Returns:
+        tuple: (índice da predição, horizonte em horas, valor previsto);
+               predições em formato desconhecido não geram pontos
+    """
+    indices, horizons, values = [], [], []
+    for i, prediction in enumerate(predictions):
+        if not isinstance(prediction, dict):
+            continue
+        if 'predicted_temperature' in prediction:
+            points = [(1, prediction['predicted_temperature'])]
+        elif 'forecast' in prediction:
+            points = [
+                (item.get('hour_offset', offset + 1), item.get('predicted_temperature'))
+                for offset, item in enumerate(prediction['forecast'])
+            ]
+        elif 'temperatures' in prediction:
+            points = [(offset + 1, value) for offset, value in enumerate(prediction['temperatures'])]
+        else:
+            continue
+
+        for horizon, value in points:
+            if value is None:
+                continue
+            indices.append(i)
+            horizons.append(horizon)
+            values.append(value)
+
+    return (
+        np.asarray(indices, dtype=np.intp),
+        np.asarray(horizons, dtype=np.float64),
+        np.asarray(values, dtype=np.float64),
+    )
+
+
+def _build_actual_value(prediction, actual):
+    """actual_value no mesmo formato da predição (None sem leitura correspondente)"""
+    values = [None if np.isnan(value) else round(float(value), 2) for value in actual]
+    if 'predicted_temperature' in prediction:
+        return {'temperature': values[0] if values else None}
+    return {'temperatures': values}
+
+
+def _point_bounds(indices, n_predictions):
+    """
+    Fronteiras dos pontos de cada predição
+
+    expand_forecasts gera os pontos na ordem das predições, então os pontos
+    da predição i ficam em [bounds[i], bounds[i + 1]).
+    """
+    return np.concatenate([[0], np.cumsum(np.bincount(indices, minlength=n_predictions))])
+
+
+def _save_actual_values(updates):
+    """
+    Grava actual_value e is_verified=True para pares (id, actual_value)
+
+    Um UPDATE parametrizado executado com executemany: o bulk_update do ORM
+    monta um CASE WHEN por registro e, com centenas de milhares de
+    predições, passa mais tempo construindo expressões que no banco.
+    """
+    meta = MLPrediction._meta
+    actual_field = meta.get_field('actual_value')
+    quote = connection.ops.quote_name
+    sql = (
+        f"UPDATE {quote(meta.db_table)} SET {quote(actual_field.column)} = %s, "
+        f"{quote(meta.get_field('is_verified').column)} = %s WHERE {quote(meta.pk.column)} = %s"
+    )
+    params = [
+        (actual_field.get_db_prep_save(actual_value, connection), True, pk)
+        for pk, actual_value in updates
+    ]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def _iterate_pages(queryset, fields, batch_size):
+    """Percorre o queryset por faixas de id (sem OFFSET e sem cursor aberto)"""
+    last_id = 0
+    while True:
+        page = list(queryset.filter(id__gt=last_id).order_by('id').values_list('id', *fields)[:batch_size])
+        if not page:
+            return
+        yield page
+        last_id = page[-1][0]
+
+
+def verify_temperature_predictions(since, tolerance_minutes=30, batch_size=5000):
+    """
+    Preenche actual_value/is_verified das predições de temperatura pendentes
+
+    Cada página de predições é expandida em pontos (um por horizonte),
+    cruzada com as leituras por np.searchsorted e gravada com um único
+    UPDATE em lote. Uma predição só é verificada quando todos os seus
+    horizontes já passaram da última leitura disponível; horizontes sem
+    leitura dentro da tolerância ficam com None. Predições em formato
+    desconhecido (sem pontos) são marcadas como verificadas com
+    actual_value None, para não serem relidas a cada execução.
+
+    Returns:
+        dict: Contadores (scanned, verified, pending, unrecognized,
+              matched_points, missing_points)
+    """
+    stats = {
+        'scanned': 0, 'verified': 0, 'pending': 0, 'unrecognized': 0,
+        'matched_points': 0, 'missing_points': 0,
+    }
+    tolerance = tolerance_minutes * 60.0
+
+    queryset = MLPrediction.objects.filter(
+        model__model_type='temperature_prediction',
+        is_verified=False,
+        created_at__gte=since
+    )
+    first = queryset.order_by('created_at').values_list('created_at', flat=True).first()
+    if first is None:
+        return stats
+
+    reading_times, reading_values = load_readings(first - timedelta(minutes=tolerance_minutes), timezone.now())
+    if not len(reading_times):
+        stats['pending'] = queryset.count()
+        return stats
+    cutoff = reading_times[-1]
+
+    for page in _iterate_pages(queryset, ('created_at', 'prediction'), batch_size):
+        ids = [row[0] for row in page]
+        created = np.fromiter((row[1].timestamp() for row in page), dtype=np.float64, count=len(page))
+        predictions = [row[2] for row in page]
+
+        indices, horizons, _ = expand_forecasts(predictions)
+        targets = created[indices] + horizons * HOUR
+        actual = asof_join(reading_times, reading_values, targets, tolerance)
+
+        # Predição pronta quando o último horizonte já passou
+        last_target = np.full(len(page), np.inf)
+        last_target[indices] = -np.inf
+        np.maximum.at(last_target, indices, targets)
+        ready = last_target <= cutoff
+
+        bounds = _point_bounds(indices, len(page))
+        unrecognized = bounds[1:] == bounds[:-1]
+        updates = []
+        for i in np.flatnonzero(ready | unrecognized):
+            if unrecognized[i]:
+                updates.append((ids[i], None))
+                stats['unrecognized'] += 1
+                continue
+            points = actual[bounds[i]:bounds[i + 1]]
+            updates.append((ids[i], _build_actual_value(predictions[i], points)))
+            matched = int(np.count_nonzero(~np.isnan(points)))
+            stats['matched_points'] += matched
+            stats['missing_points'] += len(points) - matched
+
+        if updates:
+            _save_actual_values(updates)
+
+        stats['scanned'] += len(page)
+        stats['verified'] += len(updates)
+        stats['pending'] += len(page) - len(updates)
+
+    return stats
+
+
+def _align(moment, window_seconds):
+    epoch = np.floor(moment.timestamp() / window_seconds) * window_seconds
+    return datetime.fromtimestamp(epoch, tz=dt_timezone.utc)
+
+
+def compute_performance_metrics(since, window_hours=24, batch_size=5000):
+    """
+    Recalcula MAE/RMSE por modelo e janela a partir das predições verificadas
+
+    Os erros das predições verificadas cujo instante previsto cai a partir
+    de `since` são agrupados pela janela desse instante (janelas fixas de
+    window_hours, alinhadas ao epoch) com np.bincount. As predições são lidas
+    desde MAX_HORIZON_HOURS antes do início da primeira janela, para que ela
+    receba também as feitas pouco antes; assim toda janela do período é
+    recalculada por inteiro e as métricas delas são substituídas em uma
+    transação (reexecutar o comando não duplica registros).
+
+    Returns:
+        list: Um dicionário por (modelo, janela) com mae, rmse e samples
+    """
+    window = window_hours * HOUR
+    origin = _align(since, window)
+    origin_s = origin.timestamp()
+
+    queryset = MLPrediction.objects.filter(
+        model__model_type='temperature_prediction',
+        is_verified=True,
+        created_at__gte=origin - timedelta(hours=MAX_HORIZON_HOURS)
+    )
+
+    model_ids, buckets, errors = [], [], []
+    for page in _iterate_pages(queryset, ('model_id', 'created_at', 'prediction', 'actual_value'), batch_size):
+        created = np.fromiter((row[2].timestamp() for row in page), dtype=np.float64, count=len(page))
+        page_models = np.fromiter((row[1] for row in page), dtype=np.int64, count=len(page))
+
+        indices, horizons, predicted = expand_forecasts([row[3] for row in page])
+        bounds = _point_bounds(indices, len(page))
+        actual = np.full(len(predicted), np.nan)
+        for i, row in enumerate(page):
+            points = _actual_points(row[4])
+            # Ignora actual_value que não corresponde à predição (ex.: editado no admin)
+            if len(points) == bounds[i + 1] - bounds[i]:
+                actual[bounds[i]:bounds[i + 1]] = points
+
+        targets = created[indices] + horizons * HOUR
+        # Alvos antes da primeira janela pertencem a janelas não recalculadas
+        valid = ~np.isnan(actual) & (targets >= origin_s) & (horizons <= MAX_HORIZON_HOURS)
+        model_ids.append(page_models[indices][valid])
+        buckets.append(np.floor((targets[valid] - origin_s) / window).astype(np.int64))
+        errors.append(predicted[valid] - actual[valid])
+
+    if not model_ids:
+        return []
+
+    model_ids = np.concatenate(model_ids)
+    buckets = np.concatenate(buckets)
+    errors = np.concatenate(errors)
+    if not len(errors):
+        return []
+
+    keys, groups = np.unique(np.stack([model_ids, buckets], axis=1), axis=0, return_inverse=True)
+    groups = groups.ravel()
+    counts = np.bincount(groups)
+    mae = np.bincount(groups, weights=np.abs(errors)) / counts
+    rmse = np.sqrt(np.bincount(groups, weights=errors ** 2) / counts)
+
+    results = []
+    records = []
+    for (model_id, bucket), count, mae_value, rmse_value in zip(keys, counts, mae, rmse):
+        start = origin + timedelta(seconds=float(bucket) * window)
+        end = start + timedelta(seconds=window)
+        results.append({
+            'model_id': int(model_id),
+            'window_start': start,
+            'window_end': end,
+            'mae': float(mae_value),
+            'rmse': float(rmse_value),
+            'samples': int(count),
+        })
+        for name, value in (('mae', mae_value), ('rmse', rmse_value), ('samples', count)):
+            records.append(ModelPerformanceMetric(
+                model_id=int(model_id),
+                metric_name=name,
+                metric_value=float(value),
+                evaluation_start=start,
+                evaluation_end=end
+            ))
+
+    with transaction.atomic():
+        ModelPerformanceMetric.objects.filter(
+            model_id__in={item['model_id'] for item in results},
+            metric_name__in=METRIC_NAMES,
+            evaluation_start__gte=origin
+        ).delete()
+        ModelPerformanceMetric.objects.bulk_create(records, batch_size=1000)
+
+    return results
+
+
+def _actual_points(actual_value):
+    """Valores reais na ordem dos horizontes (NaN onde não houve leitura)"""
+    if not isinstance(actual_value, dict):
+        return np.empty(0)
+    if 'temperature' in actual_value:
+        values = [actual_value['temperature']]
+    else:
+        values = actual_value.get('temperatures') or []
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
@@ -3,47 +3,81 @@
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from django.conf import settings
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.utils import timezone
-from django.conf import settings
+from django.urls import reverse
 from datetime import datetime, timedelta
 import json
+import time
+
+import numpy as np
 
 from .models import MLModel, MLPrediction, TrainingSession
+from .prediction_sink import prediction_sink
+from .persistence_policy import persistence_policy
+from .online_stats import device_stats
+from .forecast_cache import forecast_cache
+from .jobs import ACTIVE_STATUSES, get_active_job, job_status, jobs_queryset, request_cancel, submit_training
+from .deadline import inference_deadline
+from .warmup import warmup_state
+from .shadow import shadow_evaluator, build_shadow_report
+from .serializers import AnomalyDetectionBatchRequestSerializer, FanOptimizationBatchRequestSerializer
+from .utils import serialize_ml_output
 from .ml_algorithms import (
     TemperaturePredictionModel, 
     FanOptimizationModel, 
-    AnomalyDetectionModel,
-    train_all_models
+    AnomalyDetectionModel
 )
 from sensors.models import Reading
 
 
 class TrainModelsAPIView(APIView):
     """
-    Endpoint para treinar todos os modelos de ML
+    Endpoint para treinar os modelos de ML
+    
+    O treinamento não roda na requisição: o job é enfileirado (ver jobs.py)
+    e executado por run_training_worker. A resposta traz o id do job para
+    acompanhar o progresso em TrainingJobStatusAPIView.
     """
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
-        training_session = None
         try:
-            # Iniciar sessão de treinamento
-            training_session = TrainingSession.objects.create(
-                model=None,  # Será atualizado depois
-                data_start_date=timezone.now() - timedelta(days=30),
-                data_end_date=timezone.now(),
-                status='running',
-                training_samples=0
-            )
-            
+            days_back = int(request.data.get('days_back', 30))
+            if days_back <= 0:
+                raise ValueError("days_back deve ser positivo")
+            model_types = request.data.get('model_types') or None
+            if isinstance(model_types, str):
+                model_types = [model_types]
+            if model_types is not None and not isinstance(model_types, (list, tuple)):
+                raise ValueError("model_types deve ser uma lista de tipos de modelo")
+            invalid = set(model_types or []) - {choice for choice, _ in MLModel.MODEL_TYPES}
+            if invalid:
+                raise ValueError(f"Tipos de modelo inválidos: {', '.join(sorted(map(str, invalid)))}")
+            activate = request.data.get('activate', False)
+            if isinstance(activate, str) and activate.lower() in ('1', 'true', 'yes', '0', 'false', 'no'):
+                activate = activate.lower() in ('1', 'true', 'yes')
+            if not isinstance(activate, bool):
+                raise ValueError("activate deve ser true ou false")
+        except (TypeError, ValueError) as e:
+            return Response({
+                'message': f"Parâmetros de treinamento inválidos: {str(e)}",
+                'error': True,
+                'details': {
+                    'type': 'invalid_request',
+                    'description': str(e)
+                }
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
             # Validar dados disponíveis
             from sensors.models import Reading, FanState
             end_date = timezone.now()
-            start_date = end_date - timedelta(days=30)
+            start_date = end_date - timedelta(days=days_back)
             
             readings_count = Reading.objects.filter(
                 timestamp__gte=start_date,
@@ -55,77 +89,95 @@ class TrainModelsAPIView(APIView):
                 timestamp__lte=end_date
             ).count()
             
-            training_session.training_metrics = {
-                'data_validation': {
-                    'readings_available': readings_count,
-                    'fan_states_available': fan_states_count,
-                    'start_date': start_date.isoformat(),
-                    'end_date': end_date.isoformat()
-                }
+            data_summary = {
+                'readings_available': readings_count,
+                'fan_states_available': fan_states_count,
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat()
             }
-            training_session.save()
             
             if readings_count < 10:
-                raise ValueError(f"Dados insuficientes para treinamento. Encontrados apenas {readings_count} registros nos últimos 30 dias.")
+                description = f"Encontrados apenas {readings_count} registros nos últimos {days_back} dias."
+                return Response({
+                    'message': f"Dados insuficientes para treinamento: {description}",
+                    'error': True,
+                    'details': {
+                        'type': 'insufficient_data',
+                        'description': description,
+                        'data_summary': data_summary
+                    }
+                }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Treinar modelos
-            results = train_all_models()
+            # Um job por vez: devolve o que já está na fila ou executando
+            active_job = get_active_job()
+            if active_job is not None:
+                return Response({
+                    'message': 'Já existe um treinamento em andamento',
+                    'error': True,
+                    'details': {
+                        'type': 'training_in_progress',
+                        'training_session_id': active_job.id,
+                        'status_url': reverse('ml_models:training_job_status', args=[active_job.id])
+                    }
+                }, status=status.HTTP_409_CONFLICT)
             
-            # Atualizar sessão
-            training_session.status = 'completed'
-            training_session.completed_at = timezone.now()
-            training_session.training_metrics.update(results)
-            training_session.save()
+            job = submit_training(model_types, days_back=days_back, activate=activate)
+            job.training_metrics = {'data_validation': data_summary}
+            job.save(update_fields=['training_metrics'])
             
             return Response({
-                'message': 'Modelos treinados com sucesso',
+                'message': 'Treinamento enfileirado',
                 'error': False,
                 'details': {
-                    'results': results,
-                    'data_summary': training_session.training_metrics['data_validation'],
-                    'training_session_id': training_session.id
-                }
-            }, status=status.HTTP_200_OK)
-            
-        except ValueError as e:
-            error_message = f"Dados insuficientes para treinamento: {str(e)}"
-            if training_session:
-                training_session.status = 'failed'
-                training_session.error_message = error_message
-                training_session.save()
-            
-            return Response({
-                'message': error_message,
-                'error': True,
-                'details': {
-                    'type': 'insufficient_data',
-                    'description': str(e),
-                    'data_summary': training_session.training_metrics.get('data_validation') if training_session else None
+                    'training_session_id': job.id,
+                    'status_url': reverse('ml_models:training_job_status', args=[job.id]),
+                    'data_summary': data_summary
                 }
-            }, status=status.HTTP_400_BAD_REQUEST)
+            }, status=status.HTTP_202_ACCEPTED)
             
         except Exception as e:
             import traceback
             error_details = traceback.format_exc()
-            error_message = f"Erro durante o treinamento: {str(e)}"
-            
-            if training_session:
-                training_session.status = 'failed'
-                training_session.error_message = f"{error_message}\n\nStack trace:\n{error_details}"
-                training_session.save()
-            
             return Response({
-                'message': error_message,
+                'message': f"Erro ao enfileirar o treinamento: {str(e)}",
                 'error': True,
                 'details': {
                     'type': 'training_error',
                     'description': str(e),
-                    'stack_trace': error_details if settings.DEBUG else None,
-                    'data_summary': training_session.training_metrics.get('data_validation') if training_session else None
+                    'stack_trace': error_details if settings.DEBUG else None
                 }
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class TrainingJobStatusAPIView(APIView):
+    """
+    Progresso de um job de treinamento (consulta leve, para polling)
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, job_id):
+        job = job_status(job_id)
+        if job is None:
+            return Response({'error': 'Job de treinamento não encontrado'}, status=status.HTTP_404_NOT_FOUND)
+        job['finished'] = job['status'] not in ACTIVE_STATUSES
+        return Response(job)
+
+
+class TrainingJobCancelAPIView(APIView):
+    """
+    Cancela um job de treinamento na fila ou em execução
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request, job_id):
+        job = jobs_queryset().filter(id=job_id).first()
+        if job is None:
+            return Response({'error': 'Job de treinamento não encontrado'}, status=status.HTTP_404_NOT_FOUND)
+        if not request_cancel(job):
+            return Response({'error': 'O job já terminou', 'status': job.status}, status=status.HTTP_409_CONFLICT)
+        return Response(job_status(job_id), status=status.HTTP_202_ACCEPTED)
+
+
 class TemperaturePredictionAPIView(APIView):
     """
     Endpoint para predição de temperatura
@@ -135,6 +187,10 @@ class TemperaturePredictionAPIView(APIView):
     def get(self, request):
         try:
             hours_ahead = int(request.GET.get('hours_ahead', 1))
+            if hours_ahead < 1:
+                return Response({
+                    'error': 'hours_ahead deve ser maior que zero'
+                }, status=status.HTTP_400_BAD_REQUEST)
             if hours_ahead > 24:
                 hours_ahead = 24
             
@@ -158,14 +214,15 @@ class TemperaturePredictionAPIView(APIView):
                     'error': 'Erro ao carregar modelo'
                 }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
-            # Fazer predição
-            predictions = temp_model.predict(hours_ahead)
+            # Fazer predição (memorizada até a próxima leitura)
+            predictions = forecast_cache.get_forecast(ml_model, hours_ahead, temp_model.predict)
             
             # Salvar predição
-            prediction_record = MLPrediction.objects.create(
+            prediction_sink.record(
                 model=ml_model,
                 input_data={'hours_ahead': hours_ahead},
-                prediction={'temperatures': predictions}
+                prediction={'temperatures': predictions},
+                key='forecast_api'
             )
             
             # Preparar timestamps para cada predição
@@ -245,18 +302,21 @@ class FanOptimizationAPIView(APIView):
                 optimal_duration = 0
             
             # Salvar predição
-            MLPrediction.objects.create(
+            prediction_sink.record(
                 model=ml_model,
                 input_data={
                     'current_temperature': current_temp,
                     'current_hour': current_hour,
                     'current_day': current_day
                 },
+                # Mesma chave das demais predições de ventilador (score da
+                # política de persistência e leitura do dashboard)
                 prediction={
                     'should_turn_on': bool(should_turn_on),
                     'confidence': float(confidence),
-                    'optimal_duration_minutes': optimal_duration
-                }
+                    'recommended_duration_minutes': optimal_duration
+                },
+                key='api'
             )
             
             return Response({
@@ -309,10 +369,16 @@ class AnomalyDetectionAPIView(APIView):
                 anomaly_model.scaler = loaded_model['scaler']
                 anomaly_model.is_fitted = True
                 
-                result = anomaly_model.detect_anomaly(temperature, hour)
+                features = device_stats.peek(temperature)
+                result = anomaly_model.detect_anomaly(
+                    temperature,
+                    hour,
+                    temp_diff=features['temp_diff'],
+                    temp_deviation=features['temp_deviation']
+                )
                 
                 # Salvar predição
-                MLPrediction.objects.create(
+                prediction_sink.record(
                     model=ml_model,
                     input_data={
                         'temperature': temperature,
@@ -340,6 +406,185 @@ class AnomalyDetectionAPIView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _persist_batch(ml_model, columns, results):
+    """
+    Grava as predições de um lote com bulk_create
+    
+    Args:
+        columns: Dicionário campo -> array NumPy com as entradas do lote
+        results: Resultados na mesma ordem das entradas
+    """
+    fields = [field for field in columns if field != 'count']
+    predictions = [
+        MLPrediction(
+            model=ml_model,
+            input_data={field: float(columns[field][i]) for field in fields},
+            prediction=serialize_ml_output(result),
+            confidence=result.get('confidence')
+        )
+        for i, result in enumerate(results)
+    ]
+    MLPrediction.objects.bulk_create(predictions, batch_size=500)
+    return len(predictions)
+
+
+class AnomalyDetectionBatchAPIView(APIView):
+    """
+    Endpoint para detecção de anomalias em lote
+    
+    Recebe {"inputs": [{"temperature", "hour", "temp_diff", "temp_deviation"}, ...],
+    "persist": false} e avalia todas as entradas em uma única chamada do
+    modelo. Os resultados seguem a ordem das entradas.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        serializer = AnomalyDetectionBatchRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'error': 'Entrada inválida',
+                'details': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        columns = serializer.validated_data['inputs']
+        persist = serializer.validated_data['persist']
+        
+        try:
+            start = time.perf_counter()
+            
+            # Buscar modelo ativo
+            ml_model = MLModel.objects.filter(
+                model_type='anomaly_detection',
+                is_active=True
+            ).first()
+            
+            if not ml_model:
+                # Fallback para regra simples
+                temperatures = columns['temperature']
+                is_anomaly = (temperatures < 0) | (temperatures > 50)
+                return Response({
+                    'results': [
+                        {
+                            'is_anomaly': bool(flag),
+                            'confidence': 0.5,
+                            'anomaly_score': 0,
+                            'reason': 'Regra simples (modelo não disponível)'
+                        }
+                        for flag in is_anomaly
+                    ],
+                    'count': columns['count'],
+                    'method': 'rule_based',
+                    'persisted': 0
+                }, status=status.HTTP_200_OK)
+            
+            loaded_model = ml_model.load_model()
+            if not loaded_model:
+                return Response({
+                    'error': 'Erro ao carregar modelo de anomalias'
+                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            
+            # Usar modelo ML
+            anomaly_model = AnomalyDetectionModel()
+            anomaly_model.model = loaded_model
+            anomaly_model.is_fitted = True
+            
+            results = anomaly_model.detect_anomalies(
+                columns['temperature'],
+                columns['hour'],
+                columns['temp_diff'],
+                columns['temp_deviation']
+            )
+            persisted = _persist_batch(ml_model, columns, results) if persist else 0
+            
+            return Response({
+                'results': results,
+                'count': columns['count'],
+                'method': 'ml_model',
+                'model_info': {
+                    'name': ml_model.name,
+                    'version': ml_model.version
+                },
+                'persisted': persisted,
+                'elapsed_ms': round((time.perf_counter() - start) * 1000, 2)
+            }, status=status.HTTP_200_OK)
+            
+        except Exception as e:
+            return Response({
+                'error': 'Erro na detecção de anomalias em lote',
+                'details': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class FanOptimizationBatchAPIView(APIView):
+    """
+    Endpoint para otimização do ventilador em lote
+    
+    Recebe {"inputs": [{"current_temperature", "current_hour", "day_of_week"}, ...],
+    "persist": false}; todas as combinações entrada x duração são avaliadas
+    em uma única chamada do modelo. Os resultados seguem a ordem das entradas.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        serializer = FanOptimizationBatchRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'error': 'Entrada inválida',
+                'details': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        columns = serializer.validated_data['inputs']
+        persist = serializer.validated_data['persist']
+        
+        try:
+            start = time.perf_counter()
+            temperatures = columns['current_temperature']
+            
+            # Buscar modelo ativo
+            ml_model = MLModel.objects.filter(
+                model_type='fan_optimization',
+                is_active=True
+            ).first()
+            
+            if not ml_model:
+                # Fallback para regra simples
+                durations = np.where(temperatures > 25.0, np.maximum(5, (temperatures - 25.0) * 10), 0).astype(int)
+                method = 'rule_based'
+            else:
+                # Usar modelo ML
+                fan_model = FanOptimizationModel()
+                fan_model.model = ml_model.load_model()
+                durations = fan_model.optimize_fan_durations(
+                    temperatures,
+                    columns['current_hour'],
+                    columns['day_of_week']
+                )
+                method = 'ml_model'
+            
+            results = [
+                {
+                    'recommended_duration_minutes': int(duration),
+                    'should_turn_on': bool(duration > 0)
+                }
+                for duration in durations
+            ]
+            persisted = _persist_batch(ml_model, columns, results) if persist and ml_model else 0
+            
+            return Response({
+                'results': results,
+                'count': columns['count'],
+                'method': method,
+                'persisted': persisted,
+                'elapsed_ms': round((time.perf_counter() - start) * 1000, 2)
+            }, status=status.HTTP_200_OK)
+            
+        except Exception as e:
+            return Response({
+                'error': 'Erro na otimização em lote',
+                'details': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class ModelStatusAPIView(APIView):
     """
     Endpoint para verificar status dos modelos
@@ -377,10 +622,71 @@ class ModelStatusAPIView(APIView):
             'active_models': model_data,
             'total_active_models': len(model_data),
             'recent_readings_24h': recent_readings,
+            'prediction_sink': prediction_sink.get_stats(),
+            'prediction_persistence': persistence_policy.get_stats(),
+            'forecast_cache': forecast_cache.get_stats(),
+            'inference_deadline': inference_deadline.get_stats(),
+            'shadow_evaluation': shadow_evaluator.get_stats(),
             'system_status': 'operational' if model_data else 'no_models'
         }, status=status.HTTP_200_OK)
 
 
+class ShadowReportAPIView(APIView):
+    """
+    Endpoint com a comparação entre os candidatos em sombra e os modelos ativos
+    
+    Parâmetros: days (padrão 7) e model_type (opcional)
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        try:
+            days = int(request.GET.get('days', 7))
+        except ValueError:
+            return Response({
+                'error': 'days deve ser um número inteiro'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        model_type = request.GET.get('model_type')
+        candidates = MLModel.objects.filter(is_shadow=True)
+        
+        return Response({
+            'candidates': [
+                {'id': m.id, 'name': m.name, 'type': m.model_type, 'version': m.version}
+                for m in candidates
+            ],
+            'days': days,
+            'report': build_shadow_report(model_type=model_type, days=days),
+            'stats': shadow_evaluator.get_stats()
+        }, status=status.HTTP_200_OK)
+
+
+class ReadinessAPIView(APIView):
+    """
+    Endpoint de readiness do worker
+    
+    Retorna 200 quando os modelos ativos foram carregados e passaram por uma
+    inferência sintética neste processo e 503 enquanto estão frios. Se algum
+    modelo falhou, responde 200 com status 'degraded' e o erro em models
+    (as regras de fallback atendem esse tipo) e o warmup é refeito com
+    espera exponencial. Se ninguém iniciou o warmup (ex.: runserver), a
+    primeira consulta o inicia em segundo plano; as consultas seguintes
+    disparam as novas tentativas.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    
+    def get(self, request):
+        warmup_state.start()
+        state = warmup_state.as_dict()
+        
+        ready = state['status'] in warmup_state.READY_STATUSES
+        return Response(
+            state,
+            status=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+
 class ModelMetricsAPIView(APIView):
     """
     Endpoint para métricas detalhadas dos modelos
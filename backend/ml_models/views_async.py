@@ -0,0 +1,299 @@
+# backend/ml_models/views_async.py
+
+import json
+import logging
+from datetime import datetime, timedelta
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.http import JsonResponse
+from django.utils import timezone
+from rest_framework.authentication import CSRFCheck
+from rest_framework.authtoken.models import Token
+
+from .models import MLModel
+from .prediction_sink import prediction_sink
+from .persistence_policy import persistence_policy
+from .online_stats import device_stats
+from .forecast_cache import forecast_cache
+from .deadline import inference_deadline
+from .shadow import shadow_evaluator
+from .ml_algorithms import TemperaturePredictionModel, AnomalyDetectionModel
+from sensors.models import Reading
+
+logger = logging.getLogger(__name__)
+
+
+async def _authenticate(request):
+    """
+    Autenticação equivalente à do REST_FRAMEWORK (Token e sessão) com ORM assíncrono
+
+    Returns:
+        tuple: (usuário ou None, True se autenticado pela sessão)
+    """
+    header = request.headers.get('Authorization', '').split()
+    if header and header[0].lower() == 'token':
+        if len(header) != 2:
+            return None, False
+        token = await Token.objects.select_related('user').filter(key=header[1]).afirst()
+        if token is None or not token.user.is_active:
+            return None, False
+        return token.user, False
+
+    user = await request.auser()
+    if user.is_authenticated:
+        return user, True
+    return None, False
+
+
+def _csrf_failure(request):
+    """Mesma verificação de CSRF que o SessionAuthentication do DRF aplica"""
+    check = CSRFCheck(lambda req: None)
+    check.process_request(request)
+    return check.process_view(request, None, (), {})
+
+
+def async_api_view(methods):
+    """
+    Decorador das views assíncronas: método HTTP, autenticação e CSRF
+
+    Reproduz o comportamento de APIView com IsAuthenticated: token ou
+    sessão (com CSRF apenas na sessão) e respostas 401/403/405 em JSON.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return JsonResponse(
+                    {'detail': f'Método "{request.method}" não é permitido.'},
+                    status=405
+                )
+
+            user, session = await _authenticate(request)
+            if user is None:
+                response = JsonResponse(
+                    {'detail': 'As credenciais de autenticação não foram fornecidas.'},
+                    status=401
+                )
+                response['WWW-Authenticate'] = 'Token'
+                return response
+
+            if session and request.method not in ('GET', 'HEAD', 'OPTIONS') and _csrf_failure(request):
+                return JsonResponse({'detail': 'CSRF Failed'}, status=403)
+
+            request.user = user
+            return await view(request, *args, **kwargs)
+
+        # A verificação de CSRF é feita acima, como no DRF
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
+
+
+def _request_data(request):
+    if request.content_type == 'application/json':
+        return json.loads(request.body or b'{}')
+    return request.POST
+
+
+def _forecast(ml_model, hours_ahead):
+    """Previsão de temperatura (executada no pool de inferência)"""
+    temp_model = TemperaturePredictionModel()
+    temp_model.model = ml_model.load_model()
+    if temp_model.model is None:
+        raise ValueError("Erro ao carregar modelo")
+
+    predictions = forecast_cache.get_forecast(ml_model, hours_ahead, temp_model.predict)
+    prediction_sink.record(
+        model=ml_model,
+        input_data={'hours_ahead': hours_ahead},
+        prediction={'temperatures': predictions},
+        key='forecast_api'
+    )
+    return predictions
+
+
+def _detect_anomaly(ml_model, temperature, hour):
+    """Detecção de anomalia (executada no pool de inferência)"""
+    loaded_model = ml_model.load_model()
+    if not loaded_model:
+        raise ValueError("Erro ao carregar modelo de anomalias")
+
+    anomaly_model = AnomalyDetectionModel()
+    anomaly_model.model = loaded_model
+    anomaly_model.is_fitted = True
+
+    features = device_stats.peek(temperature)
+    result = anomaly_model.detect_anomaly(
+        temperature,
+        hour,
+        temp_diff=features['temp_diff'],
+        temp_deviation=features['temp_deviation']
+    )
+
+    prediction_sink.record(
+        model=ml_model,
+        input_data={
+            'temperature': temperature,
+            'hour': hour
+        },
+        prediction=result,
+        confidence=result['confidence']
+    )
+    return result
+
+
+@async_api_view(['GET'])
+async def temperature_prediction(request):
+    """
+    Versão assíncrona de TemperaturePredictionAPIView
+
+    O modelo ativo é buscado com o ORM assíncrono e a previsão roda no
+    pool de inferência (deadline.py), sem ocupar o event loop.
+    """
+    try:
+        hours_ahead = min(int(request.GET.get('hours_ahead', 1)), 24)
+    except ValueError:
+        return JsonResponse({'error': 'hours_ahead deve ser um número inteiro'}, status=400)
+    if hours_ahead < 1:
+        return JsonResponse({'error': 'hours_ahead deve ser maior que zero'}, status=400)
+
+    ml_model = await MLModel.objects.filter(
+        model_type='temperature_prediction',
+        is_active=True
+    ).afirst()
+
+    if not ml_model:
+        return JsonResponse({
+            'error': 'Nenhum modelo de predição de temperatura ativo'
+        }, status=404)
+
+    try:
+        # Sem orçamento: a previsão não tem resposta por regras equivalente
+        predictions = await inference_deadline.arun(
+            'temperature_forecast', _forecast, ml_model, hours_ahead, budget_ms=0
+        )
+    except Exception as e:
+        return JsonResponse({
+            'error': 'Erro na predição',
+            'details': str(e)
+        }, status=500)
+
+    now = timezone.now()
+    prediction_data = []
+    for i, temp in enumerate(predictions):
+        prediction_time = now + timedelta(hours=i+1)
+        prediction_data.append({
+            'hour': prediction_time.strftime('%Y-%m-%d %H:%M'),
+            'predicted_temperature': round(temp, 2)
+        })
+
+    return JsonResponse({
+        'predictions': prediction_data,
+        'model_info': {
+            'name': ml_model.name,
+            'version': ml_model.version,
+            'accuracy': ml_model.r2_score
+        }
+    })
+
+
+@async_api_view(['POST'])
+async def anomaly_detection(request):
+    """
+    Versão assíncrona de AnomalyDetectionAPIView
+
+    A inferência roda no pool com o orçamento de 'anomaly_detection'; se o
+    prazo estourar, a resposta vem da regra simples.
+    """
+    try:
+        data = _request_data(request)
+        temperature = float(data.get('temperature'))
+        hour = int(data.get('hour', datetime.now().hour))
+    except (TypeError, ValueError) as e:
+        return JsonResponse({
+            'error': 'Erro na detecção de anomalias',
+            'details': str(e)
+        }, status=400)
+
+    ml_model = await MLModel.objects.filter(
+        model_type='anomaly_detection',
+        is_active=True
+    ).afirst()
+
+    if not ml_model:
+        return JsonResponse({
+            'is_anomaly': temperature < 0 or temperature > 50,
+            'confidence': 0.5,
+            'reason': 'Regra simples (modelo não disponível)',
+            'anomaly_score': 0
+        })
+
+    def fallback():
+        return {
+            'is_anomaly': temperature < 0 or temperature > 50,
+            'confidence': 0.5,
+            'anomaly_score': 0,
+            'reason': 'deadline_fallback'
+        }
+
+    result = await inference_deadline.arun(
+        'anomaly_detection', _detect_anomaly, ml_model, temperature, hour, fallback=fallback
+    )
+
+    return JsonResponse({
+        'is_anomaly': result['is_anomaly'],
+        'confidence': result['confidence'],
+        'anomaly_score': result['anomaly_score'],
+        'reason': (
+            'Regra simples (prazo de inferência excedido)'
+            if result.get('reason') == 'deadline_fallback'
+            else f'Análise ML (modelo {ml_model.name})'
+        )
+    })
+
+
+@async_api_view(['GET'])
+async def model_status(request):
+    """
+    Versão assíncrona de ModelStatusAPIView
+
+    Total e data da última predição vêm agregados na mesma consulta dos
+    modelos ativos, em vez de duas consultas por modelo.
+    """
+    models = MLModel.objects.filter(is_active=True).annotate(
+        total_predictions=Count('predictions'),
+        last_prediction=Max('predictions__created_at')
+    )
+
+    model_data = []
+    async for model in models:
+        model_data.append({
+            'id': model.id,
+            'name': model.name,
+            'type': model.model_type,
+            'version': model.version,
+            'accuracy': model.accuracy,
+            'mse': model.mse,
+            'mae': model.mae,
+            'r2_score': model.r2_score,
+            'last_trained': model.last_trained.isoformat() if model.last_trained else None,
+            'last_prediction': model.last_prediction.isoformat() if model.last_prediction else None,
+            'total_predictions': model.total_predictions
+        })
+
+    recent_readings = await Reading.objects.filter(
+        timestamp__gte=timezone.now() - timedelta(hours=24)
+    ).acount()
+
+    return JsonResponse({
+        'active_models': model_data,
+        'total_active_models': len(model_data),
+        'recent_readings_24h': recent_readings,
+        'prediction_sink': prediction_sink.get_stats(),
+        'prediction_persistence': persistence_policy.get_stats(),
+        'forecast_cache': forecast_cache.get_stats(),
+        'inference_deadline': inference_deadline.get_stats(),
+        'shadow_evaluation': shadow_evaluator.get_stats(),
+        'system_status': 'operational' if model_data else 'no_models'
+    })
@@ -0,0 +1,358 @@
+# backend/ml_models/warmup.py
+
+import importlib
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Bibliotecas pesadas importadas antes do fork quando o preload está ativo
+ML_STACK_MODULES = [
+    'numpy',
+    'pandas',
+    'joblib',
+    'sklearn.ensemble',
+    'sklearn.preprocessing',
+    'sklearn.pipeline',
+    'sklearn.linear_model',
+    'ml_models.ml_algorithms',
+    'ml_models.integrations',
+]
+
+
+def get_process_memory():
+    """
+    Memória do processo atual em KB
+
+    rss conta todas as páginas residentes, inclusive as compartilhadas com o
+    master; pss divide as páginas compartilhadas entre os processos que as
+    usam e uss conta apenas as páginas privadas do processo. pss/uss só
+    estão disponíveis no Linux (/proc/self/smaps_rollup).
+    """
+    memory = {'rss_kb': None, 'pss_kb': None, 'uss_kb': None}
+
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            values = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                    values[parts[0][:-1]] = int(parts[1])
+        memory['rss_kb'] = values.get('Rss')
+        memory['pss_kb'] = values.get('Pss')
+        memory['uss_kb'] = values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)
+        return memory
+    except OSError:
+        pass
+
+    try:
+        import resource
+        # ru_maxrss é o pico de memória residente (KB no Linux)
+        memory['rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except (ImportError, OSError):
+        pass
+    return memory
+
+
+def format_memory(memory):
+    return ' '.join(
+        f"{name[:-3]}={value / 1024:.1f}MB"
+        for name, value in memory.items()
+        if value is not None
+    )
+
+
+def import_ml_stack():
+    """Importa as bibliotecas de ML e retorna o tempo gasto em segundos"""
+    start = time.perf_counter()
+    for module in ML_STACK_MODULES:
+        importlib.import_module(module)
+    return time.perf_counter() - start
+
+
+def preload_active_models():
+    """
+    Carrega todos os MLModel ativos no cache de artefatos do processo
+
+    Returns:
+        list: Um dicionário por modelo com tipo, versão, sucesso e tempo de carga
+    """
+    from .models import MLModel
+
+    results = []
+    for ml_model in MLModel.objects.filter(is_active=True).order_by('model_type'):
+        start = time.perf_counter()
+        loaded = ml_model.load_model()
+        results.append({
+            'model_type': ml_model.model_type,
+            'version': ml_model.version,
+            'loaded': loaded is not None,
+            'load_seconds': time.perf_counter() - start,
+        })
+    return results
+
+
+def preload_ml(log=None):
+    """
+    Importa as bibliotecas de ML e carrega os modelos ativos
+
+    Usado pelo master do gunicorn (preload_app) para que os workers herdem
+    tudo já carregado via copy-on-write após o fork.
+    """
+    log = log or logger
+    memory_before = get_process_memory()
+
+    import_seconds = import_ml_stack()
+    try:
+        models = preload_active_models()
+    except Exception as e:
+        log.warning(f"Não foi possível pré-carregar os modelos ML: {str(e)}")
+        models = []
+    finally:
+        from django.db import connections
+        # Conexões abertas aqui não podem ser herdadas pelos workers
+        connections.close_all()
+
+    memory_after = get_process_memory()
+
+    for result in models:
+        log.info(
+            f"Modelo {result['model_type']} v{result['version']} "
+            f"{'carregado' if result['loaded'] else 'NÃO carregado'} em {result['load_seconds'] * 1000:.0f}ms"
+        )
+    log.info(
+        f"Stack ML importada em {import_seconds * 1000:.0f}ms - "
+        f"memória antes: {format_memory(memory_before)} / depois: {format_memory(memory_after)}"
+    )
+
+    return {
+        'import_seconds': import_seconds,
+        'models': models,
+        'memory_before': memory_before,
+        'memory_after': memory_after,
+    }
+
+
+def _synthetic_inference(ml_model, loaded):
+    """
+    Executa uma inferência sintética com o modelo carregado
+
+    Percorre o mesmo caminho das requisições (compilação da floresta,
+    buffers de features), então a primeira requisição real já encontra tudo
+    pronto. Levanta exceção se a inferência falhar.
+    """
+    from .inference import get_model_columns, get_row_buffer
+    from .ml_algorithms import (
+        TemperaturePredictionModel,
+        FanOptimizationModel,
+        AnomalyDetectionModel
+    )
+
+    if ml_model.model_type == 'anomaly_detection':
+        anomaly_model = AnomalyDetectionModel()
+        anomaly_model.model = loaded
+        anomaly_model.is_fitted = True
+        result = anomaly_model.detect_anomaly(25.0, 12, temp_diff=0.0, temp_deviation=0.0)
+        if str(result.get('reason', '')).startswith('error'):
+            raise ValueError(result['reason'])
+        return result
+
+    if ml_model.model_type == 'temperature_prediction':
+        temp_model = TemperaturePredictionModel()
+        temp_model.model = loaded
+        return temp_model.predict_next_hour(25.0, 12, features={
+            'temp_lag_1': 25.0,
+            'temp_lag_2': 25.0,
+            'temp_rolling_mean_3': 25.0,
+            'temp_rolling_std_3': 0.0,
+        })
+
+    if ml_model.model_type == 'fan_optimization':
+        fan_model = FanOptimizationModel()
+        fan_model.model = loaded
+        buffer = get_row_buffer(
+            get_model_columns(fan_model.model, fan_model.feature_columns),
+            n_rows=len(fan_model.durations)
+        )
+        buffer.set_column('temp_before', 28.0)
+        buffer.set_column('hour', 12)
+        buffer.set_column('day_of_week', 0)
+        buffer.set_column('duration_minutes', fan_model.durations)
+        return fan_model.predict_rows(buffer.rows)
+
+    raise ValueError(f"Tipo de modelo desconhecido: {ml_model.model_type}")
+
+
+class WarmupState:
+    """
+    Estado de aquecimento dos modelos no processo atual
+
+    cold -> warming -> warm, degraded ou failed. Usado pelo endpoint de
+    readiness para que o deploy só envie tráfego a workers com os modelos
+    prontos.
+
+    degraded: algum modelo ativo não carregou ou falhou na inferência
+    sintética; as requisições desse tipo são atendidas pelas regras de
+    fallback, então o worker continua pronto. failed: o próprio warmup
+    falhou (ex.: banco indisponível). Nos dois casos o warmup é refeito com
+    espera exponencial, a partir de ML_WARMUP_RETRY_SECONDS e até
+    MAX_RETRY_SECONDS, na próxima chamada de start() após a espera; o
+    status anterior é mantido enquanto a nova tentativa roda.
+    """
+
+    READY_STATUSES = ('warm', 'degraded')
+    MAX_RETRY_SECONDS = 600
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.status = 'cold'
+        self.started_at = None
+        self.finished_at = None
+        self.models = []
+        self.error = None
+        self.attempts = 0
+        self.next_retry_at = None
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            self._reset()
+
+    @property
+    def is_warm(self):
+        self._check_fork()
+        return self.status == 'warm'
+
+    @property
+    def is_ready(self):
+        self._check_fork()
+        return self.status in self.READY_STATUSES
+
+    @property
+    def retry_seconds(self):
+        from django.conf import settings
+
+        return getattr(settings, 'ML_WARMUP_RETRY_SECONDS', 30)
+
+    def run(self, log=None):
+        """
+        Carrega todos os MLModel ativos e faz uma inferência sintética por tipo
+
+        Returns:
+            dict: Estado final (ver as_dict)
+        """
+        from django.db import close_old_connections
+        from .models import MLModel
+
+        log = log or logger
+        self._check_fork()
+        with self._lock:
+            # Em uma nova tentativa o worker segue com o status anterior
+            if self.status == 'cold':
+                self.status = 'warming'
+            self.attempts += 1
+            self.next_retry_at = None
+            self.started_at = time.time()
+            self.finished_at = None
+            self.error = None
+
+        results = []
+        try:
+            close_old_connections()
+            for ml_model in MLModel.objects.filter(is_active=True).order_by('model_type'):
+                result = {
+                    'model_type': ml_model.model_type,
+                    'version': ml_model.version,
+                    'loaded': False,
+                    'load_ms': None,
+                    'first_inference_ms': None,
+                    'error': None,
+                }
+                try:
+                    start = time.perf_counter()
+                    loaded = ml_model.load_model()
+                    result['load_ms'] = round((time.perf_counter() - start) * 1000, 2)
+                    result['loaded'] = loaded is not None
+                    if loaded is None:
+                        raise ValueError("Artefato do modelo não pôde ser carregado")
+
+                    start = time.perf_counter()
+                    _synthetic_inference(ml_model, loaded)
+                    result['first_inference_ms'] = round((time.perf_counter() - start) * 1000, 2)
+                except Exception as e:
+                    result['error'] = str(e)
+                results.append(result)
+
+                log.info(
+                    f"Warmup {result['model_type']} v{result['version']}: "
+                    f"carga {result['load_ms']}ms, primeira inferência {result['first_inference_ms']}ms"
+                    + (f" - erro: {result['error']}" if result['error'] else '')
+                )
+            status = 'degraded' if any(result['error'] for result in results) else 'warm'
+            error = None
+        except Exception as e:
+            log.error(f"Erro no warmup dos modelos ML: {str(e)}")
+            status, error = 'failed', str(e)
+        finally:
+            close_old_connections()
+
+        with self._lock:
+            self.models = results
+            self.status = status
+            self.error = error
+            self.finished_at = time.time()
+            if status != 'warm':
+                delay = min(self.retry_seconds * 2 ** (self.attempts - 1), self.MAX_RETRY_SECONDS)
+                self.next_retry_at = self.finished_at + delay
+                log.warning(f"Warmup dos modelos ML {status}; nova tentativa em {delay:.0f}s")
+        return self.as_dict()
+
+    def start(self, log=None):
+        """
+        Executa o warmup em uma thread de fundo, se ainda não começou
+
+        Após um warmup degraded ou failed, inicia uma nova tentativa quando
+        a espera (next_retry_at) tiver passado.
+        """
+        self._check_fork()
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            if self.status != 'cold':
+                if self.next_retry_at is None or time.time() < self.next_retry_at:
+                    return False
+            else:
+                self.status = 'warming'
+            self._thread = threading.Thread(
+                target=self.run,
+                kwargs={'log': log},
+                name='ml-warmup',
+                daemon=True
+            )
+        self._thread.start()
+        return True
+
+    def as_dict(self):
+        self._check_fork()
+        with self._lock:
+            duration = None
+            if self.started_at and self.finished_at:
+                duration = round((self.finished_at - self.started_at) * 1000, 2)
+            return {
+                'status': self.status,
+                'pid': self._pid,
+                'warmup_ms': duration,
+                'models': [dict(result) for result in self.models],
+                'error': self.error,
+                'attempts': self.attempts,
+                'next_retry_at': self.next_retry_at,
+            }
+
+
+warmup_state = WarmupState()
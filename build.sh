@@ -58,7 +58,7 @@ from ml_models.models import MLModel
 models = MLModel.objects.all()
 print(f"{models.count()} modelos encontrados")
 for model in models:
-    status = "com dados" if model.model_data else "sem dados"
+    status = "com artefato" if model.has_artifact() else "sem artefato"
     print(f"- {model.name}: {status}")
 EOF
 